@@ -0,0 +1,272 @@
+"""
+Circuit breakers and retry budget for upstream HTTP calls
+
+Each upstream has a breaker that opens after `failure_threshold` consecutive
+failures (connection errors, timeouts, 502/503/504). While open, calls fail
+immediately with CircuitOpenError instead of waiting out a timeout. After
+`reset_timeout` seconds a single probe call is let through (half-open); its
+outcome closes the circuit or opens it again.
+
+Failed calls are retried with jittered exponential backoff, but only while a
+retry budget shared by all upstreams allows it, so retries can never multiply
+the load on an upstream that is already struggling.
+"""
+import asyncio
+import httpx
+import logging
+import os
+import random
+import time
+from collections import deque
+from typing import Dict, Any, Optional
+
+logger = logging.getLogger(__name__)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+# Upstream responses that count as failures; other statuses are the caller's business
+FAILURE_STATUSES = (502, 503, 504)
+
+# Methods that are safe to send twice
+IDEMPOTENT_METHODS = ("GET", "HEAD", "OPTIONS")
+
+
+class CircuitOpenError(Exception):
+    """An upstream call was rejected because its circuit is open"""
+
+    def __init__(self, upstream: str, retry_after: float):
+        self.upstream = upstream
+        self.retry_after = max(1, int(retry_after + 0.999))
+        super().__init__(
+            f"{upstream} is unavailable (circuit open); retry in {self.retry_after}s"
+        )
+
+
+class CircuitBreaker:
+    """Closed/open/half-open breaker for one upstream"""
+
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: Optional[int] = None,
+        reset_timeout: Optional[float] = None,
+    ):
+        self.name = name
+        self.failure_threshold = (
+            failure_threshold if failure_threshold is not None
+            else int(os.getenv("HTTP_BREAKER_FAILURE_THRESHOLD", "5"))
+        )
+        self.reset_timeout = (
+            reset_timeout if reset_timeout is not None
+            else float(os.getenv("HTTP_BREAKER_RESET_SECONDS", "30"))
+        )
+        self._state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self.opened = 0
+        self.rejected = 0
+
+    @property
+    def state(self) -> str:
+        if self._state == OPEN and self._remaining() <= 0:
+            return HALF_OPEN
+        return self._state
+
+    @property
+    def available(self) -> bool:
+        """Whether a call made now would be let through"""
+        state = self.state
+        return state == CLOSED or (state == HALF_OPEN and not self._probe_in_flight)
+
+    @property
+    def retry_after(self) -> float:
+        """Seconds until a call would be let through again"""
+        if self._state == OPEN:
+            return max(self._remaining(), 0.0)
+        if self._state == HALF_OPEN and self._probe_in_flight:
+            return self.reset_timeout
+        return 0.0
+
+    def _remaining(self) -> float:
+        return self._opened_at + self.reset_timeout - time.monotonic()
+
+    def check(self):
+        """Raise CircuitOpenError if a call made now would be rejected, without making one"""
+        if not self.available:
+            raise CircuitOpenError(self.name, self.retry_after)
+
+    def before_call(self):
+        """Admit a call or raise CircuitOpenError"""
+        if self._state == OPEN:
+            remaining = self._remaining()
+            if remaining > 0:
+                self.rejected += 1
+                raise CircuitOpenError(self.name, remaining)
+            self._state = HALF_OPEN
+            self._probe_in_flight = False
+
+        if self._state == HALF_OPEN:
+            if self._probe_in_flight:
+                self.rejected += 1
+                raise CircuitOpenError(self.name, self.reset_timeout)
+            self._probe_in_flight = True
+
+    def record_success(self):
+        if self._state != CLOSED:
+            logger.info(f"Circuit for {self.name} closed")
+        self._state = CLOSED
+        self._failures = 0
+        self._probe_in_flight = False
+
+    def record_failure(self):
+        self._failures += 1
+        if self._state == HALF_OPEN or self._failures >= self.failure_threshold:
+            self._open()
+
+    def record_abandoned(self):
+        """A call ended without an outcome (cancelled); free the half-open probe slot"""
+        self._probe_in_flight = False
+
+    def _open(self):
+        if self._state != OPEN:
+            logger.warning(
+                f"Circuit for {self.name} opened after {self._failures} consecutive failures"
+            )
+            self.opened += 1
+        self._state = OPEN
+        self._opened_at = time.monotonic()
+        self._probe_in_flight = False
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "state": self.state,
+            "consecutive_failures": self._failures,
+            "failure_threshold": self.failure_threshold,
+            "reset_timeout": self.reset_timeout,
+            "retry_after": round(self.retry_after, 1),
+            "opened": self.opened,
+            "rejected": self.rejected,
+        }
+
+
+class RetryBudget:
+    """Caps retries at `min_retries` plus `ratio` of the requests in a sliding window"""
+
+    def __init__(
+        self,
+        ratio: Optional[float] = None,
+        min_retries: Optional[int] = None,
+        window: float = 10.0,
+    ):
+        self.ratio = (
+            ratio if ratio is not None
+            else float(os.getenv("HTTP_RETRY_BUDGET_RATIO", "0.2"))
+        )
+        self.min_retries = (
+            min_retries if min_retries is not None
+            else int(os.getenv("HTTP_RETRY_BUDGET_MIN", "10"))
+        )
+        self.window = window
+        self._requests: deque = deque()
+        self._retries: deque = deque()
+        self.exhausted = 0
+
+    def _prune(self, now: float):
+        cutoff = now - self.window
+        while self._requests and self._requests[0] < cutoff:
+            self._requests.popleft()
+        while self._retries and self._retries[0] < cutoff:
+            self._retries.popleft()
+
+    def record_request(self):
+        self._requests.append(time.monotonic())
+
+    def try_spend(self) -> bool:
+        """Take one retry from the budget if any is left"""
+        now = time.monotonic()
+        self._prune(now)
+        if len(self._retries) < self.min_retries + self.ratio * len(self._requests):
+            self._retries.append(now)
+            return True
+        self.exhausted += 1
+        return False
+
+    def stats(self) -> Dict[str, Any]:
+        self._prune(time.monotonic())
+        return {
+            "ratio": self.ratio,
+            "min_retries": self.min_retries,
+            "window": self.window,
+            "requests": len(self._requests),
+            "retries": len(self._retries),
+            "exhausted": self.exhausted,
+        }
+
+
+class ResilientTransport(httpx.AsyncBaseTransport):
+    """httpx transport that applies a circuit breaker and budgeted, jittered retries"""
+
+    def __init__(
+        self,
+        transport: httpx.AsyncBaseTransport,
+        breaker: CircuitBreaker,
+        budget: RetryBudget,
+        max_retries: Optional[int] = None,
+        backoff: float = 0.2,
+        max_backoff: float = 2.0,
+    ):
+        self.transport = transport
+        self.breaker = breaker
+        self.budget = budget
+        self.max_retries = (
+            max_retries if max_retries is not None
+            else int(os.getenv("HTTP_RETRY_ATTEMPTS", "2"))
+        )
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+
+    def _may_retry(self, request: httpx.Request, error: Optional[Exception], attempt: int) -> bool:
+        if attempt >= self.max_retries or self.breaker.state != CLOSED:
+            return False
+        # A request that never reached the upstream can be resent whatever its method
+        never_sent = isinstance(error, (httpx.ConnectError, httpx.ConnectTimeout))
+        if request.method not in IDEMPOTENT_METHODS and not never_sent:
+            return False
+        return self.budget.try_spend()
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        self.budget.record_request()
+        attempt = 0
+        while True:
+            self.breaker.before_call()
+            try:
+                response = await self.transport.handle_async_request(request)
+            except httpx.PoolTimeout:
+                # Our own pool is saturated; that says nothing about the upstream
+                self.breaker.record_abandoned()
+                raise
+            except httpx.TransportError as e:
+                self.breaker.record_failure()
+                if not self._may_retry(request, e, attempt):
+                    raise
+            except BaseException:
+                self.breaker.record_abandoned()
+                raise
+            else:
+                if response.status_code not in FAILURE_STATUSES:
+                    self.breaker.record_success()
+                    return response
+                self.breaker.record_failure()
+                if not self._may_retry(request, None, attempt):
+                    return response
+                await response.aclose()
+
+            attempt += 1
+            # Full jitter keeps retries from many callers from arriving in lockstep
+            await asyncio.sleep(random.uniform(0, min(self.max_backoff, self.backoff * 2 ** attempt)))
+
+    async def aclose(self):
+        await self.transport.aclose()
@@ -4,24 +4,66 @@ ComfyUI client for interfacing with ComfyUI API
 import httpx
 import json
 import asyncio
+import time
 import uuid
-from typing import Dict, Any, Optional, List
+from typing import Dict, Any, Optional, List, Tuple, AsyncGenerator
 import os
 import logging
 
+from comfyui_events import ComfyUIEventHub, ComfyUIJob, COMPLETED, QUEUED, RUNNING
+from http_clients import HttpClientRegistry
+
 logger = logging.getLogger(__name__)
 
+# Model kind -> (loader node, input whose choices are the model files)
+MODEL_INPUTS = {
+    "checkpoints": ("CheckpointLoaderSimple", "ckpt_name"),
+    "vae": ("VAELoader", "vae_name"),
+    "controlnet": ("ControlNetLoader", "control_net_name"),
+    "lora": ("LoraLoader", "lora_name"),
+}
+
 class ComfyUIClient:
-    def __init__(self, base_url: Optional[str] = None):
+    def __init__(
+        self,
+        base_url: Optional[str] = None,
+        http: Optional[HttpClientRegistry] = None,
+        events: Optional[ComfyUIEventHub] = None,
+        poll_interval: Optional[float] = None,
+        history_fallback_interval: Optional[float] = None,
+    ):
         self.base_url = base_url or os.getenv("COMFYUI_BASE_URL", "http://comfyui:18188")
         self.base_url = self.base_url.rstrip('/')
-        self.client = httpx.AsyncClient(timeout=60.0)
+        # Without a shared registry the client owns its connections and closes them on exit
+        self._owns_http = http is None
+        self.http = http or HttpClientRegistry()
+        # Completion events from ComfyUI's websocket; without them completion is polled
+        self.events = events
+        self.poll_interval = (
+            poll_interval if poll_interval is not None
+            else float(os.getenv("COMFYUI_POLL_INTERVAL", "1"))
+        )
+        # How often /history is still checked while the websocket is connected
+        self.history_fallback_interval = (
+            history_fallback_interval if history_fallback_interval is not None
+            else float(os.getenv("COMFYUI_HISTORY_FALLBACK_SECONDS", "15"))
+        )
+        # Queue positions are read once per second however many streams watch them
+        self.queue_cache_ttl = 1.0
+        self._queue_positions: Optional[Tuple[float, Dict[str, int]]] = None
+        self._queue_fetch: Optional[asyncio.Task] = None
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        """Shared keep-alive client for ComfyUI"""
+        return self.http.get("comfyui")
         
     async def __aenter__(self):
         return self
         
     async def __aexit__(self, exc_type, exc_val, exc_tb):
-        await self.client.aclose()
+        if self._owns_http:
+            await self.http.close()
     
     async def health_check(self) -> Dict[str, Any]:
         """Check if ComfyUI is available and responsive"""
@@ -41,53 +83,42 @@ class ComfyUIClient:
             }
     
     async def get_models(self) -> Dict[str, List[str]]:
-        """Get available models from ComfyUI"""
-        try:
-            response = await self.client.get(f"{self.base_url}/object_info")
+        """Get available models from ComfyUI.
+
+        Only the loader nodes' entries of /object_info are read; the full
+        document runs to megabytes once custom nodes are installed.
+        """
+        responses = await asyncio.gather(*(
+            self.client.get(f"{self.base_url}/object_info/{node}")
+            for node, _ in MODEL_INPUTS.values()
+        ))
+
+        models = {}
+        for (kind, (node, input_name)), response in zip(MODEL_INPUTS.items(), responses):
             response.raise_for_status()
-            object_info = response.json()
-            
-            models = {}
-            
-            # Extract checkpoint models
-            if "CheckpointLoaderSimple" in object_info:
-                checkpoint_info = object_info["CheckpointLoaderSimple"]["input"]["required"]
-                if "ckpt_name" in checkpoint_info:
-                    models["checkpoints"] = checkpoint_info["ckpt_name"][0]
-            
-            # Extract VAE models
-            if "VAELoader" in object_info:
-                vae_info = object_info["VAELoader"]["input"]["required"]
-                if "vae_name" in vae_info:
-                    models["vae"] = vae_info["vae_name"][0]
-            
-            # Extract ControlNet models
-            if "ControlNetLoader" in object_info:
-                controlnet_info = object_info["ControlNetLoader"]["input"]["required"]
-                if "control_net_name" in controlnet_info:
-                    models["controlnet"] = controlnet_info["control_net_name"][0]
-            
-            # Extract LoRA models
-            if "LoraLoader" in object_info:
-                lora_info = object_info["LoraLoader"]["input"]["required"]
-                if "lora_name" in lora_info:
-                    models["lora"] = lora_info["lora_name"][0]
-            
-            return models
-            
-        except Exception as e:
-            logger.error(f"Failed to get models from ComfyUI: {str(e)}")
-            return {}
-    
+            node_info = response.json().get(node)
+            if not node_info:
+                continue
+            spec = node_info["input"]["required"].get(input_name)
+            if spec is None:
+                continue
+            # Choices are either [names, ...] or, in newer versions, ["COMBO", {"options": names}]
+            if spec[0] == "COMBO":
+                models[kind] = spec[1].get("options", [])
+            else:
+                models[kind] = spec[0]
+        return models
+
     async def queue_prompt(self, workflow: Dict[str, Any]) -> Dict[str, Any]:
         """Queue a workflow for execution"""
         try:
-            # Generate a unique client_id for this request
-            client_id = str(uuid.uuid4())
+            # The event hub only hears about prompts queued with its client_id.
+            # That id is shared by every prompt, so it is not handed to callers
+            client_id = None if self.events else str(uuid.uuid4())
             
             prompt_data = {
                 "prompt": workflow,
-                "client_id": client_id
+                "client_id": self.events.client_id if self.events else client_id
             }
             
             response = await self.client.post(
@@ -137,6 +168,36 @@ class ComfyUIClient:
             logger.error(f"Failed to get queue status: {str(e)}")
             return {}
     
+    async def get_queue_positions(self) -> Optional[Dict[str, int]]:
+        """Place of every prompt in the queue (0 while running, 1 when next), or None if unknown"""
+        cached = self._queue_positions
+        if cached is not None and time.monotonic() - cached[0] < self.queue_cache_ttl:
+            return cached[1]
+        if self._queue_fetch is None or self._queue_fetch.done():
+            self._queue_fetch = asyncio.create_task(self._fetch_queue_positions())
+        # Shielded so one stream going away does not cancel the others' read
+        return await asyncio.shield(self._queue_fetch)
+
+    async def _fetch_queue_positions(self) -> Optional[Dict[str, int]]:
+        queue = await self.get_queue_status()
+        if "queue_running" not in queue:
+            return None
+        positions = {entry[1]: 0 for entry in queue["queue_running"]}
+        # Entries are [number, prompt_id, ...]; lower numbers run first
+        pending = sorted(queue.get("queue_pending", []), key=lambda entry: entry[0])
+        positions.update({entry[1]: index + 1 for index, entry in enumerate(pending)})
+        self._queue_positions = (time.monotonic(), positions)
+        return positions
+
+    async def prompt_known(self, prompt_id: str) -> bool:
+        """Whether ComfyUI has, or had, the prompt"""
+        if self.events is not None and self.events.get(prompt_id) is not None:
+            return True
+        positions = await self.get_queue_positions()
+        if positions is not None and prompt_id in positions:
+            return True
+        return prompt_id in await self.get_history(prompt_id)
+
     async def cancel_prompt(self, prompt_id: str) -> bool:
         """Cancel a queued prompt"""
         try:
@@ -252,43 +313,221 @@ class ComfyUIClient:
             return result
     
     async def wait_for_completion(self, prompt_id: str, timeout: int = 300) -> Dict[str, Any]:
-        """Wait for a prompt to complete execution"""
-        start_time = asyncio.get_event_loop().time()
-        
+        """Wait for a prompt to complete execution.
+
+        With the event hub connected this returns as soon as ComfyUI reports
+        the prompt finished, checking /history only every
+        history_fallback_interval seconds in case an event was missed.
+        Otherwise /history is polled every poll_interval seconds.
+        """
+        loop = asyncio.get_event_loop()
+        start_time = loop.time()
+        job = self.events.track(prompt_id) if self.events else None
+        last_check: Optional[float] = None
+
         while True:
+            if job is not None and job.finished:
+                return await self._job_result(job)
+            version = job.version if job is not None else 0
+
+            now = loop.time()
             # Check if timeout exceeded
-            if asyncio.get_event_loop().time() - start_time > timeout:
+            if now - start_time > timeout:
                 return {
                     "success": False,
                     "error": "Timeout waiting for completion"
                 }
-            
-            # Get history for this prompt
-            history = await self.get_history(prompt_id)
-            
-            if prompt_id in history:
-                prompt_history = history[prompt_id]
-                
-                # Check if completed
-                if "outputs" in prompt_history:
-                    return {
-                        "success": True,
-                        "outputs": prompt_history["outputs"],
-                        "status": prompt_history.get("status", {}),
-                        "prompt_id": prompt_id
-                    }
-                
-                # Check if failed
-                if "status" in prompt_history and prompt_history["status"].get("status_str") == "error":
-                    return {
-                        "success": False,
-                        "error": prompt_history["status"].get("messages", []),
-                        "prompt_id": prompt_id
-                    }
-            
-            # Wait before checking again
-            await asyncio.sleep(1)
-    
+
+            connected = job is not None and self.events.connected
+            interval = self.history_fallback_interval if connected else self.poll_interval
+            if last_check is not None:
+                since_check = now - last_check
+            else:
+                # Polling starts right away; with events the first check can wait
+                since_check = now - start_time if connected else interval
+
+            if since_check >= interval:
+                result = await self._history_result(prompt_id)
+                if result is not None:
+                    return result
+                last_check = now
+                since_check = 0.0
+
+            wait = min(interval - since_check, start_time + timeout - now) + 0.001
+            if job is not None:
+                # Woken early by the prompt's events or a dropped connection
+                await job.wait(wait, version)
+            else:
+                await asyncio.sleep(wait)
+
+    async def job_events(
+        self,
+        prompt_id: str,
+        timeout: float = 3600,
+        keepalive_interval: float = 15.0,
+    ) -> AsyncGenerator[Tuple[Optional[str], Any], None]:
+        """Yield (event, data) for a prompt until it finishes.
+
+        Events are `status` (queued/running and the executing node), `queue`
+        (position while waiting), `progress` (sampler steps) and finally
+        `complete` or `failed` with the same result as wait_for_completion.
+        (None, None) marks a quiet keepalive interval. Progress needs the
+        event hub; without it only queue position and completion are reported.
+        """
+        loop = asyncio.get_event_loop()
+        start_time = loop.time()
+        last_sent = start_time
+        job = self.events.track(prompt_id) if self.events else None
+        last_check: Optional[float] = None
+        sent_status = sent_position = sent_progress = None
+        result = None
+
+        while result is None:
+            if job is not None and job.finished:
+                result = await self._job_result(job)
+                break
+            version = job.version if job is not None else 0
+            sent = False
+
+            now = loop.time()
+            if now - start_time > timeout:
+                result = {"success": False, "error": "Timeout waiting for completion", "prompt_id": prompt_id}
+                break
+
+            connected = job is not None and self.events.connected
+            interval = self.history_fallback_interval if connected else self.poll_interval
+            if last_check is not None:
+                since_check = now - last_check
+            else:
+                since_check = now - start_time if connected else interval
+
+            state = job.status if job is not None else QUEUED
+            position = None
+            if state == QUEUED:
+                positions = await self.get_queue_positions()
+                if positions is not None:
+                    position = positions.get(prompt_id)
+                    if position is None:
+                        # Neither queued nor running: it has finished, so history has it
+                        result = await self._history_result(prompt_id)
+                        if result is not None:
+                            break
+                        last_check = loop.time()
+                        since_check = 0.0
+                    elif position == 0:
+                        state = RUNNING
+            if sent_status == RUNNING:
+                # Without events the queue is all we go by, and a prompt leaves it before history has it
+                state = RUNNING
+
+            if state != sent_status:
+                sent_status = state
+                sent = True
+                yield "status", {"prompt_id": prompt_id, "status": state, "node": job.node if job else None}
+            if state == QUEUED and position is not None and position != sent_position:
+                sent_position = position
+                sent = True
+                yield "queue", {
+                    "prompt_id": prompt_id,
+                    "position": position,
+                    "queue_length": len(positions),
+                }
+            progress = (job.node, job.progress) if job is not None and job.progress else None
+            if progress is not None and progress != sent_progress:
+                sent_progress = progress
+                sent = True
+                yield "progress", {"prompt_id": prompt_id, "node": job.node, **job.progress}
+
+            if since_check >= interval:
+                result = await self._history_result(prompt_id)
+                if result is not None:
+                    break
+                last_check = loop.time()
+                since_check = 0.0
+
+            now = loop.time()
+            if sent:
+                last_sent = now
+            elif now - last_sent >= keepalive_interval:
+                last_sent = now
+                yield None, None
+
+            wait = min(interval - since_check, keepalive_interval, start_time + timeout - now) + 0.001
+            if job is not None:
+                await job.wait(wait, version)
+            else:
+                await asyncio.sleep(wait)
+
+        yield ("complete" if result.get("success") else "failed"), result
+
+    async def _history_result(self, prompt_id: str) -> Optional[Dict[str, Any]]:
+        """Completion result from /history, or None while the prompt is still pending"""
+        history = await self.get_history(prompt_id)
+
+        if prompt_id in history:
+            prompt_history = history[prompt_id]
+
+            # Check if completed
+            if "outputs" in prompt_history:
+                return {
+                    "success": True,
+                    "outputs": prompt_history["outputs"],
+                    "status": prompt_history.get("status", {}),
+                    "prompt_id": prompt_id
+                }
+
+            # Check if failed
+            if "status" in prompt_history and prompt_history["status"].get("status_str") == "error":
+                return {
+                    "success": False,
+                    "error": prompt_history["status"].get("messages", []),
+                    "prompt_id": prompt_id
+                }
+        return None
+
+    async def _job_result(self, job: ComfyUIJob) -> Dict[str, Any]:
+        """Completion result for a prompt the event hub saw finish"""
+        if job.status != COMPLETED:
+            error = job.error or {}
+            return {
+                "success": False,
+                "error": error.get("exception_message") or f"Prompt {job.status}",
+                "prompt_id": job.prompt_id
+            }
+
+        # One history read for the authoritative outputs and status
+        result = await self._history_result(job.prompt_id)
+        if result is not None:
+            return result
+        return {
+            "success": True,
+            "outputs": job.outputs,
+            "status": {"status_str": "success", "completed": True},
+            "prompt_id": job.prompt_id
+        }
+
+    async def open_image(
+        self,
+        filename: str,
+        subfolder: str = "",
+        folder_type: str = "output",
+        headers: Optional[Dict[str, str]] = None,
+    ) -> httpx.Response:
+        """Request an image from ComfyUI without reading its body.
+
+        `headers` (e.g. Range, If-None-Match) are sent upstream as they are.
+        The caller streams the body and must close the response.
+        """
+        params = {
+            "filename": filename,
+            "type": folder_type
+        }
+        if subfolder:
+            params["subfolder"] = subfolder
+
+        request = self.client.build_request("GET", f"{self.base_url}/view", params=params, headers=headers)
+        return await self.client.send(request, stream=True)
+
     async def get_image_data(self, filename: str, subfolder: str = "", folder_type: str = "output") -> bytes:
         """Get image data from ComfyUI"""
         try:
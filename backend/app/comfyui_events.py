@@ -0,0 +1,250 @@
+"""
+ComfyUI execution events over its websocket
+
+ComfyUI pushes execution events to /ws?clientId=<id> for the prompts queued
+with that client id. The backend queues every prompt with the hub's client id,
+so one websocket carries the events of all of them: completion is noticed as
+soon as ComfyUI reports it, without polling /history, and sampler step
+progress is kept per prompt. Callers still check /history now and then, which
+covers events missed while the socket was down; when the websocket cannot be
+used at all (websockets not installed, or COMFYUI_EVENTS_ENABLED=false) they
+fall back to polling it.
+"""
+import asyncio
+import json
+import logging
+import os
+import time
+import uuid
+from typing import Dict, Any, Optional
+
+try:
+    from websockets.asyncio.client import connect as ws_connect
+except ImportError:
+    ws_connect = None
+
+logger = logging.getLogger(__name__)
+
+QUEUED = "queued"
+RUNNING = "running"
+COMPLETED = "completed"
+FAILED = "failed"
+INTERRUPTED = "interrupted"
+
+FINISHED_STATES = (COMPLETED, FAILED, INTERRUPTED)
+
+
+class ComfyUIJob:
+    """What the websocket has told us about one prompt"""
+
+    def __init__(self, prompt_id: str):
+        self.prompt_id = prompt_id
+        self.status = QUEUED
+        self.node: Optional[str] = None
+        self.progress: Optional[Dict[str, Any]] = None
+        self.outputs: Dict[str, Any] = {}
+        self.error: Optional[Dict[str, Any]] = None
+        self.updated_at = time.monotonic()
+        # Last time anyone waited on the job; jobs still being waited on are never pruned
+        self.watched_at = self.updated_at
+        # Bumped on every change, and when the hub loses its connection or the queue moves
+        self.version = 0
+        self._changed = asyncio.Event()
+
+    @property
+    def finished(self) -> bool:
+        return self.status in FINISHED_STATES
+
+    def update(self):
+        self.updated_at = time.monotonic()
+        self.wake()
+
+    def wake(self):
+        self.version += 1
+        # Every waiter holds the old event, so one change wakes them all
+        changed, self._changed = self._changed, asyncio.Event()
+        changed.set()
+
+    async def wait(self, timeout: float, version: int) -> bool:
+        """Wait up to `timeout` seconds for news since `version`; False on timeout"""
+        self.watched_at = time.monotonic()
+        if self.version != version:
+            return True
+        try:
+            await asyncio.wait_for(self._changed.wait(), timeout=timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "prompt_id": self.prompt_id,
+            "status": self.status,
+            "node": self.node,
+            "progress": self.progress,
+            "outputs": self.outputs,
+            "error": self.error,
+        }
+
+
+class ComfyUIEventHub:
+    """Keeps one websocket to ComfyUI open and tracks the prompts it reports on"""
+
+    def __init__(
+        self,
+        base_url: Optional[str] = None,
+        enabled: Optional[bool] = None,
+        reconnect_delay: float = 1.0,
+        max_reconnect_delay: float = 30.0,
+        job_ttl: float = 600.0,
+    ):
+        base_url = (base_url or os.getenv("COMFYUI_BASE_URL", "http://comfyui:18188")).rstrip("/")
+        self.client_id = str(uuid.uuid4())
+        self.ws_url = f"{base_url.replace('http', 'ws', 1)}/ws?clientId={self.client_id}"
+        self.enabled = (
+            enabled if enabled is not None
+            else os.getenv("COMFYUI_EVENTS_ENABLED", "true").lower() == "true"
+        )
+        self.reconnect_delay = reconnect_delay
+        self.max_reconnect_delay = max_reconnect_delay
+        # Prompts nobody waits on are remembered this long for late waiters and streams
+        self.job_ttl = job_ttl
+        self.connected = False
+        self.queue_remaining: Optional[int] = None
+        self.reconnects = 0
+        self._jobs: Dict[str, ComfyUIJob] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self):
+        """Connect in the background; waiting falls back to polling until connected"""
+        if not self.enabled:
+            return
+        if ws_connect is None:
+            logger.warning("websockets is not installed; ComfyUI completion falls back to history polling")
+            return
+        self._task = asyncio.create_task(self._run())
+
+    async def close(self):
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self._task = None
+
+    async def _run(self):
+        delay = self.reconnect_delay
+        while True:
+            try:
+                async with ws_connect(self.ws_url, ping_interval=20, ping_timeout=20) as ws:
+                    self.connected = True
+                    delay = self.reconnect_delay
+                    logger.info("Connected to the ComfyUI event stream")
+                    async for message in ws:
+                        # Binary frames are sampler preview images
+                        if isinstance(message, str):
+                            self._handle(message)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                if self.connected or self.reconnects == 0:
+                    logger.warning(f"ComfyUI event stream unavailable: {str(e)}")
+            finally:
+                self._disconnected()
+            self.reconnects += 1
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, self.max_reconnect_delay)
+
+    def _disconnected(self):
+        self.connected = False
+        # Waiters switch to polling history until the socket is back
+        for job in self._jobs.values():
+            if not job.finished:
+                job.wake()
+
+    def _handle(self, message: str):
+        try:
+            event = json.loads(message)
+        except json.JSONDecodeError:
+            return
+        kind = event.get("type")
+        data = event.get("data") or {}
+
+        if kind == "status":
+            exec_info = data.get("status", {}).get("exec_info", {})
+            self.queue_remaining = exec_info.get("queue_remaining", self.queue_remaining)
+            # Queued prompts may have moved up
+            for job in self._jobs.values():
+                if job.status == QUEUED:
+                    job.wake()
+            return
+
+        prompt_id = data.get("prompt_id")
+        if not prompt_id:
+            return
+        job = self.track(prompt_id)
+        if job.finished:
+            return
+
+        if kind in ("execution_start", "execution_cached"):
+            job.status = RUNNING
+        elif kind == "executing":
+            if data.get("node") is None:
+                # Older ComfyUI versions end a prompt with executing node=None
+                job.status = COMPLETED
+            else:
+                job.status = RUNNING
+                job.node = data["node"]
+                job.progress = None
+        elif kind == "progress":
+            job.status = RUNNING
+            job.node = data.get("node", job.node)
+            job.progress = {"value": data.get("value"), "max": data.get("max")}
+        elif kind == "executed":
+            if data.get("node") is not None and data.get("output") is not None:
+                job.outputs[data["node"]] = data["output"]
+        elif kind == "execution_success":
+            job.status = COMPLETED
+        elif kind == "execution_error":
+            job.status = FAILED
+            job.error = {
+                key: data.get(key)
+                for key in ("node_id", "node_type", "exception_type", "exception_message")
+            }
+        elif kind == "execution_interrupted":
+            job.status = INTERRUPTED
+        else:
+            return
+        job.update()
+
+    def track(self, prompt_id: str) -> ComfyUIJob:
+        """The job for `prompt_id`, created if no event has arrived for it yet"""
+        job = self._jobs.get(prompt_id)
+        if job is None:
+            self._prune()
+            job = self._jobs[prompt_id] = ComfyUIJob(prompt_id)
+        return job
+
+    def get(self, prompt_id: str) -> Optional[ComfyUIJob]:
+        return self._jobs.get(prompt_id)
+
+    def _prune(self):
+        # Waiters call wait() far more often than job_ttl, so a job is only
+        # dropped once nobody has heard about or asked after it for that long;
+        # a prompt sitting in a long queue keeps the job its waiters hold
+        cutoff = time.monotonic() - self.job_ttl
+        for prompt_id in [
+            prompt_id for prompt_id, job in self._jobs.items()
+            if max(job.updated_at, job.watched_at) < cutoff
+        ]:
+            del self._jobs[prompt_id]
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled and ws_connect is not None,
+            "connected": self.connected,
+            "reconnects": self.reconnects,
+            "tracked_prompts": len(self._jobs),
+            "queue_remaining": self.queue_remaining,
+        }
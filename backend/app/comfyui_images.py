@@ -0,0 +1,358 @@
+"""
+Content-addressed on-disk cache of ComfyUI images
+
+Images are downloaded from ComfyUI's /view once, streamed to disk and stored
+under the SHA-256 of their bytes, so the same image is kept once however it is
+asked for and can be served by hash as immutable. Generated outputs are also
+remembered by (subfolder, filename), so viewing one again does not go back to
+ComfyUI; temp and input images are not, because ComfyUI reuses those names.
+
+A downscaled WebP (or JPEG) preview is rendered with Pillow the first time it
+is asked for and kept next to the original. The cache is bounded by
+COMFYUI_IMAGE_CACHE_MAX_BYTES and evicts the least recently used images,
+previews included, sparing those served in the last IN_USE_SECONDS. Without
+Pillow, previews fall back to the original.
+"""
+import asyncio
+import hashlib
+import logging
+import mimetypes
+import os
+import re
+import tempfile
+import time
+from collections import OrderedDict
+from typing import Dict, Any, Optional, Tuple
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+from comfyui_client import ComfyUIClient
+
+logger = logging.getLogger(__name__)
+
+DIGEST_PATTERN = re.compile(r"^[0-9a-f]{64}$")
+
+# Images served this recently are not evicted: the response opens the file
+# only after the handler returns, and an open file survives its unlink
+IN_USE_SECONDS = 30.0
+
+PREVIEW_FORMATS = {
+    "webp": ("WEBP", "image/webp"),
+    "jpeg": ("JPEG", "image/jpeg"),
+}
+
+
+class ImageNotFoundError(LookupError):
+    """ComfyUI has no image by that name"""
+
+
+def is_digest(name: str) -> bool:
+    return DIGEST_PATTERN.match(name) is not None
+
+
+class CachedImage:
+    """One cached original and, once rendered, its preview"""
+
+    def __init__(self, digest: str, path: str, size: int, content_type: str):
+        self.digest = digest
+        self.path = path
+        self.size = size
+        self.content_type = content_type
+        self.preview_path: Optional[str] = None
+        self.preview_size = 0
+        self.preview_type: Optional[str] = None
+        self.used_at = time.monotonic()
+
+    @property
+    def total_size(self) -> int:
+        return self.size + self.preview_size
+
+
+class ComfyUIImageCache:
+    """Size-bounded LRU of ComfyUI images on disk, keyed by content hash"""
+
+    def __init__(
+        self,
+        comfyui: ComfyUIClient,
+        directory: Optional[str] = None,
+        max_bytes: Optional[int] = None,
+        preview_size: Optional[int] = None,
+        preview_format: Optional[str] = None,
+        preview_quality: Optional[int] = None,
+        enabled: Optional[bool] = None,
+    ):
+        self.comfyui = comfyui
+        self.directory = directory or os.getenv("COMFYUI_IMAGE_CACHE_DIR", "/tmp/comfyui-image-cache")
+        self.max_bytes = (
+            max_bytes if max_bytes is not None
+            else int(os.getenv("COMFYUI_IMAGE_CACHE_MAX_BYTES", str(1024 ** 3)))
+        )
+        self.enabled = (
+            enabled if enabled is not None
+            else os.getenv("COMFYUI_IMAGE_CACHE_ENABLED", "true").lower() == "true"
+        )
+        # Longest side of a preview, in pixels
+        self.preview_size = (
+            preview_size if preview_size is not None
+            else int(os.getenv("COMFYUI_IMAGE_PREVIEW_SIZE", "512"))
+        )
+        preview_format = (preview_format or os.getenv("COMFYUI_IMAGE_PREVIEW_FORMAT", "webp")).lower()
+        if preview_format not in PREVIEW_FORMATS:
+            logger.warning(f"Unknown preview format {preview_format}, using webp")
+            preview_format = "webp"
+        self.preview_format = preview_format
+        self.preview_quality = (
+            preview_quality if preview_quality is not None
+            else int(os.getenv("COMFYUI_IMAGE_PREVIEW_QUALITY", "80"))
+        )
+        # digest -> image, least recently used first
+        self._images: "OrderedDict[str, CachedImage]" = OrderedDict()
+        # (subfolder, filename) of generated outputs -> digest
+        self._names: Dict[Tuple[str, str], str] = {}
+        self._downloads: Dict[Tuple[str, str, str], asyncio.Task] = {}
+        self._renders: Dict[str, asyncio.Task] = {}
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.previews_rendered = 0
+        self.evictions = 0
+
+    async def start(self):
+        """Pick up the images cached before a restart"""
+        if not self.enabled:
+            return
+        try:
+            await asyncio.to_thread(self._load)
+        except OSError as e:
+            logger.error(f"ComfyUI image cache unavailable at {self.directory}: {str(e)}")
+            self.enabled = False
+            return
+        if Image is None:
+            logger.warning("Pillow is not installed; ComfyUI image previews fall back to the original")
+        logger.info(f"ComfyUI image cache holds {len(self._images)} image(s), {self.total_bytes} bytes")
+
+    async def close(self):
+        """Cancel the downloads and preview renders still in flight"""
+        tasks = [*self._downloads.values(), *self._renders.values()]
+        for task in tasks:
+            task.cancel()
+        # Interrupted downloads remove their partial file; any other leftovers go on the next start
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def _load(self):
+        os.makedirs(self.directory, exist_ok=True)
+        originals = []
+        previews = {}
+        for entry in os.scandir(self.directory):
+            name, _, ext = entry.name.partition(".")
+            if not entry.is_file():
+                continue
+            if not is_digest(name) or ext.endswith("part"):
+                # Left over from an interrupted download or render
+                os.unlink(entry.path)
+            elif ext.startswith("preview."):
+                previews[name] = entry
+            else:
+                originals.append((entry, name, ext))
+
+        # Oldest access first; the access time is kept in the mtime
+        originals.sort(key=lambda item: item[0].stat().st_mtime)
+        for entry, digest, ext in originals:
+            content_type = mimetypes.guess_type(f"image.{ext}")[0] or "application/octet-stream"
+            image = CachedImage(digest, entry.path, entry.stat().st_size, content_type)
+            image.used_at = 0.0
+            preview = previews.pop(digest, None)
+            if preview is not None:
+                if preview.name.endswith(f".preview.{self.preview_format}"):
+                    image.preview_path = preview.path
+                    image.preview_size = preview.stat().st_size
+                    image.preview_type = PREVIEW_FORMATS[self.preview_format][1]
+                else:
+                    os.unlink(preview.path)
+            self._images[digest] = image
+            self.total_bytes += image.total_size
+        for preview in previews.values():
+            os.unlink(preview.path)
+        self._evict()
+
+    def get(self, digest: str) -> Optional[CachedImage]:
+        """The cached image with this content hash, if any"""
+        image = self._images.get(digest)
+        if image is not None:
+            self._touch(image)
+        return image
+
+    async def fetch(self, filename: str, subfolder: str = "", folder_type: str = "output") -> CachedImage:
+        """The image ComfyUI serves under this name, downloaded on first use.
+
+        Raises ImageNotFoundError when ComfyUI does not have it.
+        """
+        if folder_type == "output":
+            image = self._images.get(self._names.get((subfolder, filename), ""))
+            if image is not None:
+                self.hits += 1
+                self._touch(image)
+                return image
+
+        # Concurrent requests for the same image share one download
+        key = (folder_type, subfolder, filename)
+        task = self._downloads.get(key)
+        if task is None:
+            self.misses += 1
+            task = self._downloads[key] = asyncio.create_task(self._download(filename, subfolder, folder_type))
+            task.add_done_callback(lambda _: self._downloads.pop(key, None))
+        image = await asyncio.shield(task)
+        if folder_type == "output":
+            self._names[(subfolder, filename)] = image.digest
+        return image
+
+    async def _download(self, filename: str, subfolder: str, folder_type: str) -> CachedImage:
+        response = await self.comfyui.open_image(filename, subfolder, folder_type)
+        try:
+            if response.status_code == 404:
+                raise ImageNotFoundError(filename)
+            response.raise_for_status()
+            content_type = (
+                response.headers.get("content-type", "").split(";")[0].strip()
+                or mimetypes.guess_type(filename)[0]
+                or "image/png"
+            )
+            digest = hashlib.sha256()
+            size = 0
+            fd, part_path = tempfile.mkstemp(dir=self.directory, suffix=".part")
+            try:
+                # Streamed to disk, so memory use does not grow with the image;
+                # file writes run in a thread to keep the event loop free
+                with os.fdopen(fd, "wb") as part:
+                    async for chunk in response.aiter_bytes():
+                        digest.update(chunk)
+                        await asyncio.to_thread(part.write, chunk)
+                        size += len(chunk)
+            except BaseException:
+                await asyncio.to_thread(os.unlink, part_path)
+                raise
+        finally:
+            await response.aclose()
+
+        digest = digest.hexdigest()
+        existing = self._images.get(digest)
+        if existing is not None:
+            # The same bytes under another name
+            await asyncio.to_thread(os.unlink, part_path)
+            self._touch(existing)
+            return existing
+
+        ext = mimetypes.guess_extension(content_type) or os.path.splitext(filename)[1] or ".bin"
+        path = os.path.join(self.directory, f"{digest}{ext}")
+        await asyncio.to_thread(os.replace, part_path, path)
+        existing = self._images.get(digest)
+        if existing is not None:
+            # Stored by a concurrent download of the same bytes meanwhile
+            if existing.path != path:
+                await asyncio.to_thread(os.unlink, path)
+            self._touch(existing)
+            return existing
+        image = self._images[digest] = CachedImage(digest, path, size, content_type)
+        self.total_bytes += size
+        self._evict()
+        return image
+
+    async def preview(self, image: CachedImage) -> Tuple[str, str]:
+        """Path and content type of the image's preview, rendered on first use.
+
+        Falls back to the original when Pillow is missing, the image cannot be
+        decoded, or the preview would not be smaller.
+        """
+        if image.preview_path is not None:
+            return image.preview_path, image.preview_type
+        if Image is None:
+            return image.path, image.content_type
+
+        task = self._renders.get(image.digest)
+        if task is None:
+            task = self._renders[image.digest] = asyncio.create_task(self._render(image))
+            task.add_done_callback(lambda _: self._renders.pop(image.digest, None))
+        try:
+            await asyncio.shield(task)
+        except Exception as e:
+            logger.warning(f"Failed to render preview of {image.digest}: {str(e)}")
+        if image.preview_path is None:
+            return image.path, image.content_type
+        return image.preview_path, image.preview_type
+
+    async def _render(self, image: CachedImage):
+        pil_format, content_type = PREVIEW_FORMATS[self.preview_format]
+        path = os.path.join(self.directory, f"{image.digest}.preview.{self.preview_format}")
+        # Decoding and encoding are CPU-bound, so they stay off the event loop
+        size = await asyncio.to_thread(self._render_file, image.path, path, pil_format)
+        self.previews_rendered += 1
+        if image.digest not in self._images:
+            # Evicted while rendering
+            await asyncio.to_thread(os.unlink, path)
+            return
+        if size >= image.size:
+            # Small originals stay as they are; this one is served instead
+            await asyncio.to_thread(os.unlink, path)
+            image.preview_path, image.preview_type = image.path, image.content_type
+            return
+        image.preview_path = path
+        image.preview_size = size
+        image.preview_type = content_type
+        self.total_bytes += size
+        self._evict()
+
+    def _render_file(self, source: str, path: str, pil_format: str) -> int:
+        part_path = f"{path}.part"
+        with Image.open(source) as img:
+            img.thumbnail((self.preview_size, self.preview_size))
+            if pil_format == "JPEG" and img.mode != "RGB":
+                img = img.convert("RGB")
+            elif img.mode not in ("RGB", "RGBA"):
+                img = img.convert("RGBA")
+            img.save(part_path, pil_format, quality=self.preview_quality)
+        os.replace(part_path, path)
+        return os.path.getsize(path)
+
+    def _touch(self, image: CachedImage):
+        image.used_at = time.monotonic()
+        self._images.move_to_end(image.digest)
+        try:
+            # Keeps the LRU order across restarts
+            os.utime(image.path)
+        except OSError:
+            pass
+
+    def _evict(self):
+        # Images still being served are kept even if that leaves the cache over its limit
+        in_use_since = time.monotonic() - IN_USE_SECONDS
+        while self.total_bytes > self.max_bytes and self._images:
+            image = next(iter(self._images.values()))
+            if image.used_at > in_use_since:
+                break
+            self._images.popitem(last=False)
+            self.total_bytes -= image.total_size
+            self.evictions += 1
+            for path in {image.path, image.preview_path}:
+                if path is not None:
+                    try:
+                        os.unlink(path)
+                    except FileNotFoundError:
+                        pass
+        if len(self._names) > 4 * len(self._images) + 1024:
+            self._names = {key: digest for key, digest in self._names.items() if digest in self._images}
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "images": len(self._images),
+            "bytes": self.total_bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "previews": Image is not None,
+            "previews_rendered": self.previews_rendered,
+            "evictions": self.evictions,
+        }
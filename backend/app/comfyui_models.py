@@ -0,0 +1,174 @@
+"""
+In-memory index of the models ComfyUI can load
+
+The index keeps the model names extracted from ComfyUI's loader nodes
+together with the serialized /comfyui/models body, so requests are answered
+from memory. It is refreshed in the background every
+COMFYUI_MODELS_TTL_SECONDS, and straight away when the comfyui_models table
+changes or comfyui-init finishes downloading; both are announced on the
+comfyui_models NOTIFY channel, so every replica hears about them.
+"""
+import asyncio
+import asyncpg
+import json
+import logging
+import os
+import time
+from typing import Dict, Any, List, Optional
+
+from comfyui_client import ComfyUIClient
+from db import DatabasePool
+from response_cache import CachedResponse, make_etag
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = "comfyui_models"
+
+
+class ComfyUIModelIndex:
+    """Cached, background-refreshed list of the models ComfyUI can load"""
+
+    def __init__(
+        self,
+        comfyui: ComfyUIClient,
+        db: DatabasePool,
+        ttl: Optional[float] = None,
+        retry_delay: float = 30.0,
+        reconnect_delay: float = 5.0,
+    ):
+        self.comfyui = comfyui
+        self.db = db
+        self.ttl = ttl if ttl is not None else float(os.getenv("COMFYUI_MODELS_TTL_SECONDS", "300"))
+        self.retry_delay = retry_delay
+        self.reconnect_delay = reconnect_delay
+        self.models: Dict[str, List[str]] = {}
+        self._entry: Optional[CachedResponse] = None
+        self._refreshed_at: Optional[float] = None
+        self._invalidated = False
+        self._wake = asyncio.Event()
+        self._refreshing: Optional[asyncio.Task] = None
+        self._loop_task: Optional[asyncio.Task] = None
+        self._reconnect_task: Optional[asyncio.Task] = None
+        self._conn: Optional[asyncpg.Connection] = None
+        self._closing = False
+        self.refreshes = 0
+        self.failures = 0
+        self.invalidations = 0
+
+    async def start(self):
+        """Listen for invalidations and start the refresh loop, which fills the index"""
+        self._closing = False
+        try:
+            await self._connect()
+        except Exception as e:
+            logger.error(f"ComfyUI model listener failed to connect: {str(e)}")
+            self._reconnect_task = asyncio.create_task(self._reconnect())
+        self._loop_task = asyncio.create_task(self._refresh_loop())
+
+    async def close(self):
+        self._closing = True
+        for task in (self._loop_task, self._reconnect_task, self._refreshing):
+            if task and not task.done():
+                task.cancel()
+        if self._conn is not None and not self._conn.is_closed():
+            await self._conn.close()
+        self._conn = None
+
+    async def _connect(self):
+        # LISTEN needs a connection of its own: pooled connections drop their listeners
+        self._conn = await asyncpg.connect(self.db.dsn)
+        await self._conn.add_listener(CHANNEL, self._on_notify)
+        self._conn.add_termination_listener(self._on_terminated)
+
+    def _on_terminated(self, conn: asyncpg.Connection):
+        if self._closing:
+            return
+        logger.warning("ComfyUI model listener connection lost, reconnecting")
+        self._reconnect_task = asyncio.create_task(self._reconnect())
+
+    async def _reconnect(self):
+        while not self._closing:
+            await asyncio.sleep(self.reconnect_delay)
+            try:
+                await self._connect()
+                # Changes made while disconnected went unannounced
+                self.invalidate("listener reconnected")
+                return
+            except Exception as e:
+                logger.error(f"ComfyUI model listener reconnect failed: {str(e)}")
+
+    def _on_notify(self, conn, pid, channel, payload: str):
+        self.invalidate(payload or "notification")
+
+    def invalidate(self, reason: str):
+        """Refresh as soon as possible; until then the next request waits for fresh data"""
+        logger.info(f"ComfyUI model index invalidated ({reason})")
+        self.invalidations += 1
+        self._invalidated = True
+        self._wake.set()
+
+    async def _refresh_loop(self):
+        while True:
+            try:
+                await self.refresh()
+                delay = self.ttl
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                delay = self.retry_delay
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=delay)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+
+    async def refresh(self) -> CachedResponse:
+        """Rebuild the index; concurrent callers share one rebuild"""
+        if self._refreshing is None or self._refreshing.done():
+            self._refreshing = asyncio.create_task(self._rebuild())
+        return await asyncio.shield(self._refreshing)
+
+    async def _rebuild(self) -> CachedResponse:
+        # Invalidations arriving during the rebuild need another one
+        self._invalidated = False
+        try:
+            models = await self.comfyui.get_models()
+        except Exception as e:
+            self.failures += 1
+            logger.error(f"Failed to refresh ComfyUI models: {str(e)}")
+            raise
+        body = json.dumps({"success": True, "models": models}).encode()
+        self.models = models
+        self._entry = CachedResponse(body, make_etag(body))
+        self._refreshed_at = time.monotonic()
+        self.refreshes += 1
+        return self._entry
+
+    async def get(self) -> CachedResponse:
+        """The serialized /comfyui/models body and its ETag.
+
+        Served from memory unless the index is empty or invalidated. If a
+        refresh after an invalidation fails, the last good index is served.
+        """
+        if self._entry is not None and not self._invalidated:
+            return self._entry
+        try:
+            return await self.refresh()
+        except Exception:
+            if self._entry is None:
+                raise
+            return self._entry
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "ttl": self.ttl,
+            "age_seconds": (
+                round(time.monotonic() - self._refreshed_at, 1) if self._refreshed_at is not None else None
+            ),
+            "invalidated": self._invalidated,
+            "listening": self._conn is not None and not self._conn.is_closed(),
+            "refreshes": self.refreshes,
+            "failures": self.failures,
+            "invalidations": self.invalidations,
+            "models": {kind: len(names) for kind, names in self.models.items()},
+        }
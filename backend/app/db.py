@@ -0,0 +1,101 @@
+"""
+Shared asyncpg connection pool for the backend
+"""
+import asyncpg
+import os
+import logging
+from contextlib import asynccontextmanager
+from typing import Dict, Any, Optional, AsyncIterator
+
+import tracing
+
+logger = logging.getLogger(__name__)
+
+
+class DatabasePool:
+    """Process-wide asyncpg pool created once in the FastAPI lifespan"""
+
+    def __init__(
+        self,
+        dsn: Optional[str] = None,
+        min_size: Optional[int] = None,
+        max_size: Optional[int] = None,
+        max_inactive_lifetime: Optional[float] = None,
+        command_timeout: Optional[float] = None,
+    ):
+        self.dsn = dsn or os.getenv("DATABASE_URL")
+        if not self.dsn:
+            raise ValueError("DATABASE_URL environment variable is required")
+
+        self.min_size = min_size if min_size is not None else int(os.getenv("DATABASE_POOL_MIN_SIZE", "2"))
+        self.max_size = max_size if max_size is not None else int(os.getenv("DATABASE_POOL_MAX_SIZE", "10"))
+        self.max_inactive_lifetime = (
+            max_inactive_lifetime
+            if max_inactive_lifetime is not None
+            else float(os.getenv("DATABASE_POOL_MAX_INACTIVE_LIFETIME", "300"))
+        )
+        self.command_timeout = (
+            command_timeout
+            if command_timeout is not None
+            else float(os.getenv("DATABASE_POOL_COMMAND_TIMEOUT", "30"))
+        )
+        self._pool: Optional[asyncpg.Pool] = None
+
+    @property
+    def started(self) -> bool:
+        return self._pool is not None
+
+    async def start(self):
+        """Create the pool (idempotent)"""
+        if self._pool is not None:
+            return
+        self._pool = await asyncpg.create_pool(
+            self.dsn,
+            min_size=self.min_size,
+            max_size=self.max_size,
+            max_inactive_connection_lifetime=self.max_inactive_lifetime,
+            command_timeout=self.command_timeout,
+            init=self._init_connection,
+        )
+        logger.info(f"Database pool started (min={self.min_size}, max={self.max_size})")
+
+    async def _init_connection(self, conn: asyncpg.Connection):
+        tracing.instrument_connection(conn)
+
+    async def close(self):
+        """Close the pool, waiting for acquired connections to be released"""
+        if self._pool is None:
+            return
+        pool, self._pool = self._pool, None
+        await pool.close()
+        logger.info("Database pool closed")
+
+    @asynccontextmanager
+    async def acquire(self) -> AsyncIterator[asyncpg.Connection]:
+        """Borrow a connection from the pool for the duration of the block"""
+        if self._pool is None:
+            raise RuntimeError("Database pool is not started")
+        async with self._pool.acquire() as conn:
+            yield conn
+
+    def stats(self) -> Dict[str, Any]:
+        """Report current pool utilisation"""
+        if self._pool is None:
+            return {
+                "started": False,
+                "min_size": self.min_size,
+                "max_size": self.max_size,
+                "size": 0,
+                "idle": 0,
+                "in_use": 0,
+            }
+        size = self._pool.get_size()
+        idle = self._pool.get_idle_size()
+        return {
+            "started": True,
+            "min_size": self._pool.get_min_size(),
+            "max_size": self._pool.get_max_size(),
+            "size": size,
+            "idle": idle,
+            "in_use": size - idle,
+        }
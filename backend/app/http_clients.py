@@ -0,0 +1,145 @@
+"""
+Shared, long-lived HTTP clients for upstream services
+
+Each upstream (the deep researcher, n8n, ComfyUI, Weaviate) gets one
+httpx.AsyncClient with its own connection pool limits and timeouts. The
+clients are opened in the FastAPI lifespan and reused by every request, so
+connections are kept alive instead of being set up for each call.
+
+Every client sends its requests through a ResilientTransport, so each
+upstream has its own circuit breaker and all of them share one retry budget.
+Calls are timed per upstream for /metrics, and each attempt is traced.
+"""
+import httpx
+import logging
+import os
+from typing import Dict, Any, Optional
+
+from circuit_breaker import CircuitBreaker, RetryBudget, ResilientTransport
+from metrics import InstrumentedTransport
+from tracing import TracedTransport
+
+logger = logging.getLogger(__name__)
+
+# Settings for upstreams without an entry in UPSTREAM_DEFAULTS
+DEFAULT_SETTINGS: Dict[str, float] = {
+    "max_connections": 20, "max_keepalive": 10, "connect_timeout": 5.0, "timeout": 30.0,
+}
+
+# Per-upstream defaults; each value can be overridden with
+# HTTP_<UPSTREAM>_MAX_CONNECTIONS, _MAX_KEEPALIVE, _CONNECT_TIMEOUT and _TIMEOUT
+UPSTREAM_DEFAULTS: Dict[str, Dict[str, float]] = {
+    # Log streams stay open for the whole research run
+    "research": {"max_connections": 50, "max_keepalive": 20, "connect_timeout": 5.0, "timeout": 300.0},
+    "n8n": {"max_connections": 20, "max_keepalive": 10, "connect_timeout": 5.0, "timeout": 30.0},
+    "comfyui": {"max_connections": 20, "max_keepalive": 10, "connect_timeout": 5.0, "timeout": 60.0},
+    "weaviate": {"max_connections": 20, "max_keepalive": 10, "connect_timeout": 2.0, "timeout": 3.0},
+}
+
+
+def _http2_available() -> bool:
+    try:
+        import h2  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+class HttpClientRegistry:
+    """One pooled httpx.AsyncClient per upstream, created on first use or in start()"""
+
+    def __init__(
+        self,
+        http2: Optional[bool] = None,
+        keepalive_expiry: Optional[float] = None,
+    ):
+        http2 = (
+            http2 if http2 is not None
+            else os.getenv("HTTP_CLIENT_HTTP2", "false").lower() == "true"
+        )
+        if http2 and not _http2_available():
+            logger.warning("HTTP/2 requested but the h2 package is not installed; using HTTP/1.1")
+            http2 = False
+        self.http2 = http2
+        self.keepalive_expiry = (
+            keepalive_expiry if keepalive_expiry is not None
+            else float(os.getenv("HTTP_CLIENT_KEEPALIVE_EXPIRY", "30"))
+        )
+        self._clients: Dict[str, httpx.AsyncClient] = {}
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self.retry_budget = RetryBudget()
+
+    def settings(self, upstream: str) -> Dict[str, float]:
+        """Pool and timeout settings for `upstream`, with environment overrides applied"""
+        defaults = UPSTREAM_DEFAULTS.get(upstream, DEFAULT_SETTINGS)
+        prefix = f"HTTP_{upstream.upper()}_"
+        return {
+            "max_connections": int(os.getenv(f"{prefix}MAX_CONNECTIONS", str(defaults["max_connections"]))),
+            "max_keepalive": int(os.getenv(f"{prefix}MAX_KEEPALIVE", str(defaults["max_keepalive"]))),
+            "connect_timeout": float(os.getenv(f"{prefix}CONNECT_TIMEOUT", str(defaults["connect_timeout"]))),
+            "timeout": float(os.getenv(f"{prefix}TIMEOUT", str(defaults["timeout"]))),
+        }
+
+    def breaker(self, upstream: str) -> CircuitBreaker:
+        """The circuit breaker for `upstream`; it outlives client restarts"""
+        breaker = self._breakers.get(upstream)
+        if breaker is None:
+            breaker = self._breakers[upstream] = CircuitBreaker(upstream)
+        return breaker
+
+    def get(self, upstream: str) -> httpx.AsyncClient:
+        """The shared client for `upstream`"""
+        client = self._clients.get(upstream)
+        if client is None or client.is_closed:
+            settings = self.settings(upstream)
+            # Pool limits belong to the transport once a custom one is passed in
+            transport = httpx.AsyncHTTPTransport(
+                http2=self.http2,
+                limits=httpx.Limits(
+                    max_connections=settings["max_connections"],
+                    max_keepalive_connections=settings["max_keepalive"],
+                    keepalive_expiry=self.keepalive_expiry,
+                ),
+            )
+            client = httpx.AsyncClient(
+                transport=InstrumentedTransport(
+                    ResilientTransport(
+                        TracedTransport(transport, upstream), self.breaker(upstream), self.retry_budget
+                    ),
+                    upstream,
+                ),
+                timeout=httpx.Timeout(settings["timeout"], connect=settings["connect_timeout"]),
+            )
+            self._clients[upstream] = client
+        return client
+
+    async def start(self):
+        """Open a client for every known upstream"""
+        for upstream in UPSTREAM_DEFAULTS:
+            self.get(upstream)
+        logger.info(f"HTTP clients ready for {', '.join(self._clients)} (http2={self.http2})")
+
+    async def close(self):
+        """Close every client and its pooled connections"""
+        clients, self._clients = self._clients, {}
+        for client in clients.values():
+            await client.aclose()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "http2": self.http2,
+            "keepalive_expiry": self.keepalive_expiry,
+            "upstreams": {
+                upstream: {
+                    **self.settings(upstream),
+                    "open": upstream in self._clients,
+                    "circuit": self.breaker(upstream).stats(),
+                }
+                for upstream in UPSTREAM_DEFAULTS
+            },
+            "retry_budget": self.retry_budget.stats(),
+        }
+
+    def circuits(self, *upstreams: str) -> Dict[str, Dict[str, Any]]:
+        """Breaker state for the given upstreams"""
+        return {upstream: self.breaker(upstream).stats() for upstream in upstreams}
@@ -1,19 +1,67 @@
-from fastapi import FastAPI, Depends, HTTPException, status, UploadFile, File
+from fastapi import FastAPI, Depends, HTTPException, status, UploadFile, File, Header, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, Response, StreamingResponse, FileResponse
 from pydantic import BaseModel
 from storage3 import SyncStorageClient as StorageClient
 from typing import Optional, cast, Dict, Any, List
+from contextlib import asynccontextmanager
+from uuid import UUID
 import os
+import json
 import httpx
 
+from db import DatabasePool
+from http_clients import HttpClientRegistry, UPSTREAM_DEFAULTS
+from circuit_breaker import CircuitOpenError
+from metrics import MetricsMiddleware, observe_upstream
+import metrics
+import tracing
+from tracing import TracingMiddleware
 from n8n_client import N8nClient
 from research_service import ResearchService
+from research_events import ResearchEventBroker, format_sse
+from research_worker import ResearchWorkerPool
+from research_scheduler import ResearchAdmissionError
 from comfyui_client import ComfyUIClient
+from comfyui_events import ComfyUIEventHub
+from comfyui_models import ComfyUIModelIndex
+from comfyui_images import ComfyUIImageCache, ImageNotFoundError, is_digest
+from response_cache import ImmutableResponseCache, CachedResponse, IMMUTABLE_CACHE_CONTROL, etag_matches
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Create shared resources on startup and release them on shutdown"""
+    # Before the pool, so its connections get the query tracer
+    tracing.start()
+    await db_pool.start()
+    await http_clients.start()
+    await research_service.log_writer.start()
+    await research_events.start()
+    await research_workers.start()
+    await comfyui_events.start()
+    await comfyui_models.start()
+    await comfyui_images.start()
+    try:
+        yield
+    finally:
+        await comfyui_images.close()
+        await comfyui_models.close()
+        await comfyui_events.close()
+        await research_workers.stop()
+        # Write out buffered research logs while the pool is still open
+        await research_service.log_writer.close()
+        await research_events.close()
+        await db_pool.close()
+        await http_clients.close()
+        tracing.shutdown()
+
 
 app = FastAPI(
     title="GenAI Vanilla Stack Backend",
     description="Backend API for GenAI Vanilla Stack",
     version="0.1.0",
+    lifespan=lifespan,
 )
 
 # Add CORS middleware
@@ -23,11 +71,32 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "ETag"],
 )
+app.add_middleware(MetricsMiddleware)
+app.add_middleware(TracingMiddleware)
+
+@app.exception_handler(CircuitOpenError)
+async def circuit_open_handler(request: Request, exc: CircuitOpenError):
+    """Upstream calls rejected by an open circuit become a 503 the client can retry"""
+    return JSONResponse(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        content={"detail": str(exc)},
+        headers={"Retry-After": str(exc.retry_after)},
+    )
+
+
+def require_upstream(upstream: str):
+    """Dependency that fails fast while `upstream`'s circuit is open"""
+    async def check():
+        http_clients.breaker(upstream).check()
+    return check
+
 
 # Get environment variables
 KONG_URL = os.getenv("KONG_URL")
 SERVICE_KEY = os.getenv("SUPABASE_SERVICE_KEY")
+RESEARCH_STATUS_BATCH_MAX = int(os.getenv("RESEARCH_STATUS_BATCH_MAX", "500"))
 
 if not KONG_URL:
     raise ValueError("KONG_URL environment variable is required")
@@ -68,6 +137,44 @@ async def health_check():
     )
 
 
+@app.get("/health/db")
+async def database_pool_stats():
+    """Report shared database pool utilisation"""
+    return {
+        "service": "database",
+        "pool": db_pool.stats(),
+    }
+
+
+@app.get("/health/http")
+async def http_client_stats():
+    """Report shared upstream HTTP client settings, circuit state and retry budget"""
+    return {
+        "service": "http",
+        "clients": http_clients.stats(),
+    }
+
+
+@app.get("/metrics", include_in_schema=False)
+async def prometheus_metrics():
+    """Prometheus scrape endpoint"""
+    try:
+        queue = await research_service.get_queue_stats()
+    except Exception:
+        queue = None
+    metrics.update_gauges(
+        db_pool=db_pool.stats(),
+        circuits={upstream: http_clients.breaker(upstream).state for upstream in UPSTREAM_DEFAULTS},
+        background={
+            "research_sessions": research_workers.busy,
+            "event_subscribers": research_events.subscriber_count,
+            "research_log_buffer": research_service.log_writer.buffered,
+        },
+        queue=queue,
+    )
+    return Response(content=metrics.render(), media_type=metrics.CONTENT_TYPE_LATEST)
+
+
 @app.get("/")
 async def root():
     """Root endpoint that returns a welcome message"""
@@ -77,14 +184,37 @@ async def root():
     }
 
 
+# Initialize shared database pool (opened in the lifespan handler)
+db_pool = DatabasePool()
+
+# Shared keep-alive HTTP clients for upstream services (opened in the lifespan handler)
+http_clients = HttpClientRegistry()
+
 # Initialize n8n client
-n8n_client = N8nClient()
+n8n_client = N8nClient(http=http_clients)
 
 # Initialize research service
-research_service = ResearchService()
+research_service = ResearchService(db_pool, http=http_clients)
+
+# Serialized results and logs of completed research sessions
+research_responses = ImmutableResponseCache()
+
+# Shared LISTEN/NOTIFY fan-out for research progress streams
+research_events = ResearchEventBroker(research_service)
 
-# Initialize ComfyUI client
-comfyui_client = ComfyUIClient()
+# Queue workers; newly queued sessions wake them through the event listener
+research_workers = ResearchWorkerPool(research_service)
+research_events.add_status_callback(research_workers.on_status_change)
+
+# Initialize ComfyUI client, notified of completions over ComfyUI's websocket
+comfyui_events = ComfyUIEventHub()
+comfyui_client = ComfyUIClient(http=http_clients, events=comfyui_events)
+
+# Model inventory served from memory, refreshed in the background
+comfyui_models = ComfyUIModelIndex(comfyui_client, db_pool)
+
+# Generated images kept on disk by content hash, with downscaled previews
+comfyui_images = ComfyUIImageCache(comfyui_client)
 
 
 class WorkflowExecuteRequest(BaseModel):
@@ -115,7 +245,7 @@ class WorkflowExecutionResponse(BaseModel):
     data: Optional[Dict[str, Any]] = None
 
 
-@app.get("/workflows", response_model=List[WorkflowResponse])
+@app.get("/workflows", response_model=List[WorkflowResponse], dependencies=[Depends(require_upstream("n8n"))])
 async def list_workflows():
     """List all n8n workflows"""
     try:
@@ -128,7 +258,7 @@ async def list_workflows():
         )
 
 
-@app.get("/workflows/{workflow_id}", response_model=WorkflowResponse)
+@app.get("/workflows/{workflow_id}", response_model=WorkflowResponse, dependencies=[Depends(require_upstream("n8n"))])
 async def get_workflow(workflow_id: str):
     """Get a specific n8n workflow by ID"""
     try:
@@ -151,7 +281,7 @@ async def get_workflow(workflow_id: str):
         )
 
 
-@app.post("/workflows/{workflow_id}/execute", response_model=WorkflowExecutionResponse)
+@app.post("/workflows/{workflow_id}/execute", response_model=WorkflowExecutionResponse, dependencies=[Depends(require_upstream("n8n"))])
 async def execute_workflow(workflow_id: str, request: WorkflowExecuteRequest):
     """Execute a specific n8n workflow by ID"""
     try:
@@ -190,14 +320,15 @@ async def upload_file(file: UploadFile = File(...), bucket: str = "default"):
         content = await file.read()
 
         # Upload to storage
-        result = storage_client.upload(
-            bucket=bucket,
-            path=filename,
-            file=content,
-            file_options={"content-type": file.content_type}
-            if file.content_type
-            else None,
-        )
+        with observe_upstream("storage", "POST"):
+            result = storage_client.upload(
+                bucket=bucket,
+                path=filename,
+                file=content,
+                file_options={"content-type": file.content_type}
+                if file.content_type
+                else None,
+            )
 
         # Get public URL
         url = storage_client.get_public_url(bucket, filename)
@@ -216,6 +347,19 @@ class ResearchStartRequest(BaseModel):
     max_loops: Optional[int] = 3
     search_api: Optional[str] = "duckduckgo"
     user_id: Optional[str] = None
+    priority: Optional[str] = "normal"  # 'high', 'normal' or 'low'
+    bypass_cache: Optional[bool] = False  # Always run fresh research
+
+
+class ResearchBatchRequest(BaseModel):
+    """Request model for starting a batch of research sessions"""
+    queries: List[str]
+    max_loops: Optional[int] = 3
+    search_api: Optional[str] = "duckduckgo"
+    user_id: Optional[str] = None
+    priority: Optional[str] = "normal"
+    max_concurrency: Optional[int] = None  # Sessions of this batch run at once
+    bypass_cache: Optional[bool] = False
 
 
 class ResearchResponse(BaseModel):
@@ -234,12 +378,24 @@ class ResearchSessionResponse(BaseModel):
     max_loops: int
     search_api: str
     user_id: Optional[str] = None
+    leader_session_id: Optional[str] = None  # Set when coalesced onto an identical session
     created_at: Optional[str] = None
     started_at: Optional[str] = None
     completed_at: Optional[str] = None
     error_message: Optional[str] = None
 
 
+class ResearchStatusBatchRequest(BaseModel):
+    """Request model for looking up many research sessions at once"""
+    session_ids: List[str]
+
+
+class ResearchStatusBatchResponse(BaseModel):
+    """Response model for multi-session status lookups"""
+    sessions: Dict[str, ResearchSessionResponse]
+    missing: List[str]
+
+
 class ResearchResultResponse(BaseModel):
     """Response model for research results"""
     session_id: str
@@ -262,6 +418,14 @@ class ResearchLogResponse(BaseModel):
     timestamp: str
 
 
+def immutable_response(cached: CachedResponse, if_none_match: Optional[str]) -> Response:
+    """Serve a cached body that will never change, or 304 if the client already has it"""
+    headers = {"ETag": cached.etag, "Cache-Control": IMMUTABLE_CACHE_CONTROL}
+    if etag_matches(if_none_match, cached.etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return Response(content=cached.body, media_type="application/json", headers=headers)
+
+
 # Research API Endpoints
 @app.post("/research/start", response_model=ResearchResponse)
 async def start_research(request: ResearchStartRequest):
@@ -271,9 +435,22 @@ async def start_research(request: ResearchStartRequest):
             query=request.query,
             max_loops=request.max_loops or 3,
             search_api=request.search_api or "duckduckgo",
-            user_id=request.user_id
+            user_id=request.user_id,
+            priority=request.priority or "normal",
+            bypass_cache=bool(request.bypass_cache)
         )
         return ResearchResponse(**result)
+    except ResearchAdmissionError as e:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail=str(e),
+            headers={"Retry-After": str(e.retry_after)}
+        )
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -281,6 +458,35 @@ async def start_research(request: ResearchStartRequest):
         )
 
 
+@app.post("/research/status:batch", response_model=ResearchStatusBatchResponse)
+async def get_research_statuses(request: ResearchStatusBatchRequest):
+    """Get the status of many research sessions with a single query"""
+    if len(request.session_ids) > RESEARCH_STATUS_BATCH_MAX:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"At most {RESEARCH_STATUS_BATCH_MAX} session IDs can be looked up at once"
+        )
+    try:
+        session_ids = list(dict.fromkeys(str(UUID(session_id)) for session_id in request.session_ids))
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid session ID"
+        )
+
+    try:
+        sessions = await research_service.get_research_statuses(session_ids)
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to get research statuses: {str(e)}"
+        )
+    return ResearchStatusBatchResponse(
+        sessions=sessions,
+        missing=[session_id for session_id in session_ids if session_id not in sessions]
+    )
+
+
 @app.get("/research/{session_id}/status", response_model=ResearchSessionResponse)
 async def get_research_status(session_id: str):
     """Get the status of a research session"""
@@ -301,9 +507,32 @@ async def get_research_status(session_id: str):
         )
 
 
+def parse_session_id(session_id: str) -> str:
+    """Normalize a session ID path parameter, so each session has one response cache key"""
+    try:
+        return str(UUID(session_id))
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid session ID"
+        )
+
+
 @app.get("/research/{session_id}/result", response_model=ResearchResultResponse)
-async def get_research_result(session_id: str):
-    """Get the result of a completed research session"""
+async def get_research_result(
+    session_id: str,
+    if_none_match: Optional[str] = Header(None, alias="If-None-Match"),
+):
+    """Get the result of a completed research session.
+
+    Completed results never change, so they are served from memory with a
+    strong ETag and immutable caching headers once they have been read.
+    """
+    session_id = parse_session_id(session_id)
+    cached = research_responses.get(("result", session_id))
+    if cached:
+        return immutable_response(cached, if_none_match)
+
     try:
         result = await research_service.get_research_result(session_id)
         if not result:
@@ -311,7 +540,7 @@ async def get_research_result(session_id: str):
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail=f"Research result for session {session_id} not found"
             )
-        return ResearchResultResponse(**result)
+        response = ResearchResultResponse(**result)
     except HTTPException:
         raise
     except Exception as e:
@@ -320,16 +549,21 @@ async def get_research_result(session_id: str):
             detail=f"Failed to get research result: {str(e)}"
         )
 
+    if result["status"] != "completed":
+        return response
+    cached = research_responses.put(("result", session_id), response.model_dump_json().encode())
+    return immutable_response(cached, if_none_match)
+
 
 @app.post("/research/{session_id}/cancel", response_model=ResearchResponse)
 async def cancel_research(session_id: str):
-    """Cancel a running research session"""
+    """Cancel a queued or running research session"""
     try:
         success = await research_service.cancel_research(session_id)
         if not success:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
-                detail=f"Cannot cancel research session {session_id} - session not found or not running"
+                detail=f"Cannot cancel research session {session_id} - session not found or already finished"
             )
         return ResearchResponse(
             session_id=session_id,
@@ -345,33 +579,195 @@ async def cancel_research(session_id: str):
         )
 
 
+@app.get("/research/{session_id}/events")
+async def stream_research_events(
+    session_id: str,
+    last_event_id: Optional[str] = Header(None, alias="Last-Event-ID"),
+):
+    """Stream research status changes and log lines as server-sent events"""
+    try:
+        session_id = str(UUID(session_id))
+        resume_from = int(last_event_id) if last_event_id else None
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid session ID or Last-Event-ID"
+        )
+
+    try:
+        session = await research_service.get_research_status(session_id)
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to get research status: {str(e)}"
+        )
+    if not session:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Research session {session_id} not found"
+        )
+
+    return StreamingResponse(
+        research_events.stream(session_id, resume_from),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@app.post("/research/batch")
+async def start_research_batch(request: ResearchBatchRequest):
+    """Queue one research session per query, run with bounded concurrency"""
+    try:
+        return await research_service.start_batch(
+            queries=request.queries,
+            max_loops=request.max_loops or 3,
+            search_api=request.search_api or "duckduckgo",
+            user_id=request.user_id,
+            priority=request.priority or "normal",
+            max_concurrency=request.max_concurrency,
+            bypass_cache=bool(request.bypass_cache)
+        )
+    except ResearchAdmissionError as e:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail=str(e),
+            headers={"Retry-After": str(e.retry_after)}
+        )
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to start research batch: {str(e)}"
+        )
+
+
+def parse_batch_id(batch_id: str) -> str:
+    """Normalize a batch ID path parameter, rejecting anything but a UUID"""
+    try:
+        return str(UUID(batch_id))
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid batch ID"
+        )
+
+
+@app.get("/research/batch/{batch_id}")
+async def get_research_batch(batch_id: str):
+    """Get the aggregate status of a research batch and each of its sessions"""
+    batch_id = parse_batch_id(batch_id)
+    try:
+        batch = await research_service.get_batch_status(batch_id)
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to get research batch: {str(e)}"
+        )
+    if not batch:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Research batch {batch_id} not found"
+        )
+    return batch
+
+
+@app.get("/research/batch/{batch_id}/results", response_model=List[ResearchResultResponse])
+async def get_research_batch_results(batch_id: str):
+    """Get the results of a batch's completed sessions, in query order"""
+    batch_id = parse_batch_id(batch_id)
+    try:
+        return await research_service.get_batch_results(batch_id)
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to get research batch results: {str(e)}"
+        )
+
+
+@app.get("/research/batch/{batch_id}/events")
+async def stream_research_batch_events(batch_id: str):
+    """Stream a batch's session status changes and each result as it completes"""
+    batch_id = parse_batch_id(batch_id)
+    try:
+        batch = await research_service.get_batch_status(batch_id)
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to get research batch: {str(e)}"
+        )
+    if not batch:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Research batch {batch_id} not found"
+        )
+
+    return StreamingResponse(
+        research_events.stream_batch(batch_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 @app.get("/research/{session_id}/logs", response_model=List[ResearchLogResponse])
-async def get_research_logs(session_id: str):
-    """Get logs for a research session"""
+async def get_research_logs(
+    session_id: str,
+    if_none_match: Optional[str] = Header(None, alias="If-None-Match"),
+):
+    """Get logs for a research session; a completed session's log is cached like its result"""
+    session_id = parse_session_id(session_id)
+    cached = research_responses.get(("logs", session_id))
+    if cached:
+        return immutable_response(cached, if_none_match)
+
     try:
-        logs = await research_service.get_research_logs(session_id)
-        return [ResearchLogResponse(**log) for log in logs]
+        # Read the status first: logs read after the session completed are final
+        session = await research_service.get_research_status(session_id)
+        logs = [ResearchLogResponse(**log) for log in await research_service.get_research_logs(session_id)]
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Failed to get research logs: {str(e)}"
         )
 
+    if not session or session["status"] != "completed":
+        return logs
+    body = json.dumps([log.model_dump() for log in logs]).encode()
+    cached = research_responses.put(("logs", session_id), body)
+    return immutable_response(cached, if_none_match)
+
 
 @app.get("/research/sessions", response_model=List[ResearchSessionResponse])
 async def list_research_sessions(
+    response: Response,
     user_id: Optional[str] = None,
     limit: int = 50,
-    offset: int = 0
+    offset: int = 0,
+    cursor: Optional[str] = None
 ):
-    """List research sessions"""
+    """List research sessions, newest first.
+
+    When more sessions follow, the X-Next-Cursor response header carries the
+    token to pass as `cursor` for the next page (`offset` is ignored then).
+    """
     try:
-        sessions = await research_service.list_user_sessions(
+        page = await research_service.list_user_sessions(
             user_id=user_id,
-            limit=min(limit, 100),  # Cap at 100
-            offset=max(offset, 0)   # Ensure non-negative
+            limit=min(max(limit, 1), 100),  # Cap at 100
+            offset=max(offset, 0),          # Ensure non-negative
+            cursor=cursor
+        )
+        if page["next_cursor"]:
+            response.headers["X-Next-Cursor"] = page["next_cursor"]
+        return [ResearchSessionResponse(**session) for session in page["sessions"]]
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
         )
-        return [ResearchSessionResponse(**session) for session in sessions]
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -379,11 +775,37 @@ async def list_research_sessions(
         )
 
 
+@app.get("/research/queue")
+async def get_research_queue_stats():
+    """Research queue depth, wait times and scheduling limits"""
+    try:
+        stats = await research_service.get_queue_stats()
+        stats["workers"] = research_workers.stats()
+        return stats
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to get research queue stats: {str(e)}"
+        )
+
+
+@app.get("/research/cache")
+async def get_research_cache_stats():
+    """Research result and response cache hit/miss counters"""
+    stats = research_service.get_cache_stats()
+    stats["responses"] = research_responses.stats()
+    return stats
+
+
 @app.get("/research/health")
 async def research_health_check():
     """Health check for research service"""
     try:
         health = await research_service.health_check()
+        health["workers"] = research_workers.stats()
+        health["cache"] = research_service.get_cache_stats()
+        health["cache"]["responses"] = research_responses.stats()
+        health["circuits"] = http_clients.circuits("research", "weaviate")
         return {
             "service": "research",
             "status": "healthy" if health["database"] == "healthy" else "degraded",
@@ -421,6 +843,7 @@ class ComfyUIResponse(BaseModel):
     """Response model for ComfyUI operations"""
     success: bool
     prompt_id: Optional[str] = None
+    # Only set when the prompt was queued under a client id of its own
     client_id: Optional[str] = None
     message: Optional[str] = None
     data: Optional[Dict[str, Any]] = None
@@ -432,31 +855,41 @@ class ComfyUIResponse(BaseModel):
 async def comfyui_health_check():
     """Health check for ComfyUI service"""
     try:
-        async with ComfyUIClient() as client:
-            health = await client.health_check()
-            return {
-                "service": "comfyui",
-                "status": health.get("status", "unknown"),
-                "details": health
-            }
+        # While the circuit is open the probe is rejected without touching ComfyUI
+        health = await comfyui_client.health_check()
+        return {
+            "service": "comfyui",
+            "status": health.get("status", "unknown"),
+            "details": health,
+            "circuit": http_clients.breaker("comfyui").stats(),
+            "events": comfyui_events.stats(),
+            "models": comfyui_models.stats(),
+            "images": comfyui_images.stats()
+        }
     except Exception as e:
         return {
             "service": "comfyui",
             "status": "unhealthy", 
-            "error": str(e)
+            "error": str(e),
+            "circuit": http_clients.breaker("comfyui").stats(),
+            "events": comfyui_events.stats(),
+            "models": comfyui_models.stats(),
+            "images": comfyui_images.stats()
         }
 
 
 @app.get("/comfyui/models")
-async def get_comfyui_models():
-    """Get available ComfyUI models"""
+async def get_comfyui_models(if_none_match: Optional[str] = Header(None, alias="If-None-Match")):
+    """Get available ComfyUI models, from the in-memory index"""
     try:
-        async with ComfyUIClient() as client:
-            models = await client.get_models()
-            return {
-                "success": True,
-                "models": models
-            }
+        # Kept answering from the last good index while ComfyUI is down
+        entry = await comfyui_models.get()
+        headers = {"ETag": entry.etag, "Cache-Control": "no-cache"}
+        if etag_matches(if_none_match, entry.etag):
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+        return Response(content=entry.body, media_type="application/json", headers=headers)
+    except CircuitOpenError:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -464,62 +897,64 @@ async def get_comfyui_models():
         )
 
 
-@app.post("/comfyui/generate", response_model=ComfyUIResponse)
+@app.post("/comfyui/generate", response_model=ComfyUIResponse, dependencies=[Depends(require_upstream("comfyui"))])
 async def generate_image(request: ComfyUIGenerateRequest):
     """Generate an image using ComfyUI"""
     try:
-        async with ComfyUIClient() as client:
-            # Generate the image
-            result = await client.generate_simple_image(
-                prompt=request.prompt,
-                negative_prompt=request.negative_prompt,
-                width=request.width,
-                height=request.height,
-                steps=request.steps,
-                cfg=request.cfg,
-                seed=request.seed,
-                checkpoint=request.checkpoint
+        # Generate the image
+        result = await comfyui_client.generate_simple_image(
+            prompt=request.prompt,
+            negative_prompt=request.negative_prompt,
+            width=request.width,
+            height=request.height,
+            steps=request.steps,
+            cfg=request.cfg,
+            seed=request.seed,
+            checkpoint=request.checkpoint
+        )
+        
+        if not result.get("success"):
+            return ComfyUIResponse(
+                success=False,
+                error=result.get("error", "Unknown error")
             )
+        
+        prompt_id = result["prompt_id"]
+        
+        # If wait_for_completion is True, wait for the image to be generated
+        if request.wait_for_completion:
+            completion_result = await comfyui_client.wait_for_completion(prompt_id)
             
-            if not result.get("success"):
+            if completion_result.get("success"):
                 return ComfyUIResponse(
-                    success=False,
-                    error=result.get("error", "Unknown error")
+                    success=True,
+                    prompt_id=prompt_id,
+                    client_id=result["client_id"],
+                    message="Image generated successfully",
+                    data={
+                        "outputs": completion_result["outputs"],
+                        "parameters": result["parameters"]
+                    }
                 )
-            
-            prompt_id = result["prompt_id"]
-            
-            # If wait_for_completion is True, wait for the image to be generated
-            if request.wait_for_completion:
-                completion_result = await client.wait_for_completion(prompt_id)
-                
-                if completion_result.get("success"):
-                    return ComfyUIResponse(
-                        success=True,
-                        prompt_id=prompt_id,
-                        client_id=result["client_id"],
-                        message="Image generated successfully",
-                        data={
-                            "outputs": completion_result["outputs"],
-                            "parameters": result["parameters"]
-                        }
-                    )
-                else:
-                    return ComfyUIResponse(
-                        success=False,
-                        prompt_id=prompt_id,
-                        error=completion_result.get("error", "Generation failed")
-                    )
             else:
-                # Return immediately with prompt ID
                 return ComfyUIResponse(
-                    success=True,
+                    success=False,
                     prompt_id=prompt_id,
-                    client_id=result["client_id"],
-                    message="Image generation queued",
-                    data={"parameters": result["parameters"]}
+                    error=completion_result.get("error", "Generation failed")
                 )
-                
+        else:
+            # Return immediately with prompt ID
+            return ComfyUIResponse(
+                success=True,
+                prompt_id=prompt_id,
+                client_id=result["client_id"],
+                message="Image generation queued",
+                data={
+                    "parameters": result["parameters"],
+                    "events_url": f"/comfyui/jobs/{prompt_id}/events"
+                }
+            )
+            
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -527,49 +962,49 @@ async def generate_image(request: ComfyUIGenerateRequest):
         )
 
 
-@app.post("/comfyui/workflow", response_model=ComfyUIResponse)
+@app.post("/comfyui/workflow", response_model=ComfyUIResponse, dependencies=[Depends(require_upstream("comfyui"))])
 async def execute_workflow(request: ComfyUIWorkflowRequest):
     """Execute a custom ComfyUI workflow"""
     try:
-        async with ComfyUIClient() as client:
-            # Queue the workflow
-            result = await client.queue_prompt(request.workflow)
+        # Queue the workflow
+        result = await comfyui_client.queue_prompt(request.workflow)
+        
+        if not result.get("success"):
+            return ComfyUIResponse(
+                success=False,
+                error=result.get("error", "Unknown error")
+            )
+        
+        prompt_id = result["prompt_id"]
+        
+        # If wait_for_completion is True, wait for the workflow to complete
+        if request.wait_for_completion:
+            completion_result = await comfyui_client.wait_for_completion(prompt_id)
             
-            if not result.get("success"):
+            if completion_result.get("success"):
                 return ComfyUIResponse(
-                    success=False,
-                    error=result.get("error", "Unknown error")
+                    success=True,
+                    prompt_id=prompt_id,
+                    client_id=result["client_id"],
+                    message="Workflow executed successfully",
+                    data={"outputs": completion_result["outputs"]}
                 )
-            
-            prompt_id = result["prompt_id"]
-            
-            # If wait_for_completion is True, wait for the workflow to complete
-            if request.wait_for_completion:
-                completion_result = await client.wait_for_completion(prompt_id)
-                
-                if completion_result.get("success"):
-                    return ComfyUIResponse(
-                        success=True,
-                        prompt_id=prompt_id,
-                        client_id=result["client_id"],
-                        message="Workflow executed successfully",
-                        data={"outputs": completion_result["outputs"]}
-                    )
-                else:
-                    return ComfyUIResponse(
-                        success=False,
-                        prompt_id=prompt_id,
-                        error=completion_result.get("error", "Workflow execution failed")
-                    )
             else:
-                # Return immediately with prompt ID
                 return ComfyUIResponse(
-                    success=True,
+                    success=False,
                     prompt_id=prompt_id,
-                    client_id=result["client_id"],
-                    message="Workflow queued"
+                    error=completion_result.get("error", "Workflow execution failed")
                 )
-                
+        else:
+            # Return immediately with prompt ID
+            return ComfyUIResponse(
+                success=True,
+                prompt_id=prompt_id,
+                client_id=result["client_id"],
+                message="Workflow queued",
+                data={"events_url": f"/comfyui/jobs/{prompt_id}/events"}
+            )
+            
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -577,16 +1012,15 @@ async def execute_workflow(request: ComfyUIWorkflowRequest):
         )
 
 
-@app.get("/comfyui/history/{prompt_id}")
+@app.get("/comfyui/history/{prompt_id}", dependencies=[Depends(require_upstream("comfyui"))])
 async def get_generation_history(prompt_id: str):
     """Get ComfyUI generation history for a specific prompt"""
     try:
-        async with ComfyUIClient() as client:
-            history = await client.get_history(prompt_id)
-            return {
-                "success": True,
-                "history": history
-            }
+        history = await comfyui_client.get_history(prompt_id)
+        return {
+            "success": True,
+            "history": history
+        }
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -594,16 +1028,48 @@ async def get_generation_history(prompt_id: str):
         )
 
 
-@app.get("/comfyui/queue")
+async def comfyui_job_frames(prompt_id: str):
+    async for event, data in comfyui_client.job_events(prompt_id):
+        if event is None:
+            yield ": keepalive\n\n"
+            continue
+        yield format_sse(event, data)
+        if event in ("complete", "failed"):
+            yield format_sse("end", {"status": "completed" if event == "complete" else "failed"})
+
+
+@app.get("/comfyui/jobs/{prompt_id}/events", dependencies=[Depends(require_upstream("comfyui"))])
+async def stream_comfyui_job_events(prompt_id: str):
+    """Stream a ComfyUI job's queue position, sampler progress and outputs as server-sent events"""
+    try:
+        known = await comfyui_client.prompt_known(prompt_id)
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to look up ComfyUI job: {str(e)}"
+        )
+    if not known:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"ComfyUI job {prompt_id} not found"
+        )
+
+    return StreamingResponse(
+        comfyui_job_frames(prompt_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@app.get("/comfyui/queue", dependencies=[Depends(require_upstream("comfyui"))])
 async def get_queue_status():
     """Get ComfyUI queue status"""
     try:
-        async with ComfyUIClient() as client:
-            queue = await client.get_queue_status()
-            return {
-                "success": True,
-                "queue": queue
-            }
+        queue = await comfyui_client.get_queue_status()
+        return {
+            "success": True,
+            "queue": queue
+        }
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -611,16 +1077,15 @@ async def get_queue_status():
         )
 
 
-@app.post("/comfyui/cancel/{prompt_id}")
+@app.post("/comfyui/cancel/{prompt_id}", dependencies=[Depends(require_upstream("comfyui"))])
 async def cancel_generation(prompt_id: str):
     """Cancel a ComfyUI generation"""
     try:
-        async with ComfyUIClient() as client:
-            success = await client.cancel_prompt(prompt_id)
-            return {
-                "success": success,
-                "message": "Generation cancelled" if success else "Failed to cancel generation"
-            }
+        success = await comfyui_client.cancel_prompt(prompt_id)
+        return {
+            "success": success,
+            "message": "Generation cancelled" if success else "Failed to cancel generation"
+        }
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -628,49 +1093,135 @@ async def cancel_generation(prompt_id: str):
         )
 
 
+# Conditional and partial request headers passed to ComfyUI, and response headers passed back
+IMAGE_REQUEST_HEADERS = ("range", "if-range", "if-none-match", "if-modified-since")
+IMAGE_RESPONSE_HEADERS = (
+    "content-type", "content-length", "content-range", "content-encoding",
+    "accept-ranges", "etag", "last-modified",
+)
+
+
+IMAGE_VARIANTS = ("original", "preview")
+
+
+async def cached_image_response(request: Request, image, variant: str, filename: str, immutable: bool) -> Response:
+    """Serve an image from the on-disk cache; Range requests are answered from the file"""
+    path, media_type = image.path, image.content_type
+    etag = f'"{image.digest}"'
+    if variant == "preview":
+        path, media_type = await comfyui_images.preview(image)
+        etag = f'"{image.digest}-{comfyui_images.preview_format}{comfyui_images.preview_size}"'
+        filename = os.path.splitext(filename)[0] + os.path.splitext(path)[1]
+    headers = {
+        "ETag": etag,
+        # A hash always names the same bytes; a filename is checked again before reuse
+        "Cache-Control": IMMUTABLE_CACHE_CONTROL if immutable else "no-cache",
+        "X-Image-Hash": image.digest,
+        "Content-Disposition": f"inline; filename={filename}",
+    }
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return FileResponse(path, media_type=media_type, headers=headers)
+
+
 @app.get("/comfyui/image/{filename}")
-async def get_generated_image(filename: str, subfolder: str = "", folder_type: str = "output"):
-    """Get a generated image from ComfyUI"""
-    try:
-        async with ComfyUIClient() as client:
-            image_data = await client.get_image_data(filename, subfolder, folder_type)
-            
-            # Determine content type based on file extension
-            content_type = "image/png"
-            if filename.lower().endswith(('.jpg', '.jpeg')):
-                content_type = "image/jpeg"
-            elif filename.lower().endswith('.webp'):
-                content_type = "image/webp"
-            
-            from fastapi.responses import Response
-            return Response(
-                content=image_data,
-                media_type=content_type,
-                headers={"Content-Disposition": f"inline; filename={filename}"}
+async def get_generated_image(
+    request: Request,
+    filename: str,
+    subfolder: str = "",
+    folder_type: str = "output",
+    variant: str = "original",
+):
+    """Get a generated image from ComfyUI.
+
+    `filename` is a ComfyUI filename or the content hash reported in the
+    X-Image-Hash header. Generated outputs and all previews are served from
+    the on-disk image cache, downloaded from ComfyUI on first use, with Range
+    and If-None-Match answered from the cached file; a hash only names a
+    cached image and is served as immutable. `variant=preview` returns a
+    downscaled WebP/JPEG. Temp and input images, and every image while the
+    cache is disabled, are streamed through from ComfyUI as they arrive, with
+    Range and If-None-Match answered by ComfyUI.
+    """
+    if variant not in IMAGE_VARIANTS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unknown image variant {variant}, expected one of: {', '.join(IMAGE_VARIANTS)}"
+        )
+
+    if is_digest(filename):
+        image = comfyui_images.get(filename)
+        if image is None:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Image {filename} is not cached")
+        return await cached_image_response(request, image, variant, filename, immutable=True)
+
+    if comfyui_images.enabled and (folder_type == "output" or variant == "preview"):
+        try:
+            image = await comfyui_images.fetch(filename, subfolder, folder_type)
+        except ImageNotFoundError:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Image {filename} not found")
+        except CircuitOpenError:
+            raise
+        except Exception as e:
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=f"Failed to get image: {str(e)}"
             )
+        return await cached_image_response(request, image, variant, filename, immutable=False)
+
+    try:
+        upstream = await comfyui_client.open_image(
+            filename, subfolder, folder_type,
+            headers={name: request.headers[name] for name in IMAGE_REQUEST_HEADERS if name in request.headers},
+        )
+    except CircuitOpenError:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Failed to get image: {str(e)}"
         )
 
+    if upstream.status_code not in (200, 206, 304, 416):
+        await upstream.aclose()
+        if upstream.status_code == 404:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Image {filename} not found")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to get image: ComfyUI returned HTTP {upstream.status_code}"
+        )
+
+    headers = {name: upstream.headers[name] for name in IMAGE_RESPONSE_HEADERS if name in upstream.headers}
+    headers["Content-Disposition"] = f"inline; filename={filename}"
+    if "content-type" not in headers:
+        # Determine content type based on file extension
+        headers["content-type"] = "image/png"
+        if filename.lower().endswith(('.jpg', '.jpeg')):
+            headers["content-type"] = "image/jpeg"
+        elif filename.lower().endswith('.webp'):
+            headers["content-type"] = "image/webp"
+
+    if upstream.status_code in (304, 416):
+        await upstream.aclose()
+        return Response(status_code=upstream.status_code, headers=headers)
+
+    async def body():
+        try:
+            # Raw bytes, so a compressed upstream body keeps its Content-Encoding and length
+            async for chunk in upstream.aiter_raw():
+                yield chunk
+        finally:
+            await upstream.aclose()
+
+    return StreamingResponse(body(), status_code=upstream.status_code, headers=headers)
+
 
 # ComfyUI Model Management Endpoints
 @app.get("/comfyui/db/models")
 async def get_comfyui_db_models(active_only: bool = True, essential_only: bool = False):
     """Get ComfyUI models from database"""
     try:
-        import asyncpg
-        
-        # Get database connection string
-        database_url = os.getenv("DATABASE_URL")
-        if not database_url:
-            raise HTTPException(status_code=500, detail="Database URL not configured")
-        
-        # Connect to database
-        conn = await asyncpg.connect(database_url)
-        
-        try:
+        async with db_pool.acquire() as conn:
             # Build query based on filters
             query = "SELECT * FROM public.comfyui_models WHERE 1=1"
             params = []
@@ -699,9 +1250,6 @@ async def get_comfyui_db_models(active_only: bool = True, essential_only: bool =
                 "models": models
             }
             
-        finally:
-            await conn.close()
-            
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -725,17 +1273,7 @@ class ComfyUIModelRequest(BaseModel):
 async def add_comfyui_model(request: ComfyUIModelRequest):
     """Add a new ComfyUI model to database"""
     try:
-        import asyncpg
-        
-        # Get database connection string
-        database_url = os.getenv("DATABASE_URL")
-        if not database_url:
-            raise HTTPException(status_code=500, detail="Database URL not configured")
-        
-        # Connect to database
-        conn = await asyncpg.connect(database_url)
-        
-        try:
+        async with db_pool.acquire() as conn:
             # Insert model
             query = """
                 INSERT INTO public.comfyui_models 
@@ -756,15 +1294,15 @@ async def add_comfyui_model(request: ComfyUIModelRequest):
                 request.essential
             )
             
+            # Other replicas hear about it from the comfyui_models trigger
+            comfyui_models.invalidate("model added")
+
             return {
                 "success": True,
                 "model_id": str(model_id),
                 "message": "Model added successfully"
             }
             
-        finally:
-            await conn.close()
-            
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -776,17 +1314,7 @@ async def add_comfyui_model(request: ComfyUIModelRequest):
 async def update_comfyui_model(model_id: str, request: ComfyUIModelRequest):
     """Update a ComfyUI model in database"""
     try:
-        import asyncpg
-        
-        # Get database connection string
-        database_url = os.getenv("DATABASE_URL")
-        if not database_url:
-            raise HTTPException(status_code=500, detail="Database URL not configured")
-        
-        # Connect to database
-        conn = await asyncpg.connect(database_url)
-        
-        try:
+        async with db_pool.acquire() as conn:
             # Update model
             query = """
                 UPDATE public.comfyui_models 
@@ -813,15 +1341,14 @@ async def update_comfyui_model(model_id: str, request: ComfyUIModelRequest):
             if not updated_id:
                 raise HTTPException(status_code=404, detail="Model not found")
             
+            comfyui_models.invalidate("model updated")
+
             return {
                 "success": True,
                 "model_id": str(updated_id),
                 "message": "Model updated successfully"
             }
             
-        finally:
-            await conn.close()
-            
     except HTTPException:
         raise
     except Exception as e:
@@ -835,17 +1362,7 @@ async def update_comfyui_model(model_id: str, request: ComfyUIModelRequest):
 async def delete_comfyui_model(model_id: str):
     """Delete a ComfyUI model from database"""
     try:
-        import asyncpg
-        
-        # Get database connection string
-        database_url = os.getenv("DATABASE_URL")
-        if not database_url:
-            raise HTTPException(status_code=500, detail="Database URL not configured")
-        
-        # Connect to database
-        conn = await asyncpg.connect(database_url)
-        
-        try:
+        async with db_pool.acquire() as conn:
             # Delete model
             query = "DELETE FROM public.comfyui_models WHERE id = $1 RETURNING id"
             deleted_id = await conn.fetchval(query, model_id)
@@ -853,14 +1370,13 @@ async def delete_comfyui_model(model_id: str):
             if not deleted_id:
                 raise HTTPException(status_code=404, detail="Model not found")
             
+            comfyui_models.invalidate("model deleted")
+
             return {
                 "success": True,
                 "message": "Model deleted successfully"
             }
             
-        finally:
-            await conn.close()
-            
     except HTTPException:
         raise
     except Exception as e:
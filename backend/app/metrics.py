@@ -0,0 +1,171 @@
+"""
+Prometheus metrics for the backend, served at /metrics
+
+Request and upstream latencies are recorded as they happen by a plain ASGI
+middleware and an httpx transport wrapper, which cost a clock read and a
+histogram update per call. Pool, queue and background task gauges are only
+read when Prometheus scrapes, so they add nothing to the request path.
+"""
+import asyncio
+import httpx
+import time
+from contextlib import contextmanager
+from typing import Dict, Any, Iterator, Optional
+
+from prometheus_client import CONTENT_TYPE_LATEST, Gauge, Histogram, generate_latest
+
+from circuit_breaker import CircuitOpenError, OPEN
+
+# From a cache hit on a completed result up to a full research log stream
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+
+REQUEST_LATENCY = Histogram(
+    "backend_http_request_duration_seconds",
+    "Time spent serving HTTP requests, by route template and response status",
+    ["method", "route", "status"],
+    buckets=LATENCY_BUCKETS,
+)
+REQUESTS_IN_PROGRESS = Gauge(
+    "backend_http_requests_in_progress",
+    "HTTP requests currently being served",
+)
+UPSTREAM_LATENCY = Histogram(
+    "backend_upstream_request_duration_seconds",
+    "Time until an upstream answered (response headers) or failed, including retries",
+    ["upstream", "method", "outcome"],
+    buckets=LATENCY_BUCKETS,
+)
+UPSTREAM_CIRCUIT_OPEN = Gauge(
+    "backend_upstream_circuit_open",
+    "1 while the upstream's circuit breaker rejects calls",
+    ["upstream"],
+)
+DB_POOL_CONNECTIONS = Gauge(
+    "backend_db_pool_connections",
+    "Shared database pool connections by state",
+    ["state"],
+)
+RESEARCH_QUEUE_SESSIONS = Gauge(
+    "backend_research_queue_sessions",
+    "Research sessions waiting or running across all replicas",
+    ["status", "priority"],
+)
+RESEARCH_QUEUE_OLDEST = Gauge(
+    "backend_research_queue_oldest_seconds",
+    "Age of the oldest queued research session",
+)
+BACKGROUND_TASKS = Gauge(
+    "backend_background_tasks",
+    "Background work on this replica by kind",
+    ["kind"],
+)
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording per-route request latency.
+
+    Routes are labelled by their path template, so /research/{session_id}/status
+    is one series however many sessions there are. Streaming responses are timed
+    until the stream ends.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+        start = time.perf_counter()
+
+        async def send_with_status(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        REQUESTS_IN_PROGRESS.inc()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            REQUESTS_IN_PROGRESS.dec()
+            # The router stores the matched route in the scope
+            route = getattr(scope.get("route"), "path", "unmatched")
+            REQUEST_LATENCY.labels(scope["method"], route, str(status_code)).observe(
+                time.perf_counter() - start
+            )
+
+
+class InstrumentedTransport(httpx.AsyncBaseTransport):
+    """httpx transport recording latency and outcome of every call to one upstream"""
+
+    def __init__(self, transport: httpx.AsyncBaseTransport, upstream: str):
+        self.transport = transport
+        self.upstream = upstream
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        outcome = "error"
+        start = time.perf_counter()
+        try:
+            response = await self.transport.handle_async_request(request)
+            outcome = str(response.status_code)
+            return response
+        except CircuitOpenError:
+            outcome = "circuit_open"
+            raise
+        except httpx.TimeoutException:
+            outcome = "timeout"
+            raise
+        finally:
+            UPSTREAM_LATENCY.labels(self.upstream, request.method, outcome).observe(
+                time.perf_counter() - start
+            )
+
+    async def aclose(self):
+        await self.transport.aclose()
+
+
+@contextmanager
+def observe_upstream(upstream: str, method: str) -> Iterator[None]:
+    """Time an upstream call made without the shared HTTP clients (e.g. the storage SDK)"""
+    outcome = "error"
+    start = time.perf_counter()
+    try:
+        yield
+        outcome = "ok"
+    finally:
+        UPSTREAM_LATENCY.labels(upstream, method, outcome).observe(time.perf_counter() - start)
+
+
+def update_gauges(
+    db_pool: Dict[str, Any],
+    circuits: Dict[str, str],
+    background: Dict[str, int],
+    queue: Optional[Dict[str, Any]] = None,
+):
+    """Refresh scrape-time gauges from the components' stats()"""
+    for state in ("size", "idle", "in_use", "max_size"):
+        DB_POOL_CONNECTIONS.labels(state).set(db_pool[state])
+
+    for upstream, state in circuits.items():
+        UPSTREAM_CIRCUIT_OPEN.labels(upstream).set(1 if state == OPEN else 0)
+
+    # Counts every task on the loop, including request handlers and pool housekeeping
+    BACKGROUND_TASKS.labels("asyncio").set(len(asyncio.all_tasks()))
+    for kind, count in background.items():
+        BACKGROUND_TASKS.labels(kind).set(count)
+
+    # Left at their last value when the queue could not be read
+    if queue is not None:
+        for priority, count in queue["queued_by_priority"].items():
+            RESEARCH_QUEUE_SESSIONS.labels("queued", priority).set(count)
+        RESEARCH_QUEUE_SESSIONS.labels("running", "all").set(queue["running"])
+        RESEARCH_QUEUE_SESSIONS.labels("coalesced", "all").set(queue["coalesced"])
+        RESEARCH_QUEUE_OLDEST.set(queue["oldest_queued_seconds"])
+
+
+def render() -> bytes:
+    """Current metrics in the Prometheus text format"""
+    return generate_latest()
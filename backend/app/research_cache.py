@@ -0,0 +1,345 @@
+"""
+Research result caches keyed on the normalized query and research parameters
+
+Completed sessions double as cache entries: every session stores a fingerprint
+of its normalized query, max_loops and search_api, and a new request whose
+fingerprint matches a recently completed session is answered with a session
+that points at that session's research_results row.
+
+Paraphrased queries are caught by a second, semantic layer: completed results
+are indexed in Weaviate by the embedding of their query, and a request whose
+query is close enough to an indexed one reuses that result.
+"""
+import asyncio
+import asyncpg
+import hashlib
+import httpx
+import json
+import logging
+import os
+import re
+import unicodedata
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Any, List, Optional
+
+from http_clients import HttpClientRegistry
+from research_client import ResearchStatus
+
+logger = logging.getLogger(__name__)
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_query(query: str) -> str:
+    """Case-fold, collapse whitespace and drop trailing punctuation"""
+    normalized = unicodedata.normalize("NFKC", query).casefold()
+    normalized = _WHITESPACE.sub(" ", normalized).strip()
+    return normalized.rstrip("?!.;: ")
+
+
+def query_fingerprint(query: str, max_loops: int, search_api: str) -> str:
+    """Stable cache key for a research request"""
+    key = f"{normalize_query(query)}\x1f{max_loops}\x1f{search_api.strip().lower()}"
+    return hashlib.sha256(key.encode("utf-8")).hexdigest()
+
+
+class ResearchResultCache:
+    """Looks up fresh completed results by fingerprint and counts hits/misses"""
+
+    def __init__(self, ttl_seconds: Optional[float] = None):
+        self.ttl_seconds = (
+            ttl_seconds if ttl_seconds is not None
+            else float(os.getenv("RESEARCH_CACHE_TTL_SECONDS", "86400"))
+        )
+        self.hits = 0
+        self.misses = 0
+        self.bypassed = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl_seconds > 0
+
+    async def lookup(self, conn: asyncpg.Connection, fingerprint: str) -> Optional[asyncpg.Record]:
+        """Newest result for `fingerprint` completed within the TTL, if any"""
+        row = await conn.fetchrow("""
+            SELECT r.id AS result_id, s.id AS source_session_id, s.completed_at
+            FROM public.research_sessions s
+            JOIN public.research_results r ON r.session_id = s.id
+            WHERE s.query_hash = $1
+              AND s.status = $2
+              AND s.completed_at > now() - make_interval(secs => $3)
+            ORDER BY s.completed_at DESC
+            LIMIT 1
+        """, fingerprint, ResearchStatus.COMPLETED.value, self.ttl_seconds)
+
+        if row:
+            self.hits += 1
+        else:
+            self.misses += 1
+        return row
+
+    async def lookup_many(
+        self, conn: asyncpg.Connection, fingerprints: List[str]
+    ) -> Dict[str, asyncpg.Record]:
+        """Newest fresh result for each of `fingerprints` that has one, in one query"""
+        rows = await conn.fetch("""
+            SELECT DISTINCT ON (s.query_hash)
+                   s.query_hash, r.id AS result_id, s.id AS source_session_id, s.completed_at
+            FROM public.research_sessions s
+            JOIN public.research_results r ON r.session_id = s.id
+            WHERE s.query_hash = ANY($1::text[])
+              AND s.status = $2
+              AND s.completed_at > now() - make_interval(secs => $3)
+            ORDER BY s.query_hash, s.completed_at DESC
+        """, list(fingerprints), ResearchStatus.COMPLETED.value, self.ttl_seconds)
+
+        found = {row["query_hash"]: row for row in rows}
+        self.hits += len(found)
+        self.misses += len(fingerprints) - len(found)
+        return found
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "bypassed": self.bypassed,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+class SemanticResearchCache:
+    """Near-duplicate query lookup over research results indexed in Weaviate.
+
+    Lookups and indexing are best effort: any Weaviate error is logged and
+    treated as a cache miss so research is never blocked on the vector store.
+    """
+
+    CLASS_NAME = "ResearchResult"
+
+    def __init__(
+        self,
+        base_url: Optional[str] = None,
+        threshold: Optional[float] = None,
+        ttl_seconds: Optional[float] = None,
+        timeout: float = 3.0,
+        lookup_timeout: Optional[float] = None,
+        http: Optional[HttpClientRegistry] = None,
+    ):
+        self.base_url = (base_url or os.getenv("WEAVIATE_URL", "http://weaviate:8080")).rstrip("/")
+        self.enabled = (
+            os.getenv("WEAVIATE_ENABLED", "false").lower() == "true"
+            and os.getenv("RESEARCH_SEMANTIC_CACHE_ENABLED", "true").lower() == "true"
+            and bool(self.base_url)
+        )
+        # Minimum cosine similarity between the new query and a cached one
+        self.threshold = (
+            threshold if threshold is not None
+            else float(os.getenv("RESEARCH_SEMANTIC_CACHE_THRESHOLD", "0.92"))
+        )
+        self.ttl_seconds = (
+            ttl_seconds if ttl_seconds is not None
+            else float(os.getenv(
+                "RESEARCH_SEMANTIC_CACHE_TTL_SECONDS",
+                os.getenv("RESEARCH_CACHE_TTL_SECONDS", "86400")
+            ))
+        )
+        self.embedding_model = os.getenv("WEAVIATE_OLLAMA_EMBEDDING_MODEL", "nomic-embed-text")
+        # Where Weaviate reaches Ollama; its own default is localhost inside the Weaviate container
+        self.ollama_endpoint = os.getenv("OLLAMA_BASE_URL", "http://ollama:11434").rstrip("/")
+        self.timeout = timeout
+        # Lookups run before a research request is admitted, so they give up early
+        self.lookup_timeout = (
+            lookup_timeout if lookup_timeout is not None
+            else float(os.getenv("RESEARCH_SEMANTIC_CACHE_LOOKUP_TIMEOUT_SECONDS", "0.5"))
+        )
+        self.http = http or HttpClientRegistry()
+        self._schema_ready = False
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+        self.skipped = 0
+        # Matches whose result no longer exists; also counted as misses
+        self.stale = 0
+        self.indexed = 0
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        """Shared keep-alive client for Weaviate"""
+        return self.http.get("weaviate")
+
+    async def _ensure_schema(self):
+        if self._schema_ready:
+            return
+
+        response = await self.client.get(f"{self.base_url}/v1/schema/{self.CLASS_NAME}", timeout=self.timeout)
+        if response.status_code == 200:
+            config = response.json().get("moduleConfig", {}).get("text2vec-ollama", {})
+            if config.get("apiEndpoint") != self.ollama_endpoint or config.get("model") != self.embedding_model:
+                # Vectorizer settings cannot be changed on an existing class
+                logger.warning(
+                    f"Weaviate class {self.CLASS_NAME} embeds with {config.get('model')} at "
+                    f"{config.get('apiEndpoint')}, expected {self.embedding_model} at {self.ollama_endpoint}; "
+                    f"delete the class to recreate it"
+                )
+        elif response.status_code == 404:
+            response = await self.client.post(f"{self.base_url}/v1/schema", timeout=self.timeout, json={
+                "class": self.CLASS_NAME,
+                "description": "Completed deep research results, embedded by query",
+                "vectorizer": "text2vec-ollama",
+                "moduleConfig": {
+                    "text2vec-ollama": {
+                        "model": self.embedding_model,
+                        "apiEndpoint": self.ollama_endpoint,
+                        "vectorizeClassName": False,
+                    }
+                },
+                "properties": [
+                    {"name": "query", "dataType": ["text"]},
+                    {"name": "title", "dataType": ["text"], "moduleConfig": {
+                        "text2vec-ollama": {"skip": True}}},
+                    {"name": "result_id", "dataType": ["text"], "tokenization": "field", "moduleConfig": {
+                        "text2vec-ollama": {"skip": True}}},
+                    {"name": "search_api", "dataType": ["text"], "tokenization": "field", "moduleConfig": {
+                        "text2vec-ollama": {"skip": True}}},
+                    {"name": "max_loops", "dataType": ["int"]},
+                    {"name": "completed_at", "dataType": ["date"]},
+                ],
+            })
+        response.raise_for_status()
+        self._schema_ready = True
+
+    async def lookup(self, query: str, max_loops: int, search_api: str) -> Optional[Dict[str, Any]]:
+        """Closest fresh indexed result within the similarity threshold, if any.
+
+        Skipped while Weaviate's circuit is open, and treated as a miss when it
+        takes longer than lookup_timeout.
+        """
+        if not self.enabled:
+            return None
+        if not self.http.breaker("weaviate").available:
+            self.skipped += 1
+            return None
+
+        fresh_since = datetime.now(timezone.utc) - timedelta(seconds=self.ttl_seconds)
+        # Values are inlined as JSON literals, which GraphQL string syntax accepts
+        graphql = {"query": """
+            {
+              Get {
+                %s(
+                  nearText: {concepts: [%s], distance: %f}
+                  where: {operator: And, operands: [
+                    {path: ["max_loops"], operator: Equal, valueInt: %d},
+                    {path: ["search_api"], operator: Equal, valueText: %s},
+                    {path: ["completed_at"], operator: GreaterThan, valueDate: %s}
+                  ]}
+                  limit: 1
+                ) {
+                  result_id
+                  query
+                  _additional { distance }
+                }
+              }
+            }
+        """ % (
+            self.CLASS_NAME,
+            json.dumps(normalize_query(query)),
+            1.0 - self.threshold,
+            int(max_loops),
+            json.dumps(search_api.strip().lower()),
+            json.dumps(fresh_since.isoformat()),
+        )}
+
+        try:
+            body = await asyncio.wait_for(self._query(graphql), timeout=self.lookup_timeout)
+        except asyncio.TimeoutError:
+            self.errors += 1
+            logger.warning(f"Semantic research cache lookup timed out after {self.lookup_timeout}s")
+            return None
+        except Exception as e:
+            self.errors += 1
+            logger.warning(f"Semantic research cache lookup failed: {str(e)}")
+            return None
+
+        if body.get("errors"):
+            self.errors += 1
+            logger.warning(f"Semantic research cache lookup failed: {body['errors'][0].get('message')}")
+            return None
+
+        matches = (body.get("data") or {}).get("Get", {}).get(self.CLASS_NAME) or []
+        if not matches:
+            self.misses += 1
+            return None
+
+        # Counted once the caller has found the result: see record()
+        match = matches[0]
+        return {
+            "result_id": match["result_id"],
+            "matched_query": match["query"],
+            "similarity": round(1.0 - float(match["_additional"]["distance"]), 4),
+        }
+
+    def record(self, hits: int, stale: int = 0):
+        """Count matches returned by lookup() whose result was found, or was gone"""
+        self.hits += hits
+        self.stale += stale
+        self.misses += stale
+
+    async def _query(self, graphql: Dict[str, Any]) -> Dict[str, Any]:
+        await self._ensure_schema()
+        response = await self.client.post(f"{self.base_url}/v1/graphql", json=graphql, timeout=self.timeout)
+        response.raise_for_status()
+        return response.json()
+
+    async def index(
+        self,
+        result_id: str,
+        query: str,
+        title: str,
+        max_loops: int,
+        search_api: str,
+        completed_at: datetime,
+    ):
+        """Embed and store a completed result so paraphrases of `query` can reuse it"""
+        if not self.enabled:
+            return
+
+        if completed_at.tzinfo is None:
+            completed_at = completed_at.replace(tzinfo=timezone.utc)
+
+        try:
+            await self._ensure_schema()
+            response = await self.client.post(f"{self.base_url}/v1/objects", timeout=self.timeout, json={
+                "class": self.CLASS_NAME,
+                "id": result_id,
+                "properties": {
+                    "query": normalize_query(query),
+                    "title": title,
+                    "result_id": result_id,
+                    "search_api": search_api.strip().lower(),
+                    "max_loops": max_loops,
+                    "completed_at": completed_at.isoformat(),
+                },
+            })
+            response.raise_for_status()
+            self.indexed += 1
+        except Exception as e:
+            self.errors += 1
+            logger.warning(f"Failed to index research result {result_id} in Weaviate: {str(e)}")
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "threshold": self.threshold,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "errors": self.errors,
+            "skipped": self.skipped,
+            "stale": self.stale,
+            "indexed": self.indexed,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
@@ -1,10 +1,16 @@
 import httpx
 import os
+import json
 import asyncio
-from typing import Dict, Any, List, Optional, AsyncGenerator
+import logging
+from typing import Dict, Any, List, Optional, AsyncGenerator, Awaitable, Callable
 from pydantic import BaseModel
 from enum import Enum
 
+from http_clients import HttpClientRegistry
+
+logger = logging.getLogger(__name__)
+
 
 class ResearchStatus(str, Enum):
     """Research status enumeration"""
@@ -15,6 +21,10 @@ class ResearchStatus(str, Enum):
     CANCELLED = "cancelled"
 
 
+TERMINAL_STATUSES = (ResearchStatus.COMPLETED, ResearchStatus.FAILED, ResearchStatus.CANCELLED)
+TERMINAL_VALUES = tuple(status.value for status in TERMINAL_STATUSES)
+
+
 class ResearchRequest(BaseModel):
     """Request model for starting research"""
     query: str
@@ -44,229 +54,295 @@ class ResearchResult(BaseModel):
 class ResearchClient:
     """Client for interacting with Local Deep Researcher service"""
 
-    def __init__(self, base_url: Optional[str] = None, timeout: int = 300):
+    def __init__(
+        self,
+        base_url: Optional[str] = None,
+        timeout: int = 300,
+        http: Optional[HttpClientRegistry] = None
+    ):
         self.base_url = base_url or os.getenv(
             "LOCAL_DEEP_RESEARCHER_URL", 
             "http://local-deep-researcher:2024"
         )
         self.timeout = timeout
+        self.http = http or HttpClientRegistry()
         self.headers = {
             "Content-Type": "application/json",
             "Accept": "application/json"
         }
 
+    @property
+    def client(self) -> httpx.AsyncClient:
+        """Shared keep-alive client for the researcher"""
+        return self.http.get("research")
+
+    @property
+    def available(self) -> bool:
+        """False while the researcher's circuit is open"""
+        return self.http.breaker("research").available
+
     async def health_check(self) -> Dict[str, Any]:
         """Check if the research service is healthy"""
-        async with httpx.AsyncClient(timeout=10.0) as client:
-            try:
-                response = await client.get(f"{self.base_url}/health")
-                if response.status_code == 200:
-                    return {"status": "healthy", "service": "local-deep-researcher"}
-                else:
-                    return {"status": "unhealthy", "error": f"HTTP {response.status_code}"}
-            except Exception as e:
-                return {"status": "unhealthy", "error": str(e)}
+        try:
+            response = await self.client.get(f"{self.base_url}/health", timeout=10.0)
+            if response.status_code == 200:
+                return {"status": "healthy", "service": "local-deep-researcher"}
+            else:
+                return {"status": "unhealthy", "error": f"HTTP {response.status_code}"}
+        except Exception as e:
+            return {"status": "unhealthy", "error": str(e)}
 
     async def start_research(self, request: ResearchRequest) -> ResearchResponse:
         """Start a new research session"""
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            try:
-                # Prepare payload for LangGraph API
-                payload = {
-                    "query": request.query,
-                    "config": {
-                        "max_loops": request.max_loops,
-                        "search_api": request.search_api
-                    },
-                    "metadata": {
-                        "user_id": request.user_id
-                    }
+        try:
+            # Prepare payload for LangGraph API
+            payload = {
+                "query": request.query,
+                "config": {
+                    "max_loops": request.max_loops,
+                    "search_api": request.search_api
+                },
+                "metadata": {
+                    "user_id": request.user_id
                 }
+            }
 
-                response = await client.post(
-                    f"{self.base_url}/research/start",
-                    json=payload,
-                    headers=self.headers
-                )
-                response.raise_for_status()
-                
-                data = response.json()
-                return ResearchResponse(
-                    session_id=data.get("session_id", ""),
-                    status=ResearchStatus.RUNNING,
-                    message="Research started successfully",
-                    data=data
-                )
-            except httpx.HTTPStatusError as e:
-                error_msg = f"HTTP {e.response.status_code}: {e.response.text}"
-                return ResearchResponse(
-                    session_id="",
-                    status=ResearchStatus.FAILED,
-                    message=f"Failed to start research: {error_msg}"
-                )
-            except Exception as e:
-                return ResearchResponse(
-                    session_id="",
-                    status=ResearchStatus.FAILED,
-                    message=f"Failed to start research: {str(e)}"
-                )
+            response = await self.client.post(
+                f"{self.base_url}/research/start",
+                json=payload,
+                headers=self.headers,
+                timeout=30.0
+            )
+            response.raise_for_status()
+            
+            data = response.json()
+            return ResearchResponse(
+                session_id=data.get("session_id", ""),
+                status=ResearchStatus.RUNNING,
+                message="Research started successfully",
+                data=data
+            )
+        except httpx.HTTPStatusError as e:
+            error_msg = f"HTTP {e.response.status_code}: {e.response.text}"
+            return ResearchResponse(
+                session_id="",
+                status=ResearchStatus.FAILED,
+                message=f"Failed to start research: {error_msg}"
+            )
+        except Exception as e:
+            return ResearchResponse(
+                session_id="",
+                status=ResearchStatus.FAILED,
+                message=f"Failed to start research: {str(e)}"
+            )
 
     async def get_research_status(self, session_id: str) -> ResearchResponse:
         """Get the status of a research session"""
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            try:
-                response = await client.get(
-                    f"{self.base_url}/research/{session_id}/status",
-                    headers=self.headers
-                )
-                response.raise_for_status()
-                
-                data = response.json()
-                return ResearchResponse(
-                    session_id=session_id,
-                    status=ResearchStatus(data.get("status", "pending")),
-                    message=data.get("message", ""),
-                    data=data
-                )
-            except httpx.HTTPStatusError as e:
-                if e.response.status_code == 404:
-                    return ResearchResponse(
-                        session_id=session_id,
-                        status=ResearchStatus.FAILED,
-                        message="Research session not found"
-                    )
-                error_msg = f"HTTP {e.response.status_code}: {e.response.text}"
-                return ResearchResponse(
-                    session_id=session_id,
-                    status=ResearchStatus.FAILED,
-                    message=f"Failed to get status: {error_msg}"
-                )
-            except Exception as e:
+        try:
+            response = await self.client.get(
+                f"{self.base_url}/research/{session_id}/status",
+                headers=self.headers,
+                timeout=30.0
+            )
+            response.raise_for_status()
+
+            data = response.json()
+            return ResearchResponse(
+                session_id=session_id,
+                status=ResearchStatus(data.get("status", "pending")),
+                message=data.get("message", ""),
+                data=data
+            )
+        except httpx.HTTPStatusError as e:
+            if e.response.status_code == 404:
                 return ResearchResponse(
                     session_id=session_id,
                     status=ResearchStatus.FAILED,
-                    message=f"Failed to get status: {str(e)}"
+                    message="Research session not found"
                 )
+            error_msg = f"HTTP {e.response.status_code}: {e.response.text}"
+            return ResearchResponse(
+                session_id=session_id,
+                status=ResearchStatus.FAILED,
+                message=f"Failed to get status: {error_msg}"
+            )
+        except Exception as e:
+            return ResearchResponse(
+                session_id=session_id,
+                status=ResearchStatus.FAILED,
+                message=f"Failed to get status: {str(e)}"
+            )
 
     async def get_research_result(self, session_id: str) -> Optional[ResearchResult]:
         """Get the final result of a completed research session"""
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            try:
-                response = await client.get(
-                    f"{self.base_url}/research/{session_id}/result",
-                    headers=self.headers
-                )
-                response.raise_for_status()
-                
-                data = response.json()
-                return ResearchResult(
-                    session_id=session_id,
-                    title=data.get("title", "Research Result"),
-                    summary=data.get("summary", ""),
-                    content=data.get("content", ""),
-                    sources=data.get("sources", []),
-                    metadata=data.get("metadata", {})
-                )
-            except httpx.HTTPStatusError as e:
-                if e.response.status_code == 404:
-                    return None
-                raise Exception(f"HTTP {e.response.status_code}: {e.response.text}")
-            except Exception as e:
-                raise Exception(f"Failed to get result: {str(e)}")
+        try:
+            response = await self.client.get(
+                f"{self.base_url}/research/{session_id}/result",
+                headers=self.headers,
+                timeout=30.0
+            )
+            response.raise_for_status()
+            
+            data = response.json()
+            return ResearchResult(
+                session_id=session_id,
+                title=data.get("title", "Research Result"),
+                summary=data.get("summary", ""),
+                content=data.get("content", ""),
+                sources=data.get("sources", []),
+                metadata=data.get("metadata", {})
+            )
+        except httpx.HTTPStatusError as e:
+            if e.response.status_code == 404:
+                return None
+            raise Exception(f"HTTP {e.response.status_code}: {e.response.text}")
+        except Exception as e:
+            raise Exception(f"Failed to get result: {str(e)}")
 
     async def cancel_research(self, session_id: str) -> ResearchResponse:
         """Cancel a running research session"""
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            try:
-                response = await client.post(
-                    f"{self.base_url}/research/{session_id}/cancel",
-                    headers=self.headers
-                )
-                response.raise_for_status()
-                
-                data = response.json()
-                return ResearchResponse(
-                    session_id=session_id,
-                    status=ResearchStatus.CANCELLED,
-                    message="Research cancelled successfully",
-                    data=data
-                )
-            except httpx.HTTPStatusError as e:
-                error_msg = f"HTTP {e.response.status_code}: {e.response.text}"
-                return ResearchResponse(
-                    session_id=session_id,
-                    status=ResearchStatus.FAILED,
-                    message=f"Failed to cancel research: {error_msg}"
-                )
-            except Exception as e:
-                return ResearchResponse(
-                    session_id=session_id,
-                    status=ResearchStatus.FAILED,
-                    message=f"Failed to cancel research: {str(e)}"
-                )
+        try:
+            response = await self.client.post(
+                f"{self.base_url}/research/{session_id}/cancel",
+                headers=self.headers,
+                timeout=30.0
+            )
+            response.raise_for_status()
+            
+            data = response.json()
+            return ResearchResponse(
+                session_id=session_id,
+                status=ResearchStatus.CANCELLED,
+                message="Research cancelled successfully",
+                data=data
+            )
+        except httpx.HTTPStatusError as e:
+            error_msg = f"HTTP {e.response.status_code}: {e.response.text}"
+            return ResearchResponse(
+                session_id=session_id,
+                status=ResearchStatus.FAILED,
+                message=f"Failed to cancel research: {error_msg}"
+            )
+        except Exception as e:
+            return ResearchResponse(
+                session_id=session_id,
+                status=ResearchStatus.FAILED,
+                message=f"Failed to cancel research: {str(e)}"
+            )
 
     async def stream_research_logs(self, session_id: str) -> AsyncGenerator[Dict[str, Any], None]:
         """Stream real-time logs from a research session"""
-        async with httpx.AsyncClient(timeout=self.timeout) as client:
-            try:
-                async with client.stream(
-                    "GET",
-                    f"{self.base_url}/research/{session_id}/logs/stream",
-                    headers=self.headers
-                ) as response:
-                    response.raise_for_status()
-                    
-                    async for line in response.aiter_lines():
-                        if line.startswith("data: "):
-                            try:
-                                import json
-                                data = json.loads(line[6:])  # Remove "data: " prefix
-                                yield data
-                            except json.JSONDecodeError:
-                                continue
-                        elif line == "event: close":
-                            break
-            except Exception as e:
-                yield {"error": f"Stream error: {str(e)}"}
+        try:
+            async for data in self._iter_log_stream(session_id):
+                yield data
+        except Exception as e:
+            yield {"error": f"Stream error: {str(e)}"}
+
+    async def _iter_log_stream(self, session_id: str) -> AsyncGenerator[Dict[str, Any], None]:
+        """Parse the SSE log stream, raising if the stream cannot be read"""
+        async with self.client.stream(
+            "GET",
+            f"{self.base_url}/research/{session_id}/logs/stream",
+            headers=self.headers,
+            timeout=self.timeout
+        ) as response:
+            response.raise_for_status()
+
+            async for line in response.aiter_lines():
+                if line.startswith("data: "):
+                    try:
+                        yield json.loads(line[6:])  # Remove "data: " prefix
+                    except json.JSONDecodeError:
+                        continue
+                elif line == "event: close":
+                    break
 
     async def list_active_sessions(self) -> List[Dict[str, Any]]:
         """List all currently active research sessions"""
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            try:
-                response = await client.get(
-                    f"{self.base_url}/research/sessions/active",
-                    headers=self.headers
-                )
-                response.raise_for_status()
-                return response.json()
-            except Exception as e:
-                raise Exception(f"Failed to list active sessions: {str(e)}")
+        try:
+            response = await self.client.get(
+                f"{self.base_url}/research/sessions/active",
+                headers=self.headers,
+                timeout=30.0
+            )
+            response.raise_for_status()
+            return response.json()
+        except Exception as e:
+            raise Exception(f"Failed to list active sessions: {str(e)}")
 
     async def wait_for_completion(
-        self, 
-        session_id: str, 
-        poll_interval: int = 5, 
-        max_wait_time: int = 300
+        self,
+        session_id: str,
+        poll_interval: int = 5,
+        max_wait_time: int = 300,
+        on_event: Optional[Callable[[Dict[str, Any]], Awaitable[None]]] = None
+    ) -> ResearchResponse:
+        """Wait for a research session to complete.
+
+        Follows the session's log stream and returns as soon as it reports a
+        terminal state, passing every progress event to `on_event`. If the
+        stream is unavailable, falls back to polling the status endpoint with
+        an interval that backs off up to `poll_interval`.
+        """
+        try:
+            return await asyncio.wait_for(
+                self._track_completion(session_id, poll_interval, on_event),
+                timeout=max_wait_time
+            )
+        except asyncio.TimeoutError:
+            return ResearchResponse(
+                session_id=session_id,
+                status=ResearchStatus.FAILED,
+                message=f"Timeout waiting for completion after {max_wait_time} seconds"
+            )
+
+    async def _track_completion(
+        self,
+        session_id: str,
+        max_poll_interval: float,
+        on_event: Optional[Callable[[Dict[str, Any]], Awaitable[None]]] = None
     ) -> ResearchResponse:
-        """Wait for a research session to complete with polling"""
-        start_time = asyncio.get_event_loop().time()
-        
+        """Resolve completion from the log stream, polling only as a fallback"""
+        if await self._wait_for_stream_end(session_id, on_event):
+            # Confirm the terminal state; the stream only tells us it ended
+            status_response = await self.get_research_status(session_id)
+            if status_response.status in TERMINAL_STATUSES:
+                return status_response
+
+        return await self._poll_for_completion(session_id, max_poll_interval)
+
+    async def _wait_for_stream_end(
+        self,
+        session_id: str,
+        on_event: Optional[Callable[[Dict[str, Any]], Awaitable[None]]] = None
+    ) -> bool:
+        """Block until the log stream reports a terminal event or closes.
+
+        Returns False when the stream could not be used at all.
+        """
+        try:
+            async for event in self._iter_log_stream(session_id):
+                status = event.get("status")
+                if status in TERMINAL_VALUES:
+                    return True
+                if event.get("event") in ("complete", "completed", "error", "cancelled", "end"):
+                    return True
+                if on_event is not None:
+                    await on_event(event)
+            return True
+        except Exception as e:
+            logger.info(f"Log stream unavailable for {session_id}, falling back to polling: {str(e)}")
+            return False
+
+    async def _poll_for_completion(self, session_id: str, max_poll_interval: float) -> ResearchResponse:
+        """Poll status, backing off from 0.5s to `max_poll_interval`"""
+        interval = min(0.5, max_poll_interval)
+
         while True:
             status_response = await self.get_research_status(session_id)
-            
-            if status_response.status in [
-                ResearchStatus.COMPLETED, 
-                ResearchStatus.FAILED, 
-                ResearchStatus.CANCELLED
-            ]:
+
+            if status_response.status in TERMINAL_STATUSES:
                 return status_response
-            
-            elapsed_time = asyncio.get_event_loop().time() - start_time
-            if elapsed_time >= max_wait_time:
-                return ResearchResponse(
-                    session_id=session_id,
-                    status=ResearchStatus.FAILED,
-                    message=f"Timeout waiting for completion after {max_wait_time} seconds"
-                )
-            
-            await asyncio.sleep(poll_interval)
\ No newline at end of file
+
+            await asyncio.sleep(interval)
+            interval = min(interval * 1.5, max_poll_interval)
@@ -0,0 +1,374 @@
+"""
+Research progress events fed by Postgres LISTEN/NOTIFY
+
+A single dedicated connection LISTENs on the research_events channel and fans
+notifications out to every subscribed SSE stream, so watching a session costs
+no database connection per client.
+"""
+import asyncio
+import asyncpg
+import json
+import logging
+import os
+from contextlib import asynccontextmanager
+from typing import Dict, Any, List, Optional, Set, Callable, AsyncIterator, AsyncGenerator
+
+from research_client import ResearchStatus, TERMINAL_VALUES
+from research_service import (
+    ResearchService,
+    SESSION_STATUS_COLUMNS,
+    LOG_EVENT_COLUMNS,
+    session_row_to_dict,
+    log_row_to_dict,
+)
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = "research_events"
+
+
+def format_sse(event: str, data: Any, event_id: Optional[int] = None) -> str:
+    """Serialize one server-sent event"""
+    lines = []
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    lines.append(f"event: {event}")
+    lines.append(f"data: {json.dumps(data, default=str)}")
+    return "\n".join(lines) + "\n\n"
+
+
+class Subscription:
+    """Bounded event queue for one SSE client"""
+
+    def __init__(self, session_id: str, maxsize: int):
+        self.session_id = session_id
+        # Sessions whose events reach this queue: its own and the one it follows
+        self.session_ids: Set[str] = {session_id}
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=maxsize)
+        # Set when events were dropped; the stream then reloads from the database
+        self.stale = False
+        # Batch streams only follow status changes
+        self.want_logs = True
+
+    def put(self, event: Dict[str, Any]):
+        if event["kind"] == "log" and not self.want_logs:
+            return
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            self.stale = True
+
+
+class ResearchEventBroker:
+    """Shares one LISTEN connection between all research event subscribers"""
+
+    def __init__(
+        self,
+        research_service: ResearchService,
+        queue_size: int = 256,
+        keepalive_interval: float = 15.0,
+        reconnect_delay: float = 2.0,
+        reorder_window: Optional[int] = None,
+    ):
+        self.research_service = research_service
+        self.db = research_service.db
+        self.queue_size = queue_size
+        self.keepalive_interval = keepalive_interval
+        # event_seq is taken at insert but becomes visible at commit, so a line
+        # can show up after higher-numbered ones; streams look back this far
+        self.reorder_window = (
+            reorder_window if reorder_window is not None
+            else int(os.getenv("RESEARCH_LOG_REORDER_WINDOW", "1000"))
+        )
+        self.reconnect_delay = reconnect_delay
+        self._subscribers: Dict[str, Set[Subscription]] = {}
+        self._conn: Optional[asyncpg.Connection] = None
+        self._reconnect_task: Optional[asyncio.Task] = None
+        self._flush_task: Optional[asyncio.Task] = None
+        self._pending_logs: Set[int] = set()
+        self._pending_status: Set[str] = set()
+        self._status_callbacks: List[Callable[[str, str], None]] = []
+        self._closing = False
+
+    @property
+    def subscriber_count(self) -> int:
+        return sum(len(subs) for subs in self._subscribers.values())
+
+    def add_status_callback(self, callback: Callable[[str, str], None]):
+        """Call `callback(session_id, status)` for every session status change"""
+        self._status_callbacks.append(callback)
+
+    async def start(self):
+        """Open the shared LISTEN connection"""
+        self._closing = False
+        await self._connect()
+
+    async def close(self):
+        """Stop listening and release the dedicated connection"""
+        self._closing = True
+        for task in (self._reconnect_task, self._flush_task):
+            if task and not task.done():
+                task.cancel()
+        if self._conn is not None and not self._conn.is_closed():
+            await self._conn.close()
+        self._conn = None
+
+    async def _connect(self):
+        # LISTEN needs a connection of its own: pooled connections drop their
+        # listeners when they are released.
+        self._conn = await asyncpg.connect(self.db.dsn)
+        await self._conn.add_listener(CHANNEL, self._on_notify)
+        self._conn.add_termination_listener(self._on_terminated)
+        logger.info(f"Listening for {CHANNEL} notifications")
+
+    def _on_terminated(self, conn: asyncpg.Connection):
+        if self._closing:
+            return
+        logger.warning("Research event listener connection lost, reconnecting")
+        self._reconnect_task = asyncio.create_task(self._reconnect())
+
+    async def _reconnect(self):
+        while not self._closing:
+            try:
+                await self._connect()
+                # Anything notified while disconnected is lost
+                self._mark_stale(self._subscribers.keys())
+                return
+            except Exception as e:
+                logger.error(f"Research event listener reconnect failed: {str(e)}")
+                await asyncio.sleep(self.reconnect_delay)
+
+    def _mark_stale(self, session_ids):
+        for session_id in list(session_ids):
+            for sub in self._subscribers.get(session_id, ()):
+                sub.stale = True
+                sub.put({"kind": "resync"})
+
+    def _on_notify(self, conn, pid, channel, payload: str):
+        try:
+            event = json.loads(payload)
+        except json.JSONDecodeError:
+            return
+
+        if event.get("kind") == "status":
+            for callback in self._status_callbacks:
+                callback(event["session_id"], event.get("status"))
+
+        if event.get("session_id") not in self._subscribers:
+            return
+
+        # Notifications arriving in the same loop iteration share one query
+        if event.get("kind") == "log":
+            self._pending_logs.add(int(event["event_seq"]))
+        else:
+            self._pending_status.add(event["session_id"])
+
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.create_task(self._flush())
+
+    async def _flush(self):
+        await asyncio.sleep(0)
+        # Notifications that arrive during a load are picked up by the next pass
+        while self._pending_logs or self._pending_status:
+            pending_logs, self._pending_logs = self._pending_logs, set()
+            pending_status, self._pending_status = self._pending_status, set()
+            await self._load(pending_logs, pending_status)
+
+    async def _load(self, pending_logs: Set[int], pending_status: Set[str]):
+        try:
+            async with self.db.acquire() as conn:
+                if pending_logs:
+                    rows = await conn.fetch(f"""
+                        SELECT {LOG_EVENT_COLUMNS}
+                        FROM public.research_logs
+                        WHERE event_seq = ANY($1::bigint[])
+                        ORDER BY event_seq ASC
+                    """, list(pending_logs))
+                    for row in rows:
+                        self._dispatch(str(row["session_id"]), {"kind": "log", "log": log_row_to_dict(row)})
+
+                if pending_status:
+                    rows = await conn.fetch(f"""
+                        SELECT {SESSION_STATUS_COLUMNS}
+                        FROM public.research_sessions
+                        WHERE id = ANY($1::uuid[])
+                    """, list(pending_status))
+                    for row in rows:
+                        self._dispatch(str(row["id"]), {"kind": "status", "status": session_row_to_dict(row)})
+        except Exception as e:
+            logger.error(f"Failed to load research events: {str(e)}")
+            self._mark_stale(self._subscribers.keys())
+
+    def _dispatch(self, session_id: str, event: Dict[str, Any]):
+        for sub in self._subscribers.get(session_id, ()):
+            sub.put(event)
+
+    @asynccontextmanager
+    async def subscribe(self, session_id: str) -> AsyncIterator[Subscription]:
+        """Register for events on one session for the duration of the block"""
+        sub = Subscription(session_id, self.queue_size)
+        self._subscribers.setdefault(session_id, set()).add(sub)
+        try:
+            yield sub
+        finally:
+            for watched in sub.session_ids:
+                subs = self._subscribers.get(watched)
+                if subs is not None:
+                    subs.discard(sub)
+                    if not subs:
+                        del self._subscribers[watched]
+
+    def watch(self, sub: Subscription, session_id: str):
+        """Also deliver `session_id`'s events to an existing subscription"""
+        sub.session_ids.add(session_id)
+        self._subscribers.setdefault(session_id, set()).add(sub)
+
+    async def stream(self, session_id: str, last_event_id: Optional[int] = None) -> AsyncGenerator[str, None]:
+        """Yield SSE frames for a session until it reaches a terminal state.
+
+        Log lines are sent once each, including lines that commit after
+        higher-numbered ones (within reorder_window sequence numbers). The SSE
+        id is the highest sequence number sent so far, so clients can resume
+        with Last-Event-ID; on resume the status snapshot and the lines within
+        the window below it are sent again, and clients drop the lines whose
+        `event_id` they already have. A coalesced session also streams the
+        log of the session it follows.
+        """
+        last_seq = last_event_id or 0
+        # Sequence numbers already sent that a late line could still fall between
+        sent: Set[int] = set()
+
+        def log_frame(log: Dict[str, Any]) -> Optional[str]:
+            nonlocal last_seq, sent
+            event_id = log["event_id"]
+            if event_id in sent or event_id <= last_seq - self.reorder_window:
+                return None
+            sent.add(event_id)
+            if event_id > last_seq:
+                last_seq = event_id
+                if len(sent) > 2 * self.reorder_window:
+                    sent = {seq for seq in sent if seq > last_seq - self.reorder_window}
+            return format_sse("log", log, last_seq)
+
+        # Subscribe before reading state so no event falls in between
+        async with self.subscribe(session_id) as sub:
+
+            async def load_logs():
+                after = max(last_seq - self.reorder_window, 0)
+                logs = await self.research_service.get_research_logs_since(session_id, after)
+                return [frame for frame in map(log_frame, logs) if frame is not None]
+
+            async def resync():
+                sub.stale = False
+                while not sub.queue.empty():
+                    sub.queue.get_nowait()
+                status = await self.research_service.get_research_status(session_id)
+                if status and status["leader_session_id"]:
+                    self.watch(sub, status["leader_session_id"])
+                frames = [format_sse("status", status)] if status else []
+                return status, frames + await load_logs()
+
+            status, frames = await resync()
+            for frame in frames:
+                yield frame
+
+            while status is not None and status["status"] not in TERMINAL_VALUES:
+                try:
+                    event = await asyncio.wait_for(sub.queue.get(), timeout=self.keepalive_interval)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+
+                if sub.stale or event["kind"] == "resync":
+                    status, frames = await resync()
+                    for frame in frames:
+                        yield frame
+                elif event["kind"] == "log":
+                    frame = log_frame(event["log"])
+                    if frame is not None:
+                        yield frame
+                elif event["status"]["session_id"] == session_id:
+                    status = event["status"]
+                    if status["leader_session_id"]:
+                        self.watch(sub, status["leader_session_id"])
+                    yield format_sse("status", status)
+
+            if status is not None:
+                # Pick up log lines whose notifications were still in flight
+                for frame in await load_logs():
+                    yield frame
+            yield format_sse("end", {"status": status["status"] if status else None})
+
+    async def stream_batch(self, batch_id: str) -> AsyncGenerator[str, None]:
+        """Yield SSE frames for a batch until all of its sessions are terminal.
+
+        Starts with a `batch` snapshot, then sends a `status` event per session
+        change and a `result` event carrying each session's result as soon as
+        that session completes, so clients need not wait for the whole batch.
+        """
+        async with self.subscribe(batch_id) as sub:
+            sub.want_logs = False
+            statuses: Dict[str, str] = {}
+            sent_results: Set[str] = set()
+
+            async def load_results():
+                completed = [
+                    session_id for session_id, state in statuses.items()
+                    if state == ResearchStatus.COMPLETED.value and session_id not in sent_results
+                ]
+                if not completed:
+                    return []
+                frames = []
+                for result in await self.research_service.get_batch_results(batch_id, completed):
+                    sent_results.add(result["session_id"])
+                    frames.append(format_sse("result", result))
+                return frames
+
+            async def resync():
+                sub.stale = False
+                while not sub.queue.empty():
+                    sub.queue.get_nowait()
+                batch = await self.research_service.get_batch_status(batch_id)
+                if batch is None:
+                    return None, []
+                # Followers' status changes are fanned out to them, so the
+                # batch's own sessions are all that needs watching
+                for session in batch["sessions"]:
+                    self.watch(sub, session["session_id"])
+                    statuses[session["session_id"]] = session["status"]
+                return batch, [format_sse("batch", batch)] + await load_results()
+
+            def finished():
+                return all(state in TERMINAL_VALUES for state in statuses.values())
+
+            batch, frames = await resync()
+            for frame in frames:
+                yield frame
+
+            while batch is not None and not finished():
+                try:
+                    event = await asyncio.wait_for(sub.queue.get(), timeout=self.keepalive_interval)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+
+                if sub.stale or event["kind"] == "resync":
+                    batch, frames = await resync()
+                    for frame in frames:
+                        yield frame
+                    continue
+
+                status = event["status"]
+                if status["session_id"] not in statuses:
+                    continue
+                statuses[status["session_id"]] = status["status"]
+                yield format_sse("status", status)
+                for frame in await load_results():
+                    yield frame
+
+            if batch is not None:
+                batch = await self.research_service.get_batch_status(batch_id)
+            yield format_sse("end", {
+                "status": batch["status"] if batch else None,
+                "counts": batch["counts"] if batch else None,
+            })
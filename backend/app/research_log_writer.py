@@ -0,0 +1,213 @@
+"""
+Buffered writer for research_logs
+
+Progress lines are queued in memory and written in batches with a single COPY,
+either when enough have accumulated, when the oldest has waited
+`flush_interval` seconds, or when a caller needs a session's log on disk
+before recording its terminal state; if the batch cannot be written then,
+the session's own lines are written in the terminal transaction instead.
+Writers wait for room once `max_buffered` lines are pending, so a stalled
+database slows log producers down instead of growing the buffer without
+bound.
+"""
+import asyncio
+import asyncpg
+import json
+import logging
+import os
+from typing import Dict, Any, List, Optional, Tuple
+from uuid import UUID
+
+from db import DatabasePool
+
+logger = logging.getLogger(__name__)
+
+# Column order of the records buffered by ResearchLogWriter
+LOG_COLUMNS = ["session_id", "step_number", "step_type", "message", "data"]
+
+# Failures worth retrying: the lines are fine, the database is not reachable
+RETRYABLE_ERRORS = (
+    OSError,
+    asyncio.TimeoutError,
+    asyncpg.PostgresConnectionError,
+    asyncpg.InterfaceError,
+    asyncpg.CannotConnectNowError,
+)
+
+
+class ResearchLogWriter:
+    """Batches research log inserts off the research hot path"""
+
+    def __init__(
+        self,
+        db: DatabasePool,
+        batch_size: Optional[int] = None,
+        flush_interval: Optional[float] = None,
+        max_buffered: Optional[int] = None,
+        retry_delay: float = 1.0,
+    ):
+        self.db = db
+        self.batch_size = (
+            batch_size if batch_size is not None
+            else int(os.getenv("RESEARCH_LOG_BATCH_SIZE", "200"))
+        )
+        self.flush_interval = (
+            flush_interval if flush_interval is not None
+            else float(os.getenv("RESEARCH_LOG_FLUSH_SECONDS", "0.25"))
+        )
+        self.max_buffered = (
+            max_buffered if max_buffered is not None
+            else int(os.getenv("RESEARCH_LOG_MAX_BUFFERED", "5000"))
+        )
+        self.retry_delay = retry_delay
+        self._buffer: List[Tuple] = []
+        self._flush_lock = asyncio.Lock()
+        self._wakeup = asyncio.Event()
+        self._drained = asyncio.Event()
+        self._drained.set()
+        self._task: Optional[asyncio.Task] = None
+        self.written = 0
+        self.dropped = 0
+        self.flushes = 0
+
+    @property
+    def buffered(self) -> int:
+        return len(self._buffer)
+
+    async def start(self):
+        """Start the background flush loop"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._flush_loop())
+
+    async def close(self, attempts: int = 3):
+        """Stop the flush loop and write everything still buffered"""
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+        for attempt in range(attempts):
+            if await self.flush():
+                break
+            await asyncio.sleep(self.retry_delay)
+
+        if self._buffer:
+            logger.error(f"Discarding {len(self._buffer)} research log lines that could not be written")
+            self.dropped += len(self._buffer)
+            self._buffer = []
+
+    async def log(
+        self,
+        session_id: str,
+        step_number: int,
+        step_type: str,
+        message: str,
+        data: Optional[Dict[str, Any]] = None,
+    ):
+        """Queue one log line, waiting for room if the buffer is full"""
+        while len(self._buffer) >= self.max_buffered:
+            self._drained.clear()
+            self._wakeup.set()
+            await self._drained.wait()
+
+        self._buffer.append((
+            UUID(session_id), step_number, step_type, message, json.dumps(data or {}, default=str)
+        ))
+        if len(self._buffer) >= self.batch_size:
+            self._wakeup.set()
+
+    async def flush(self) -> bool:
+        """Write every buffered line now; returns False if some are still pending.
+
+        Call before a session's terminal status update so its log is complete
+        when watchers see the session finish. Lines stay buffered across
+        connection failures; a batch the database rejects is dropped.
+        """
+        async with self._flush_lock:
+            while self._buffer:
+                batch = self._buffer[:self.batch_size]
+                try:
+                    await self._write(batch)
+                except RETRYABLE_ERRORS as e:
+                    logger.error(f"Failed to write research logs, will retry: {str(e)}")
+                    return False
+                except Exception as e:
+                    logger.error(f"Dropping {len(batch)} research log lines: {str(e)}")
+                    self.dropped += len(batch)
+                del self._buffer[:len(batch)]
+                self._drained.set()
+        return True
+
+    async def write_session(self, conn: asyncpg.Connection, session_id: str):
+        """Write the lines still buffered for one session on `conn`.
+
+        Used in the transaction that records a session's terminal state after
+        flush() could not write everything, so the log is complete when the
+        status changes; if that transaction rolls back, the lines go with it.
+        """
+        session_uuid = UUID(session_id)
+        if not any(record[0] == session_uuid for record in self._buffer):
+            return
+        async with self._flush_lock:
+            records = [record for record in self._buffer if record[0] == session_uuid]
+            if not records:
+                return
+            await conn.copy_records_to_table(
+                "research_logs", schema_name="public", columns=LOG_COLUMNS, records=records
+            )
+            self._buffer = [record for record in self._buffer if record[0] != session_uuid]
+            self.written += len(records)
+            self._drained.set()
+
+    async def _write(self, batch: List[Tuple]):
+        async with self.db.acquire() as conn:
+            try:
+                await conn.copy_records_to_table(
+                    "research_logs", schema_name="public", columns=LOG_COLUMNS, records=batch
+                )
+                written = len(batch)
+            except asyncpg.ForeignKeyViolationError:
+                # A session was deleted while its lines were buffered; keep the rest
+                written = await self._write_per_session(conn, batch)
+
+        self.written += written
+        self.dropped += len(batch) - written
+        self.flushes += 1
+
+    async def _write_per_session(self, conn: asyncpg.Connection, batch: List[Tuple]) -> int:
+        by_session: Dict[UUID, List[Tuple]] = {}
+        for record in batch:
+            by_session.setdefault(record[0], []).append(record)
+
+        written = 0
+        for session_id, records in by_session.items():
+            try:
+                await conn.copy_records_to_table(
+                    "research_logs", schema_name="public", columns=LOG_COLUMNS, records=records
+                )
+                written += len(records)
+            except asyncpg.ForeignKeyViolationError:
+                logger.warning(f"Dropping {len(records)} log lines for deleted research session {session_id}")
+        return written
+
+    async def _flush_loop(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+
+            if self._buffer and not await self.flush():
+                await asyncio.sleep(self.retry_delay)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "buffered": self.buffered,
+            "written": self.written,
+            "dropped": self.dropped,
+            "flushes": self.flushes,
+            "batch_size": self.batch_size,
+            "flush_interval": self.flush_interval,
+            "max_buffered": self.max_buffered,
+        }
@@ -0,0 +1,242 @@
+"""
+Admission control and fair scheduling for queued research sessions
+
+Admission happens when a session is queued: the global queue and each user's
+backlog are bounded, and callers over either limit are told when to retry. A
+batch takes one place in its user's backlog however many queries it holds.
+Scheduling happens when a worker claims a session: at most `max_running`
+sessions run across all replicas, each user has at most `user_max_running`
+of them, and among eligible sessions higher priority lanes go first, then the
+user with the fewest running sessions, then the oldest request. Sessions
+without a user (Open WebUI's pipe, n8n) are only held to the global limits.
+Sessions that belong to a batch additionally wait while their batch already
+has `max_concurrency` sessions running. Sessions coalesced onto an identical
+in-flight session are never claimed and do not count against any limit.
+"""
+import asyncpg
+import os
+from typing import Dict, Any, Optional
+from uuid import UUID
+
+from research_client import ResearchStatus
+
+# Priority lanes accepted by /research/start, mapped to the stored priority
+PRIORITY_LANES = {
+    "high": 10,
+    "normal": 0,
+    "low": -10,
+}
+
+# Advisory lock keys serialising admission and claims across replicas
+ADMISSION_LOCK_KEY = 7_240_001
+CLAIM_LOCK_KEY = 7_240_002
+
+
+class ResearchAdmissionError(Exception):
+    """A research request was refused because the queue is saturated"""
+
+    def __init__(self, message: str, retry_after: int):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class ResearchScheduler:
+    """Queue limits and claim ordering shared by the service and its workers"""
+
+    def __init__(
+        self,
+        max_running: Optional[int] = None,
+        max_queued: Optional[int] = None,
+        user_max_running: Optional[int] = None,
+        user_max_queued: Optional[int] = None,
+        batch_max_size: Optional[int] = None,
+        batch_max_concurrency: Optional[int] = None,
+    ):
+        self.max_running = (
+            max_running if max_running is not None
+            else int(os.getenv("RESEARCH_MAX_RUNNING", "4"))
+        )
+        self.max_queued = (
+            max_queued if max_queued is not None
+            else int(os.getenv("RESEARCH_MAX_QUEUED", "100"))
+        )
+        self.user_max_running = (
+            user_max_running if user_max_running is not None
+            else int(os.getenv("RESEARCH_USER_MAX_RUNNING", "2"))
+        )
+        self.user_max_queued = (
+            user_max_queued if user_max_queued is not None
+            else int(os.getenv("RESEARCH_USER_MAX_QUEUED", "10"))
+        )
+        self.batch_max_size = (
+            batch_max_size if batch_max_size is not None
+            else int(os.getenv("RESEARCH_BATCH_MAX_SIZE", "50"))
+        )
+        # Default and upper bound for a batch's own concurrency limit
+        self.batch_max_concurrency = (
+            batch_max_concurrency if batch_max_concurrency is not None
+            else int(os.getenv("RESEARCH_BATCH_MAX_CONCURRENCY", "2"))
+        )
+
+    @staticmethod
+    def priority_value(lane: Optional[str]) -> int:
+        """Map a priority lane name to its stored value"""
+        lane = lane or "normal"
+        if lane not in PRIORITY_LANES:
+            raise ValueError(
+                f"Unknown priority '{lane}', expected one of: {', '.join(PRIORITY_LANES)}"
+            )
+        return PRIORITY_LANES[lane]
+
+    async def lock_admission(self, conn: asyncpg.Connection):
+        """Serialise session creation until the current transaction ends"""
+        await conn.execute("SELECT pg_advisory_xact_lock($1)", ADMISSION_LOCK_KEY)
+
+    def batch_concurrency(self, requested: Optional[int]) -> int:
+        """Clamp a batch's requested concurrency to the configured bound"""
+        if requested is None:
+            return self.batch_max_concurrency
+        return max(1, min(requested, self.batch_max_concurrency))
+
+    async def admit(
+        self, conn: asyncpg.Connection, user_id: Optional[str], count: int = 1, batch: bool = False
+    ):
+        """Raise ResearchAdmissionError if `count` new sessions may not be queued.
+
+        A batch counts as one entry of its user's backlog, as its own
+        concurrency limit already keeps it from crowding out other work; its
+        sessions still count individually against the global queue.
+
+        Must run inside the transaction that inserts the session, so the lock
+        is held until the new row is visible to the next admission check.
+        """
+        await self.lock_admission(conn)
+
+        row = await conn.fetchrow("""
+            SELECT count(*) AS queued,
+                   count(*) FILTER (WHERE user_id IS NOT DISTINCT FROM $2 AND batch_id IS NULL)
+                     + count(DISTINCT batch_id) FILTER (WHERE user_id IS NOT DISTINCT FROM $2)
+                     AS user_queued
+            FROM public.research_sessions
+            WHERE status = $1 AND leader_session_id IS NULL
+        """, ResearchStatus.PENDING.value, UUID(user_id) if user_id else None)
+
+        if row["queued"] + count > self.max_queued:
+            raise ResearchAdmissionError(
+                f"Research queue is full ({row['queued']} sessions waiting)",
+                await self.estimate_retry_after(conn, row["queued"]),
+            )
+        # Anonymous callers (Open WebUI's pipe, n8n) are not one user; only the global limit applies
+        if user_id and row["user_queued"] + (1 if batch else count) > self.user_max_queued:
+            raise ResearchAdmissionError(
+                f"Too many queued research sessions for this user ({row['user_queued']} waiting)",
+                await self.estimate_retry_after(conn, row["user_queued"]),
+            )
+
+    async def estimate_retry_after(self, conn: asyncpg.Connection, ahead: int) -> int:
+        """Seconds until roughly `ahead` queued sessions have been worked off"""
+        avg_run = await conn.fetchval("""
+            SELECT EXTRACT(EPOCH FROM avg(completed_at - started_at))
+            FROM public.research_sessions
+            WHERE status = $1 AND completed_at > now() - interval '1 hour'
+        """, ResearchStatus.COMPLETED.value)
+        per_session = float(avg_run) if avg_run else 30.0
+        estimate = per_session * max(ahead, 1) / max(self.max_running, 1)
+        return int(min(max(estimate, 1), 600))
+
+    async def claim(
+        self, conn: asyncpg.Connection, worker_id: str, lease_seconds: float
+    ) -> Optional[asyncpg.Record]:
+        """Lease the next eligible pending session to `worker_id`, if any"""
+        async with conn.transaction():
+            # Serialise claims so the global running cap holds across replicas
+            await conn.execute("SELECT pg_advisory_xact_lock($1)", CLAIM_LOCK_KEY)
+
+            return await conn.fetchrow("""
+                WITH running AS (
+                    SELECT user_id, count(*) AS n
+                    FROM public.research_sessions
+                    WHERE status = $1 AND leader_session_id IS NULL
+                    GROUP BY user_id
+                ),
+                batch_running AS (
+                    SELECT batch_id, count(*) AS n
+                    FROM public.research_sessions
+                    WHERE status = $1 AND leader_session_id IS NULL AND batch_id IS NOT NULL
+                    GROUP BY batch_id
+                ),
+                next_session AS (
+                    SELECT s.id
+                    FROM public.research_sessions s
+                    LEFT JOIN running r ON r.user_id IS NOT DISTINCT FROM s.user_id
+                    LEFT JOIN public.research_batches b ON b.id = s.batch_id
+                    LEFT JOIN batch_running br ON br.batch_id = s.batch_id
+                    WHERE s.status = $2
+                      AND s.leader_session_id IS NULL
+                      AND (s.user_id IS NULL OR COALESCE(r.n, 0) < $3)
+                      AND (SELECT COALESCE(sum(n), 0) FROM running) < $4
+                      AND (b.id IS NULL OR COALESCE(br.n, 0) < b.max_concurrency)
+                    ORDER BY s.priority DESC, COALESCE(r.n, 0) ASC, s.created_at ASC,
+                             s.batch_index ASC
+                    LIMIT 1
+                    FOR UPDATE OF s SKIP LOCKED
+                )
+                UPDATE public.research_sessions
+                SET status = $1, started_at = now(), attempts = attempts + 1,
+                    leased_by = $5, heartbeat_at = now(),
+                    lease_expires_at = now() + make_interval(secs => $6)
+                WHERE id = (SELECT id FROM next_session)
+                RETURNING id, query, max_loops, search_api, user_id, attempts, trace_context
+            """, ResearchStatus.RUNNING.value, ResearchStatus.PENDING.value,
+                self.user_max_running, self.max_running, worker_id, lease_seconds)
+
+    async def queue_stats(self, conn: asyncpg.Connection) -> Dict[str, Any]:
+        """Queue depth per lane and recent queue wait times"""
+        depth = await conn.fetchrow("""
+            WITH leaders AS (
+                SELECT * FROM public.research_sessions
+                WHERE status IN ($1, $2) AND leader_session_id IS NULL
+            )
+            SELECT count(*) FILTER (WHERE status = $1) AS queued,
+                   count(*) FILTER (WHERE status = $2) AS running,
+                   count(*) FILTER (WHERE status = $1 AND priority > 0) AS queued_high,
+                   count(*) FILTER (WHERE status = $1 AND priority = 0) AS queued_normal,
+                   count(*) FILTER (WHERE status = $1 AND priority < 0) AS queued_low,
+                   EXTRACT(EPOCH FROM now() - min(created_at) FILTER (WHERE status = $1))
+                       AS oldest_queued_seconds,
+                   (SELECT count(*) FROM public.research_sessions
+                    WHERE status IN ($1, $2) AND leader_session_id IS NOT NULL) AS coalesced
+            FROM leaders
+        """, ResearchStatus.PENDING.value, ResearchStatus.RUNNING.value)
+
+        wait = await conn.fetchrow("""
+            SELECT count(*) AS started,
+                   EXTRACT(EPOCH FROM avg(started_at - created_at)) AS avg_wait_seconds,
+                   EXTRACT(EPOCH FROM percentile_cont(0.95) WITHIN GROUP (
+                       ORDER BY started_at - created_at)) AS p95_wait_seconds
+            FROM public.research_sessions
+            WHERE started_at > now() - interval '15 minutes' AND leader_session_id IS NULL
+        """)
+
+        return {
+            "queued": depth["queued"],
+            "running": depth["running"],
+            "coalesced": depth["coalesced"],
+            "queued_by_priority": {
+                "high": depth["queued_high"],
+                "normal": depth["queued_normal"],
+                "low": depth["queued_low"],
+            },
+            "oldest_queued_seconds": float(depth["oldest_queued_seconds"] or 0),
+            "started_last_15m": wait["started"],
+            "avg_wait_seconds": float(wait["avg_wait_seconds"] or 0),
+            "p95_wait_seconds": float(wait["p95_wait_seconds"] or 0),
+            "limits": {
+                "max_running": self.max_running,
+                "max_queued": self.max_queued,
+                "user_max_running": self.user_max_running,
+                "user_max_queued": self.user_max_queued,
+                "batch_max_size": self.batch_max_size,
+                "batch_max_concurrency": self.batch_max_concurrency,
+            },
+        }
@@ -1,64 +1,198 @@
 import asyncio
 import asyncpg
+import base64
 import os
-from typing import Dict, Any, List, Optional, AsyncGenerator
+from typing import Dict, Any, List, Optional, Tuple, AsyncGenerator
 from datetime import datetime
 import json
 from uuid import UUID, uuid4
 
+import tracing
+from db import DatabasePool
+from http_clients import HttpClientRegistry
+from research_cache import ResearchResultCache, SemanticResearchCache, query_fingerprint
 from research_client import ResearchClient, ResearchRequest, ResearchStatus, ResearchResult
+from research_log_writer import ResearchLogWriter
+from research_scheduler import ResearchScheduler
+
+# Column order of the records passed to ResearchService._insert_sources
+SOURCE_COLUMNS = ["session_id", "result_id", "url", "title", "relevance_score", "metadata"]
+
+SESSION_STATUS_COLUMNS = """id, query, status, max_loops, search_api, user_id, leader_session_id,
+                       created_at, updated_at, started_at, completed_at, error_message"""
+
+RESULT_COLUMNS = "r.id, r.title, r.summary, r.content, r.sources, r.metadata, r.created_at"
+
+LOG_EVENT_COLUMNS = "session_id, event_seq, step_number, step_type, message, data, created_at"
+
+# A coalesced session's progress is its own log plus its leader's, and a
+# promoted follower's includes the cancelled leader it took over from
+LOG_SESSION_FILTER = """session_id IN (
+                    WITH RECURSIVE related(id) AS (
+                        SELECT $1::uuid
+                        UNION
+                        SELECT unnest(ARRAY[s.leader_session_id, s.predecessor_session_id])
+                        FROM public.research_sessions s JOIN related r ON s.id = r.id
+                    )
+                    SELECT id FROM related WHERE id IS NOT NULL)"""
+
+
+class LeaseLostError(Exception):
+    """A worker tried to finish a session it no longer holds the lease for"""
+
+
+def decode_json(value):
+    """JSON/JSONB column value as Python data; asyncpg returns these columns as text"""
+    return json.loads(value) if isinstance(value, str) else value
+
+
+def session_row_to_dict(row) -> Dict[str, Any]:
+    """Shape a research_sessions row as returned by the status endpoint"""
+    return {
+        "session_id": str(row["id"]),
+        "query": row["query"],
+        "status": row["status"],
+        "max_loops": row["max_loops"],
+        "search_api": row["search_api"],
+        "user_id": str(row["user_id"]) if row["user_id"] else None,
+        "leader_session_id": str(row["leader_session_id"]) if row["leader_session_id"] else None,
+        "created_at": row["created_at"].isoformat() if row["created_at"] else None,
+        "updated_at": row["updated_at"].isoformat() if row["updated_at"] else None,
+        "started_at": row["started_at"].isoformat() if row["started_at"] else None,
+        "completed_at": row["completed_at"].isoformat() if row["completed_at"] else None,
+        "error_message": row["error_message"]
+    }
+
+
+def result_row_to_dict(session_id: str, row) -> Dict[str, Any]:
+    """Shape a research_results row (RESULT_COLUMNS plus the session status)"""
+    return {
+        "session_id": session_id,
+        "result_id": str(row["id"]),
+        "title": row["title"],
+        "summary": row["summary"],
+        "content": row["content"],
+        "sources": decode_json(row["sources"]),
+        "metadata": decode_json(row["metadata"]),
+        "created_at": row["created_at"].isoformat(),
+        "status": row["status"]
+    }
+
+
+def encode_session_cursor(created_at: datetime, session_id: UUID) -> str:
+    """Opaque pagination token for the position after a listed session"""
+    raw = f"{created_at.isoformat()}|{session_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_session_cursor(cursor: str) -> Tuple[datetime, UUID]:
+    """Inverse of encode_session_cursor; raises ValueError for a malformed token"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        created_at, session_id = raw.split("|")
+        return datetime.fromisoformat(created_at), UUID(session_id)
+    except Exception:
+        raise ValueError("Invalid pagination cursor")
+
+
+def log_row_to_dict(row) -> Dict[str, Any]:
+    """Shape a research_logs row as a log event carrying its sequence number"""
+    return {
+        "event_id": row["event_seq"],
+        "step_number": row["step_number"],
+        "step_type": row["step_type"],
+        "message": row["message"],
+        "data": decode_json(row["data"]),
+        "timestamp": row["created_at"].isoformat()
+    }
 
 
 class ResearchService:
     """Service for managing research operations with database persistence"""
 
-    def __init__(self):
-        self.db_url = os.getenv("DATABASE_URL")
-        if not self.db_url:
-            raise ValueError("DATABASE_URL environment variable is required")
-        
-        self.research_client = ResearchClient()
-        self._active_tasks = {}  # Track background tasks
-
-    async def _get_db_connection(self):
-        """Get database connection"""
-        return await asyncpg.connect(self.db_url)
+    def __init__(
+        self,
+        db: Optional[DatabasePool] = None,
+        scheduler: Optional[ResearchScheduler] = None,
+        cache: Optional[ResearchResultCache] = None,
+        semantic_cache: Optional[SemanticResearchCache] = None,
+        log_writer: Optional[ResearchLogWriter] = None,
+        http: Optional[HttpClientRegistry] = None
+    ):
+        self.db = db or DatabasePool()
+        self.http = http or HttpClientRegistry()
+        self.scheduler = scheduler or ResearchScheduler()
+        self.cache = cache or ResearchResultCache()
+        self.semantic_cache = semantic_cache or SemanticResearchCache(http=self.http)
+        # Progress lines go through the buffered writer; state changes are logged inline
+        self.log_writer = log_writer or ResearchLogWriter(self.db)
+        self.research_client = ResearchClient(http=self.http)
+        self._active_tasks = {}  # Sessions this replica's workers are running
 
+    @tracing.traced("research.start")
     async def start_research(
-        self, 
-        query: str, 
-        max_loops: int = 3, 
+        self,
+        query: str,
+        max_loops: int = 3,
         search_api: str = "duckduckgo",
-        user_id: Optional[str] = None
+        user_id: Optional[str] = None,
+        priority: str = "normal",
+        bypass_cache: bool = False
     ) -> Dict[str, Any]:
-        """Start a new research session with database tracking"""
-        
-        # Create database record first
+        """Queue a new research session; a research worker picks it up.
+
+        A fresh result for the same normalized query and parameters, or for a
+        close paraphrase of it, is reused instead, unless `bypass_cache` is set.
+        While an identical session is still pending or running, the new session
+        follows it rather than starting another remote run.
+
+        Raises ResearchAdmissionError when the queue or the user's backlog is full.
+        """
+        priority_value = self.scheduler.priority_value(priority)
+        fingerprint = query_fingerprint(query, max_loops, search_api)
+
         session_id = str(uuid4())
-        conn = await self._get_db_connection()
-        
-        try:
-            await conn.execute("""
-                INSERT INTO public.research_sessions 
-                (id, query, status, max_loops, search_api, user_id, started_at)
-                VALUES ($1, $2, $3, $4, $5, $6, $7)
-            """, session_id, query, ResearchStatus.PENDING.value, max_loops, search_api, 
-                UUID(user_id) if user_id else None, datetime.utcnow())
-            
-            # Log the start
-            await conn.execute("""
-                INSERT INTO public.research_logs (session_id, step_number, step_type, message)
-                VALUES ($1, $2, $3, $4)
-            """, session_id, 1, "start", f"Research session started for query: {query}")
-            
-        finally:
-            await conn.close()
-
-        # Start background research task
-        task = asyncio.create_task(
-            self._run_research_background(session_id, query, max_loops, search_api, user_id)
-        )
-        self._active_tasks[session_id] = task
+        cached = None
+        if bypass_cache:
+            self.cache.bypassed += 1
+        else:
+            cached = await self._lookup_cached_result(query, max_loops, search_api, fingerprint)
+
+        async with self.db.acquire() as conn:
+            if cached:
+                return await self._create_cached_session(
+                    conn, session_id, query, max_loops, search_api, user_id,
+                    priority, fingerprint, cached
+                )
+
+            async with conn.transaction():
+                # Holding the admission lock means no other identical session can
+                # be created between the in-flight lookup and the insert
+                await self.scheduler.lock_admission(conn)
+                leader = await self._find_in_flight(conn, fingerprint)
+                if leader:
+                    return await self._attach_to_leader(
+                        conn, session_id, query, max_loops, search_api, user_id,
+                        priority, fingerprint, leader
+                    )
+
+                # The pending row is the queue entry; its insert notifies idle workers
+                await self.scheduler.admit(conn, user_id)
+
+                await conn.execute("""
+                    INSERT INTO public.research_sessions
+                    (id, query, status, max_loops, search_api, user_id, priority, query_hash,
+                     trace_context)
+                    VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9)
+                """, session_id, query, ResearchStatus.PENDING.value, max_loops, search_api,
+                    UUID(user_id) if user_id else None, priority_value, fingerprint,
+                    tracing.current_traceparent())
+
+                # Log the start
+                await conn.execute("""
+                    INSERT INTO public.research_logs (session_id, step_number, step_type, message)
+                    VALUES ($1, $2, $3, $4)
+                """, session_id, 1, "start", f"Research session started for query: {query}")
 
         return {
             "session_id": session_id,
@@ -66,230 +200,764 @@ class ResearchService:
             "message": "Research session created and queued",
             "query": query,
             "max_loops": max_loops,
-            "search_api": search_api
+            "search_api": search_api,
+            "priority": priority
         }
 
-    async def _run_research_background(
-        self, 
-        session_id: str, 
-        query: str, 
-        max_loops: int, 
+    @tracing.traced("research.cache_lookup")
+    async def _lookup_cached_result(
+        self,
+        query: str,
+        max_loops: int,
         search_api: str,
-        user_id: Optional[str]
-    ):
-        """Run research in background and update database"""
-        conn = await self._get_db_connection()
-        
-        try:
-            # Update status to running
+        fingerprint: str
+    ) -> Optional[Dict[str, Any]]:
+        """Fresh result of an identical earlier query, else of a close paraphrase"""
+        if self.cache.enabled:
+            async with self.db.acquire() as conn:
+                row = await self.cache.lookup(conn, fingerprint)
+            if row:
+                return {**dict(row), "match": "exact"}
+
+        match = await self.semantic_cache.lookup(query, max_loops, search_api)
+        if not match:
+            return None
+
+        # The vector index can outlive the result it points at
+        async with self.db.acquire() as conn:
+            row = await conn.fetchrow("""
+                SELECT r.id AS result_id, s.id AS source_session_id, s.completed_at
+                FROM public.research_results r
+                JOIN public.research_sessions s ON s.id = r.session_id
+                WHERE r.id = $1 AND s.status = $2
+            """, UUID(match["result_id"]), ResearchStatus.COMPLETED.value)
+        if not row:
+            self.semantic_cache.record(0, stale=1)
+            return None
+        self.semantic_cache.record(1)
+
+        return {
+            **dict(row),
+            "match": "semantic",
+            "similarity": match["similarity"],
+            "matched_query": match["matched_query"]
+        }
+
+    async def _create_cached_session(
+        self,
+        conn: asyncpg.Connection,
+        session_id: str,
+        query: str,
+        max_loops: int,
+        search_api: str,
+        user_id: Optional[str],
+        priority: str,
+        fingerprint: str,
+        cached: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        """Record a completed session that reuses an earlier session's result"""
+        source_session_id = str(cached["source_session_id"])
+        how = cached["match"]
+        if how == "semantic":
+            how = f"semantic match on \"{cached['matched_query']}\", similarity {cached['similarity']}"
+        async with conn.transaction():
             await conn.execute("""
-                UPDATE public.research_sessions 
-                SET status = $1, started_at = $2
-                WHERE id = $3
-            """, ResearchStatus.RUNNING.value, datetime.utcnow(), session_id)
+                INSERT INTO public.research_sessions
+                (id, query, status, max_loops, search_api, user_id, priority, query_hash,
+                 cached_result_id, started_at, completed_at)
+                VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9, now(), now())
+            """, session_id, query, ResearchStatus.COMPLETED.value, max_loops, search_api,
+                UUID(user_id) if user_id else None, self.scheduler.priority_value(priority),
+                fingerprint, cached["result_id"])
 
             await conn.execute("""
                 INSERT INTO public.research_logs (session_id, step_number, step_type, message)
                 VALUES ($1, $2, $3, $4)
-            """, session_id, 2, "execute", "Starting research execution")
-
-            # Create request for research client
-            request = ResearchRequest(
-                query=query,
-                max_loops=max_loops,
-                search_api=search_api,
-                user_id=user_id
-            )
+            """, session_id, 1, "cache_hit",
+                f"Reused result of research session {source_session_id} ({how}) for query: {query}")
+
+        return {
+            "session_id": session_id,
+            "status": ResearchStatus.COMPLETED.value,
+            "message": "Research result served from cache",
+            "data": {
+                "cached": True,
+                "match": cached["match"],
+                "similarity": cached.get("similarity"),
+                "source_session_id": source_session_id,
+                "result_id": str(cached["result_id"]),
+                "cached_at": cached["completed_at"].isoformat()
+            },
+            "query": query,
+            "max_loops": max_loops,
+            "search_api": search_api,
+            "priority": priority
+        }
 
-            # Execute research using the actual local-deep-researcher service
-            await self._execute_research(conn, session_id, request)
+    async def _find_in_flight(self, conn: asyncpg.Connection, fingerprint: str) -> Optional[asyncpg.Record]:
+        """The pending or running leader session for `fingerprint`, if any.
 
-        except Exception as e:
-            # Update status to failed
-            await conn.execute("""
-                UPDATE public.research_sessions 
-                SET status = $1, completed_at = $2, error_message = $3
-                WHERE id = $4
-            """, ResearchStatus.FAILED.value, datetime.utcnow(), str(e), session_id)
+        The row is share-locked so it cannot finish before a follower attached
+        to it is committed.
+        """
+        return await conn.fetchrow("""
+            SELECT id, status, started_at, priority
+            FROM public.research_sessions
+            WHERE query_hash = $1
+              AND status IN ($2, $3)
+              AND leader_session_id IS NULL
+            ORDER BY created_at ASC
+            LIMIT 1
+            FOR SHARE
+        """, fingerprint, ResearchStatus.PENDING.value, ResearchStatus.RUNNING.value)
 
+    async def _attach_to_leader(
+        self,
+        conn: asyncpg.Connection,
+        session_id: str,
+        query: str,
+        max_loops: int,
+        search_api: str,
+        user_id: Optional[str],
+        priority: str,
+        fingerprint: str,
+        leader: asyncpg.Record
+    ) -> Dict[str, Any]:
+        """Record a session that shares an in-flight session's run and result.
+
+        Followers mirror the leader's status (see fan_out_research_session_status)
+        and are never claimed by workers.
+        """
+        leader_id = str(leader["id"])
+        priority_value = self.scheduler.priority_value(priority)
+
+        await conn.execute("""
+            INSERT INTO public.research_sessions
+            (id, query, status, max_loops, search_api, user_id, priority, query_hash,
+             leader_session_id, started_at)
+            VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9, $10)
+        """, session_id, query, leader["status"], max_loops, search_api,
+            UUID(user_id) if user_id else None, priority_value, fingerprint,
+            leader["id"], leader["started_at"])
+
+        # A waiting leader inherits the most urgent lane of its followers
+        if leader["status"] == ResearchStatus.PENDING.value and priority_value > leader["priority"]:
             await conn.execute("""
-                INSERT INTO public.research_logs (session_id, step_number, step_type, message)
-                VALUES ($1, $2, $3, $4)
-            """, session_id, 99, "error", f"Research failed: {str(e)}")
+                UPDATE public.research_sessions SET priority = $1 WHERE id = $2
+            """, priority_value, leader["id"])
+
+        await conn.execute("""
+            INSERT INTO public.research_logs (session_id, step_number, step_type, message)
+            VALUES ($1, $2, $3, $4)
+        """, session_id, 1, "coalesce",
+            f"Attached to in-flight research session {leader_id} for query: {query}")
+
+        return {
+            "session_id": session_id,
+            "status": leader["status"],
+            "message": "Research session attached to an identical in-flight session",
+            "data": {
+                "coalesced": True,
+                "leader_session_id": leader_id
+            },
+            "query": query,
+            "max_loops": max_loops,
+            "search_api": search_api,
+            "priority": priority
+        }
+
+    @tracing.traced("research.start_batch")
+    async def start_batch(
+        self,
+        queries: List[str],
+        max_loops: int = 3,
+        search_api: str = "duckduckgo",
+        user_id: Optional[str] = None,
+        priority: str = "normal",
+        max_concurrency: Optional[int] = None,
+        bypass_cache: bool = False
+    ) -> Dict[str, Any]:
+        """Queue one research session per query as a single batch.
+
+        All sessions are created in one statement. Queries that hit the result
+        cache complete immediately, and repeats of a query (within the batch or
+        already in flight) follow a single run, as with start_research. Workers
+        run at most `max_concurrency` of the batch's sessions at a time.
+
+        Raises ValueError for an empty or oversized batch and
+        ResearchAdmissionError when the queue cannot take the new sessions.
+        """
+        if not queries:
+            raise ValueError("A research batch needs at least one query")
+        if len(queries) > self.scheduler.batch_max_size:
+            raise ValueError(
+                f"A research batch may hold at most {self.scheduler.batch_max_size} queries"
+            )
+
+        priority_value = self.scheduler.priority_value(priority)
+        concurrency = self.scheduler.batch_concurrency(max_concurrency)
+        fingerprints = [query_fingerprint(query, max_loops, search_api) for query in queries]
+
+        cached: Dict[str, Dict[str, Any]] = {}
+        if bypass_cache:
+            self.cache.bypassed += len(queries)
+        else:
+            cached = await self._lookup_cached_results(queries, max_loops, search_api, fingerprints)
+
+        batch_id = uuid4()
+        user_uuid = UUID(user_id) if user_id else None
+        sessions = []
+        async with self.db.acquire() as conn:
+            async with conn.transaction():
+                await self.scheduler.lock_admission(conn)
+                leaders = await self._find_in_flight_many(
+                    conn, [fp for fp in fingerprints if fp not in cached]
+                )
+
+                # The first uncached occurrence of a query runs it; repeats follow it
+                batch_leaders: Dict[str, UUID] = {}
+                for index, (query, fingerprint) in enumerate(zip(queries, fingerprints)):
+                    session = {
+                        "id": uuid4(), "batch_index": index, "query": query,
+                        "query_hash": fingerprint, "status": ResearchStatus.PENDING.value,
+                        "leader_session_id": None, "cached_result_id": None, "started_at": None,
+                    }
+                    if fingerprint in cached:
+                        hit = cached[fingerprint]
+                        session["status"] = ResearchStatus.COMPLETED.value
+                        session["cached_result_id"] = hit["result_id"]
+                        session["log"] = ("cache_hit",
+                            f"Reused result of research session {hit['source_session_id']} "
+                            f"({hit['match']} match) for query: {query}")
+                    elif fingerprint in leaders:
+                        leader = leaders[fingerprint]
+                        session["status"] = leader["status"]
+                        session["leader_session_id"] = leader["id"]
+                        session["started_at"] = leader["started_at"]
+                        session["log"] = ("coalesce",
+                            f"Attached to in-flight research session {leader['id']} for query: {query}")
+                    elif fingerprint in batch_leaders:
+                        session["leader_session_id"] = batch_leaders[fingerprint]
+                        session["log"] = ("coalesce",
+                            f"Attached to research session {batch_leaders[fingerprint]} "
+                            f"in the same batch for query: {query}")
+                    else:
+                        batch_leaders[fingerprint] = session["id"]
+                        session["log"] = ("start", f"Research session started for query: {query}")
+                    sessions.append(session)
+
+                if batch_leaders:
+                    await self.scheduler.admit(conn, user_id, len(batch_leaders), batch=True)
 
-        finally:
-            await conn.close()
-            # Clean up task reference
-            if session_id in self._active_tasks:
-                del self._active_tasks[session_id]
+                await conn.execute("""
+                    INSERT INTO public.research_batches (id, user_id, total, max_concurrency)
+                    VALUES ($1, $2, $3, $4)
+                """, batch_id, user_uuid, len(sessions), concurrency)
+
+                # One statement for every session; pending inserts notify idle workers
+                await conn.execute("""
+                    INSERT INTO public.research_sessions
+                    (id, query, status, max_loops, search_api, user_id, priority, query_hash,
+                     leader_session_id, cached_result_id, started_at, completed_at,
+                     batch_id, batch_index, trace_context)
+                    SELECT u.id, u.query, u.status, $9, $10, $11, $12, u.query_hash,
+                           u.leader_session_id, u.cached_result_id,
+                           CASE WHEN u.cached_result_id IS NOT NULL THEN now() ELSE u.started_at END,
+                           CASE WHEN u.cached_result_id IS NOT NULL THEN now() END,
+                           $13, u.batch_index, $14
+                    FROM unnest($1::uuid[], $2::text[], $3::text[], $4::text[], $5::uuid[],
+                                $6::uuid[], $7::timestamptz[], $8::int[])
+                         AS u(id, query, status, query_hash, leader_session_id,
+                              cached_result_id, started_at, batch_index)
+                """, [s["id"] for s in sessions], [s["query"] for s in sessions],
+                    [s["status"] for s in sessions], [s["query_hash"] for s in sessions],
+                    [s["leader_session_id"] for s in sessions],
+                    [s["cached_result_id"] for s in sessions],
+                    [s["started_at"] for s in sessions], [s["batch_index"] for s in sessions],
+                    max_loops, search_api, user_uuid, priority_value, batch_id,
+                    tracing.current_traceparent())
+
+                # Waiting leaders outside the batch inherit its lane, as in _attach_to_leader
+                waiting = [
+                    leader["id"] for leader in leaders.values()
+                    if leader["status"] == ResearchStatus.PENDING.value
+                    and priority_value > leader["priority"]
+                ]
+                if waiting:
+                    await conn.execute("""
+                        UPDATE public.research_sessions SET priority = $1
+                        WHERE id = ANY($2::uuid[])
+                    """, priority_value, waiting)
+
+                await conn.execute("""
+                    INSERT INTO public.research_logs (session_id, step_number, step_type, message)
+                    SELECT session_id, 1, step_type, message
+                    FROM unnest($1::uuid[], $2::text[], $3::text[]) AS u(session_id, step_type, message)
+                """, [s["id"] for s in sessions], [s["log"][0] for s in sessions],
+                    [s["log"][1] for s in sessions])
+
+        return {
+            "batch_id": str(batch_id),
+            "status": (
+                ResearchStatus.COMPLETED.value
+                if all(s["status"] == ResearchStatus.COMPLETED.value for s in sessions)
+                else ResearchStatus.PENDING.value
+            ),
+            "message": f"Research batch of {len(sessions)} queries created and queued",
+            "total": len(sessions),
+            "max_concurrency": concurrency,
+            "max_loops": max_loops,
+            "search_api": search_api,
+            "priority": priority,
+            "sessions": [
+                {
+                    "session_id": str(s["id"]),
+                    "batch_index": s["batch_index"],
+                    "query": s["query"],
+                    "status": s["status"],
+                    "leader_session_id": str(s["leader_session_id"]) if s["leader_session_id"] else None,
+                    "cached": s["cached_result_id"] is not None,
+                }
+                for s in sessions
+            ]
+        }
+
+    @tracing.traced("research.cache_lookup_batch")
+    async def _lookup_cached_results(
+        self,
+        queries: List[str],
+        max_loops: int,
+        search_api: str,
+        fingerprints: List[str]
+    ) -> Dict[str, Dict[str, Any]]:
+        """_lookup_cached_result for many queries, keyed by fingerprint"""
+        unique = dict(zip(fingerprints, queries))
+        found: Dict[str, Dict[str, Any]] = {}
+        if self.cache.enabled:
+            async with self.db.acquire() as conn:
+                rows = await self.cache.lookup_many(conn, list(unique))
+            found = {fp: {**dict(row), "match": "exact"} for fp, row in rows.items()}
+
+        remaining = [fp for fp in unique if fp not in found]
+        if not remaining or not self.semantic_cache.enabled:
+            return found
+
+        matches = await asyncio.gather(*(
+            self.semantic_cache.lookup(unique[fp], max_loops, search_api) for fp in remaining
+        ))
+        matched = {fp: match for fp, match in zip(remaining, matches) if match}
+        if not matched:
+            return found
+
+        # The vector index can outlive the results it points at
+        async with self.db.acquire() as conn:
+            rows = await conn.fetch("""
+                SELECT r.id AS result_id, s.id AS source_session_id, s.completed_at
+                FROM public.research_results r
+                JOIN public.research_sessions s ON s.id = r.session_id
+                WHERE r.id = ANY($1::uuid[]) AND s.status = $2
+            """, [UUID(match["result_id"]) for match in matched.values()],
+                ResearchStatus.COMPLETED.value)
+        results = {str(row["result_id"]): row for row in rows}
+
+        hits = 0
+        for fp, match in matched.items():
+            row = results.get(match["result_id"])
+            if row:
+                hits += 1
+                found[fp] = {**dict(row), "match": "semantic", "similarity": match["similarity"]}
+        self.semantic_cache.record(hits, stale=len(matched) - hits)
+        return found
+
+    async def _find_in_flight_many(
+        self, conn: asyncpg.Connection, fingerprints: List[str]
+    ) -> Dict[str, asyncpg.Record]:
+        """_find_in_flight for many fingerprints; FOR SHARE rules out DISTINCT ON"""
+        if not fingerprints:
+            return {}
+
+        rows = await conn.fetch("""
+            SELECT id, query_hash, status, started_at, priority
+            FROM public.research_sessions
+            WHERE query_hash = ANY($1::text[])
+              AND status IN ($2, $3)
+              AND leader_session_id IS NULL
+            ORDER BY created_at DESC
+            FOR SHARE
+        """, fingerprints, ResearchStatus.PENDING.value, ResearchStatus.RUNNING.value)
+
+        # Newest first, so the oldest session per fingerprint is written last
+        return {row["query_hash"]: row for row in rows}
+
+    @tracing.traced("research.batch_status")
+    async def get_batch_status(self, batch_id: str) -> Optional[Dict[str, Any]]:
+        """Aggregate status of a batch plus the status of each of its sessions.
+
+        The batch status is pending or running until every session has
+        finished, then completed, partial or failed by how many completed.
+        """
+        async with self.db.acquire() as conn:
+            batch = await conn.fetchrow("""
+                SELECT id, user_id, total, max_concurrency, created_at
+                FROM public.research_batches
+                WHERE id = $1
+            """, batch_id)
+            if not batch:
+                return None
+
+            rows = await conn.fetch(f"""
+                SELECT {SESSION_STATUS_COLUMNS}, batch_index
+                FROM public.research_sessions
+                WHERE batch_id = $1
+                ORDER BY batch_index ASC
+            """, batch_id)
+
+        counts = {s.value: 0 for s in ResearchStatus}
+        for row in rows:
+            counts[row["status"]] = counts.get(row["status"], 0) + 1
+
+        unfinished = counts[ResearchStatus.PENDING.value] + counts[ResearchStatus.RUNNING.value]
+        completed = counts[ResearchStatus.COMPLETED.value]
+        if unfinished == 0:
+            # A finished batch is only completed if every session is; one where
+            # some failed or were cancelled is partial, and failed if none completed
+            if completed == len(rows):
+                overall = ResearchStatus.COMPLETED.value
+            elif completed == 0:
+                overall = ResearchStatus.FAILED.value
+            else:
+                overall = "partial"
+        elif counts[ResearchStatus.PENDING.value] == len(rows):
+            overall = ResearchStatus.PENDING.value
+        else:
+            overall = ResearchStatus.RUNNING.value
+
+        return {
+            "batch_id": str(batch["id"]),
+            "status": overall,
+            "user_id": str(batch["user_id"]) if batch["user_id"] else None,
+            "total": batch["total"],
+            "max_concurrency": batch["max_concurrency"],
+            "counts": counts,
+            "created_at": batch["created_at"].isoformat() if batch["created_at"] else None,
+            "sessions": [
+                {**session_row_to_dict(row), "batch_index": row["batch_index"]}
+                for row in rows
+            ]
+        }
+
+    @tracing.traced("research.batch_results")
+    async def get_batch_results(
+        self, batch_id: str, session_ids: Optional[List[str]] = None
+    ) -> List[Dict[str, Any]]:
+        """Results of the batch's completed sessions (or of `session_ids`), in batch order"""
+        async with self.db.acquire() as conn:
+            rows = await conn.fetch(f"""
+                SELECT s.id AS session_id, s.batch_index, s.status, {RESULT_COLUMNS}
+                FROM public.research_sessions s
+                JOIN public.research_results r
+                  ON r.session_id = s.id OR r.id = s.cached_result_id
+                WHERE s.batch_id = $1 AND s.status = $2
+                  AND ($3::uuid[] IS NULL OR s.id = ANY($3::uuid[]))
+                ORDER BY s.batch_index ASC
+            """, batch_id, ResearchStatus.COMPLETED.value, session_ids)
+
+        return [
+            {**result_row_to_dict(str(row["session_id"]), row), "batch_index": row["batch_index"]}
+            for row in rows
+        ]
+
+    def get_cache_stats(self) -> Dict[str, Any]:
+        """Result cache hit/miss counters for this replica"""
+        stats = self.cache.stats()
+        stats["semantic"] = self.semantic_cache.stats()
+        return stats
+
+    async def get_queue_stats(self) -> Dict[str, Any]:
+        """Queue depth and wait time metrics"""
+        async with self.db.acquire() as conn:
+            return await self.scheduler.queue_stats(conn)
+
+    async def run_claimed_session(self, session: Dict[str, Any], worker_id: str):
+        """Run a session a worker has claimed from the queue and record the outcome.
+
+        Terminal writes only apply while `worker_id` still holds the lease, so a
+        worker that lost its lease cannot overwrite the session's new owner.
+        """
+        session_id = session["session_id"]
+        # Continue the trace of the request that queued the session
+        with tracing.span(
+            "research.run",
+            {"research.session_id": session_id, "research.attempt": session["attempts"]},
+            parent=session.get("trace_context"),
+        ):
+            try:
+                await self.log_writer.log(
+                    session_id, 2, "execute",
+                    f"Starting research execution (worker {worker_id}, attempt {session['attempts']})"
+                )
+
+                # Create request for research client
+                request = ResearchRequest(
+                    query=session["query"],
+                    max_loops=session["max_loops"],
+                    search_api=session["search_api"],
+                    user_id=session["user_id"]
+                )
+
+                # Execute research using the actual local-deep-researcher service
+                await self._execute_research(session_id, request, worker_id)
+
+            except LeaseLostError as e:
+                # The session's new owner records its outcome; writing an error
+                # line or status here would only contradict it
+                tracing.record_error(e)
+
+            except Exception as e:
+                tracing.record_error(e)
+                # Buffered progress lines must land before the terminal status
+                await self.log_writer.flush()
+                async with self.db.acquire() as conn:
+                    async with conn.transaction():
+                        # Whatever flush() could not write goes in with the status change
+                        await self.log_writer.write_session(conn, session_id)
+
+                        # Log before the status change so the terminal update is the last write
+                        await conn.execute("""
+                            INSERT INTO public.research_logs (session_id, step_number, step_type, message)
+                            VALUES ($1, $2, $3, $4)
+                        """, session_id, 99, "error", f"Research failed: {str(e)}")
+
+                        # Update status to failed
+                        await conn.execute("""
+                            UPDATE public.research_sessions
+                            SET status = $1, completed_at = $2, error_message = $3,
+                                leased_by = NULL, lease_expires_at = NULL
+                            WHERE id = $4 AND leased_by = $5
+                        """, ResearchStatus.FAILED.value, datetime.utcnow(), str(e), session_id, worker_id)
 
     async def _execute_research(
-        self, 
-        conn: asyncpg.Connection, 
-        session_id: str, 
-        request: ResearchRequest
+        self,
+        session_id: str,
+        request: ResearchRequest,
+        worker_id: Optional[str] = None
     ):
         """Execute research using actual local-deep-researcher service"""
-        
+
         # Use the research client to start the research
-        research_response = await self.research_client.start_research(request)
-        
+        with tracing.span("research.remote_start"):
+            research_response = await self.research_client.start_research(request)
+
         if research_response.status != ResearchStatus.RUNNING:
             raise Exception(f"Failed to start research: {research_response.message}")
-        
+
         remote_session_id = research_response.session_id
-        
+        tracing.set_attributes({"research.remote_session_id": remote_session_id})
+
         # Log the remote session ID
-        await conn.execute("""
-            INSERT INTO public.research_logs (session_id, step_number, step_type, message)
-            VALUES ($1, $2, $3, $4)
-        """, session_id, 3, "remote_start", f"Remote research session started: {remote_session_id}")
-        
-        # Wait for completion
-        final_response = await self.research_client.wait_for_completion(remote_session_id)
-        
+        await self.log_writer.log(
+            session_id, 3, "remote_start", f"Remote research session started: {remote_session_id}"
+        )
+
+        async def log_progress(event: Dict[str, Any]):
+            step_type = str(event.get("step") or event.get("type") or event.get("event") or "progress")
+            message = event.get("message") or event.get("content") or json.dumps(event, default=str)
+            await self.log_writer.log(session_id, 3, step_type[:50], str(message), event)
+
+        # Wait for completion, recording the researcher's progress as it streams
+        with tracing.span("research.wait_for_completion"):
+            final_response = await self.research_client.wait_for_completion(
+                remote_session_id, on_event=log_progress
+            )
+
         if final_response.status == ResearchStatus.COMPLETED:
             # Get the results
-            research_result = await self.research_client.get_research_result(remote_session_id)
-            
+            with tracing.span("research.fetch_result"):
+                research_result = await self.research_client.get_research_result(remote_session_id)
+
             if research_result:
+                await self.log_writer.flush()
+
                 # Store the results
-                await self._store_research_result(conn, session_id, research_result)
+                async with self.db.acquire() as conn:
+                    result_id = await self._store_research_result(conn, session_id, research_result, worker_id)
+
+                # Make the result reusable for paraphrases of this query
+                with tracing.span("research.semantic_index"):
+                    await self.semantic_cache.index(
+                        result_id, request.query, research_result.title,
+                        request.max_loops, request.search_api, datetime.utcnow()
+                    )
             else:
                 raise Exception("Failed to retrieve research results")
         else:
             raise Exception(f"Research failed: {final_response.message}")
 
+    @tracing.traced("research.store_result")
     async def _store_research_result(
-        self, 
-        conn: asyncpg.Connection, 
-        session_id: str, 
-        research_result: ResearchResult
-    ):
-        """Store research results in the database"""
-        
-        # Log completion
-        await conn.execute("""
-            INSERT INTO public.research_logs (session_id, step_number, step_type, message)
-            VALUES ($1, $2, $3, $4)
-        """, session_id, 4, "complete", "Research completed successfully")
+        self,
+        conn: asyncpg.Connection,
+        session_id: str,
+        research_result: ResearchResult,
+        worker_id: Optional[str] = None
+    ) -> str:
+        """Store research results in the database in a single transaction.
 
-        # Store research result
+        With a `worker_id`, the write is rolled back unless that worker still
+        holds the session's lease.
+        """
         result_id = str(uuid4())
-        await conn.execute("""
-            INSERT INTO public.research_results 
-            (id, session_id, title, summary, content, sources, metadata)
-            VALUES ($1, $2, $3, $4, $5, $6, $7)
-        """, result_id, session_id, research_result.title, research_result.summary,
-            research_result.content, json.dumps(research_result.sources), 
-            json.dumps(research_result.metadata))
-
-        # Store individual sources
-        for source in research_result.sources:
+        source_records = [
+            (
+                UUID(session_id),
+                UUID(result_id),
+                source.get("url", ""),
+                source.get("title", ""),
+                source.get("relevance_score", 0.0),
+                json.dumps(source.get("metadata", {})),
+            )
+            for source in research_result.sources
+        ]
+
+        async with conn.transaction():
+            # Whatever flush() could not write goes in with the status change
+            await self.log_writer.write_session(conn, session_id)
+
+            # Log completion
             await conn.execute("""
-                INSERT INTO public.research_sources 
-                (session_id, result_id, url, title, relevance_score, metadata)
-                VALUES ($1, $2, $3, $4, $5, $6)
-            """, session_id, result_id, source.get("url", ""), source.get("title", ""),
-                source.get("relevance_score", 0.0), json.dumps(source.get("metadata", {})))
+                INSERT INTO public.research_logs (session_id, step_number, step_type, message)
+                VALUES ($1, $2, $3, $4)
+            """, session_id, 4, "complete", "Research completed successfully")
 
-        # Update session as completed
-        await conn.execute("""
-            UPDATE public.research_sessions 
-            SET status = $1, completed_at = $2
-            WHERE id = $3
-        """, ResearchStatus.COMPLETED.value, datetime.utcnow(), session_id)
+            # Store research result
+            await conn.execute("""
+                INSERT INTO public.research_results
+                (id, session_id, title, summary, content, sources, metadata)
+                VALUES ($1, $2, $3, $4, $5, $6, $7)
+            """, result_id, session_id, research_result.title, research_result.summary,
+                research_result.content, json.dumps(research_result.sources),
+                json.dumps(research_result.metadata))
+
+            # Store individual sources in bulk
+            await self._insert_sources(conn, source_records)
+
+            # Update session as completed
+            updated = await conn.fetchval("""
+                UPDATE public.research_sessions
+                SET status = $1, completed_at = $2, leased_by = NULL, lease_expires_at = NULL
+                WHERE id = $3 AND ($4::text IS NULL OR leased_by = $4)
+                RETURNING id
+            """, ResearchStatus.COMPLETED.value, datetime.utcnow(), session_id, worker_id)
+            if updated is None:
+                raise LeaseLostError(f"Worker {worker_id} no longer holds research session {session_id}")
+
+        return result_id
+
+    async def _insert_sources(self, conn: asyncpg.Connection, records: List[tuple]):
+        """Bulk insert research_sources rows with a single COPY"""
+        if not records:
+            return
 
+        await conn.copy_records_to_table(
+            "research_sources",
+            schema_name="public",
+            columns=SOURCE_COLUMNS,
+            records=records,
+        )
+
+    @tracing.traced("research.status")
     async def get_research_status(self, session_id: str) -> Optional[Dict[str, Any]]:
         """Get research session status"""
-        conn = await self._get_db_connection()
-        
-        try:
-            row = await conn.fetchrow("""
-                SELECT id, query, status, max_loops, search_api, user_id,
-                       created_at, updated_at, started_at, completed_at, error_message
-                FROM public.research_sessions 
+        async with self.db.acquire() as conn:
+            row = await conn.fetchrow(f"""
+                SELECT {SESSION_STATUS_COLUMNS}
+                FROM public.research_sessions
                 WHERE id = $1
             """, session_id)
-            
-            if not row:
-                return None
-                
-            return {
-                "session_id": str(row["id"]),
-                "query": row["query"],
-                "status": row["status"],
-                "max_loops": row["max_loops"],
-                "search_api": row["search_api"],
-                "user_id": str(row["user_id"]) if row["user_id"] else None,
-                "created_at": row["created_at"].isoformat() if row["created_at"] else None,
-                "updated_at": row["updated_at"].isoformat() if row["updated_at"] else None,
-                "started_at": row["started_at"].isoformat() if row["started_at"] else None,
-                "completed_at": row["completed_at"].isoformat() if row["completed_at"] else None,
-                "error_message": row["error_message"]
-            }
-        finally:
-            await conn.close()
 
+        if not row:
+            return None
+
+        return session_row_to_dict(row)
+
+    @tracing.traced("research.statuses")
+    async def get_research_statuses(self, session_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Status of many sessions in one query, keyed by session ID; unknown IDs are omitted"""
+        async with self.db.acquire() as conn:
+            rows = await conn.fetch(f"""
+                SELECT {SESSION_STATUS_COLUMNS}
+                FROM public.research_sessions
+                WHERE id = ANY($1::uuid[])
+            """, [UUID(session_id) for session_id in session_ids])
+
+        return {str(row["id"]): session_row_to_dict(row) for row in rows}
+
+    @tracing.traced("research.result")
     async def get_research_result(self, session_id: str) -> Optional[Dict[str, Any]]:
         """Get research results for a completed session"""
-        conn = await self._get_db_connection()
-        
-        try:
-            row = await conn.fetchrow("""
-                SELECT r.id, r.title, r.summary, r.content, r.sources, r.metadata, r.created_at,
-                       s.status
-                FROM public.research_results r
-                JOIN public.research_sessions s ON r.session_id = s.id
-                WHERE r.session_id = $1
+        async with self.db.acquire() as conn:
+            row = await conn.fetchrow(f"""
+                SELECT {RESULT_COLUMNS}, s.status
+                FROM public.research_sessions s
+                JOIN public.research_results r
+                  ON r.session_id = s.id OR r.id = s.cached_result_id
+                WHERE s.id = $1
             """, session_id)
-            
-            if not row:
-                return None
-                
-            return {
-                "session_id": session_id,
-                "result_id": str(row["id"]),
-                "title": row["title"],
-                "summary": row["summary"],
-                "content": row["content"],
-                "sources": row["sources"],
-                "metadata": row["metadata"],
-                "created_at": row["created_at"].isoformat(),
-                "status": row["status"]
-            }
-        finally:
-            await conn.close()
 
+        if not row:
+            return None
+
+        return result_row_to_dict(session_id, row)
+
+    @tracing.traced("research.list_sessions")
     async def list_user_sessions(
-        self, 
-        user_id: Optional[str] = None, 
-        limit: int = 50, 
-        offset: int = 0
-    ) -> List[Dict[str, Any]]:
-        """List research sessions for a user"""
-        conn = await self._get_db_connection()
-        
-        try:
-            if user_id:
-                rows = await conn.fetch("""
-                    SELECT id, query, status, max_loops, search_api, 
-                           created_at, started_at, completed_at
-                    FROM public.research_sessions 
-                    WHERE user_id = $1
-                    ORDER BY created_at DESC
-                    LIMIT $2 OFFSET $3
-                """, UUID(user_id), limit, offset)
-            else:
-                rows = await conn.fetch("""
-                    SELECT id, query, status, max_loops, search_api, 
-                           created_at, started_at, completed_at
-                    FROM public.research_sessions 
-                    ORDER BY created_at DESC
-                    LIMIT $1 OFFSET $2
-                """, limit, offset)
-            
-            return [
+        self,
+        user_id: Optional[str] = None,
+        limit: int = 50,
+        offset: int = 0,
+        cursor: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """List research sessions for a user, newest first.
+
+        Pass the returned `next_cursor` back as `cursor` for the following page;
+        cursor pages seek straight to their position on the
+        (user_id, created_at DESC, id DESC) index instead of skipping rows.
+        Raises ValueError for a malformed cursor.
+        """
+        conditions = []
+        args: List[Any] = []
+        if user_id:
+            args.append(UUID(user_id))
+            conditions.append(f"user_id = ${len(args)}")
+        if cursor:
+            args.extend(decode_session_cursor(cursor))
+            conditions.append(f"(created_at, id) < (${len(args) - 1}, ${len(args)})")
+
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        # One extra row tells us whether another page follows
+        args.append(limit + 1)
+        paging = f"LIMIT ${len(args)}"
+        if offset and not cursor:
+            args.append(offset)
+            paging += f" OFFSET ${len(args)}"
+
+        async with self.db.acquire() as conn:
+            rows = await conn.fetch(f"""
+                SELECT id, query, status, max_loops, search_api,
+                       created_at, started_at, completed_at
+                FROM public.research_sessions
+                {where}
+                ORDER BY created_at DESC, id DESC
+                {paging}
+            """, *args)
+
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = encode_session_cursor(rows[-1]["created_at"], rows[-1]["id"])
+
+        return {
+            "sessions": [
                 {
                     "session_id": str(row["id"]),
                     "query": row["query"],
@@ -301,91 +969,149 @@ class ResearchService:
                     "completed_at": row["completed_at"].isoformat() if row["completed_at"] else None
                 }
                 for row in rows
-            ]
-        finally:
-            await conn.close()
+            ],
+            "next_cursor": next_cursor
+        }
 
+    @tracing.traced("research.cancel")
     async def cancel_research(self, session_id: str) -> bool:
-        """Cancel a running research session"""
-        conn = await self._get_db_connection()
-        
-        try:
-            # Check current status
-            status_row = await conn.fetchrow("""
-                SELECT status FROM public.research_sessions WHERE id = $1
-            """, session_id)
-            
-            if not status_row or status_row["status"] != ResearchStatus.RUNNING.value:
-                return False
-            
-            # Cancel background task if it exists
-            if session_id in self._active_tasks:
-                self._active_tasks[session_id].cancel()
-                del self._active_tasks[session_id]
-            
-            # Update database
-            await conn.execute("""
-                UPDATE public.research_sessions 
-                SET status = $1, completed_at = $2
-                WHERE id = $3
-            """, ResearchStatus.CANCELLED.value, datetime.utcnow(), session_id)
+        """Cancel a queued or running research session.
 
-            await conn.execute("""
-                INSERT INTO public.research_logs (session_id, step_number, step_type, message)
-                VALUES ($1, $2, $3, $4)
-            """, session_id, 98, "cancel", "Research session cancelled by user")
-            
-            return True
-        finally:
-            await conn.close()
+        Cancelling a session that others are coalesced onto requeues the
+        oldest remaining follower, which restarts the research from scratch
+        for the rest instead of cancelling it for everyone. The cancelled
+        session's log stays part of their history.
+        """
+        async with self.db.acquire() as conn:
+            async with conn.transaction():
+                # Check current status
+                status_row = await conn.fetchrow("""
+                    SELECT status, leader_session_id FROM public.research_sessions
+                    WHERE id = $1
+                    FOR UPDATE
+                """, session_id)
+
+                if not status_row or status_row["status"] not in (
+                    ResearchStatus.PENDING.value, ResearchStatus.RUNNING.value
+                ):
+                    return False
 
+                await conn.execute("""
+                    INSERT INTO public.research_logs (session_id, step_number, step_type, message)
+                    VALUES ($1, $2, $3, $4)
+                """, session_id, 98, "cancel", "Research session cancelled by user")
+
+                if status_row["leader_session_id"] is None:
+                    await self._promote_follower(conn, session_id)
+
+                # Update database; a worker on another replica notices on its next heartbeat
+                await conn.execute("""
+                    UPDATE public.research_sessions
+                    SET status = $1, completed_at = $2, leased_by = NULL, lease_expires_at = NULL
+                    WHERE id = $3
+                """, ResearchStatus.CANCELLED.value, datetime.utcnow(), session_id)
+
+        # Cancel the local task if this replica is running it
+        task = self._active_tasks.pop(session_id, None)
+        if task is not None:
+            task.cancel()
+
+        return True
+
+    async def _promote_follower(self, conn: asyncpg.Connection, leader_id: str) -> Optional[str]:
+        """Requeue the oldest follower of `leader_id` as the new leader of the rest.
+
+        The successor starts over rather than taking over the cancelled run;
+        it links back to `leader_id` so its followers still see that log.
+        """
+        successor = await conn.fetchval("""
+            UPDATE public.research_sessions
+            SET leader_session_id = NULL, predecessor_session_id = $1, status = $2, started_at = NULL
+            WHERE id = (
+                SELECT id FROM public.research_sessions
+                WHERE leader_session_id = $1 AND status IN ($2, $3)
+                ORDER BY created_at ASC
+                LIMIT 1
+                FOR UPDATE
+            )
+            RETURNING id
+        """, leader_id, ResearchStatus.PENDING.value, ResearchStatus.RUNNING.value)
+
+        if successor is None:
+            return None
+
+        await conn.execute("""
+            UPDATE public.research_sessions
+            SET leader_session_id = $2, status = $3, started_at = NULL
+            WHERE leader_session_id = $1 AND status IN ($3, $4)
+        """, leader_id, successor, ResearchStatus.PENDING.value, ResearchStatus.RUNNING.value)
+
+        await conn.execute("""
+            INSERT INTO public.research_logs (session_id, step_number, step_type, message)
+            VALUES ($1, $2, $3, $4)
+        """, successor, 1, "promote",
+            f"Research session {leader_id} was cancelled; restarting the research in this session")
+
+        return str(successor)
+
+    @tracing.traced("research.logs")
     async def get_research_logs(self, session_id: str) -> List[Dict[str, Any]]:
-        """Get research logs for a session"""
-        conn = await self._get_db_connection()
-        
-        try:
-            rows = await conn.fetch("""
+        """Get research logs for a session, including those of the session it follows"""
+        async with self.db.acquire() as conn:
+            rows = await conn.fetch(f"""
                 SELECT step_number, step_type, message, data, created_at
-                FROM public.research_logs 
-                WHERE session_id = $1
-                ORDER BY step_number ASC
+                FROM public.research_logs
+                WHERE {LOG_SESSION_FILTER}
+                ORDER BY step_number ASC, event_seq ASC
             """, session_id)
-            
-            return [
-                {
-                    "step_number": row["step_number"],
-                    "step_type": row["step_type"],
-                    "message": row["message"],
-                    "data": row["data"],
-                    "timestamp": row["created_at"].isoformat()
-                }
-                for row in rows
-            ]
-        finally:
-            await conn.close()
+
+        return [
+            {
+                "step_number": row["step_number"],
+                "step_type": row["step_type"],
+                "message": row["message"],
+                "data": decode_json(row["data"]),
+                "timestamp": row["created_at"].isoformat()
+            }
+            for row in rows
+        ]
+
+    @tracing.traced("research.logs_since")
+    async def get_research_logs_since(self, session_id: str, after_event_id: int = 0) -> List[Dict[str, Any]]:
+        """Get research logs written after an event id, in write order"""
+        async with self.db.acquire() as conn:
+            rows = await conn.fetch(f"""
+                SELECT {LOG_EVENT_COLUMNS}
+                FROM public.research_logs
+                WHERE ({LOG_SESSION_FILTER}) AND event_seq > $2
+                ORDER BY event_seq ASC
+            """, session_id, after_event_id)
+
+        return [log_row_to_dict(row) for row in rows]
 
     async def health_check(self) -> Dict[str, Any]:
         """Check service health including database and research client"""
         results = {
             "database": "unknown",
+            "database_pool": self.db.stats(),
+            "log_writer": self.log_writer.stats(),
             "research_client": "unknown",
             "active_tasks": len(self._active_tasks)
         }
-        
+
         # Test database connection
         try:
-            conn = await self._get_db_connection()
-            await conn.fetchval("SELECT 1")
-            await conn.close()
+            async with self.db.acquire() as conn:
+                await conn.fetchval("SELECT 1")
             results["database"] = "healthy"
         except Exception as e:
             results["database"] = f"unhealthy: {str(e)}"
-        
+
         # Test research client
         try:
             client_health = await self.research_client.health_check()
             results["research_client"] = client_health["status"]
         except Exception as e:
             results["research_client"] = f"unhealthy: {str(e)}"
-        
-        return results
\ No newline at end of file
+
+        return results
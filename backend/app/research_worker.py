@@ -0,0 +1,242 @@
+"""
+Durable research job queue backed by the research_sessions table
+
+Pending sessions are claimed with SELECT ... FOR UPDATE SKIP LOCKED, in the
+order and within the limits set by ResearchScheduler, so any number of backend
+replicas can pull work without double-running a session. Each claim holds a
+lease that the owning worker renews by heartbeat; leases that stop being
+renewed (crashed or restarted replica) are recovered and the session is queued
+again until it runs out of attempts.
+"""
+import asyncio
+import logging
+import os
+import socket
+from typing import Dict, Any, List, Optional
+from uuid import uuid4
+
+from research_client import ResearchStatus, TERMINAL_VALUES
+from research_service import ResearchService
+
+logger = logging.getLogger(__name__)
+
+
+class ResearchWorkerPool:
+    """Pulls queued research sessions and runs up to `concurrency` at a time"""
+
+    def __init__(
+        self,
+        research_service: ResearchService,
+        concurrency: Optional[int] = None,
+        lease_seconds: Optional[float] = None,
+        heartbeat_interval: Optional[float] = None,
+        poll_interval: Optional[float] = None,
+        max_attempts: Optional[int] = None,
+    ):
+        self.research_service = research_service
+        self.db = research_service.db
+        self.concurrency = (
+            concurrency if concurrency is not None
+            else int(os.getenv("RESEARCH_WORKER_CONCURRENCY", "4"))
+        )
+        self.lease_seconds = (
+            lease_seconds if lease_seconds is not None
+            else float(os.getenv("RESEARCH_WORKER_LEASE_SECONDS", "60"))
+        )
+        self.heartbeat_interval = (
+            heartbeat_interval if heartbeat_interval is not None
+            else float(os.getenv("RESEARCH_WORKER_HEARTBEAT_SECONDS", "15"))
+        )
+        self.poll_interval = (
+            poll_interval if poll_interval is not None
+            else float(os.getenv("RESEARCH_WORKER_POLL_SECONDS", "5"))
+        )
+        self.max_attempts = (
+            max_attempts if max_attempts is not None
+            else int(os.getenv("RESEARCH_MAX_ATTEMPTS", "3"))
+        )
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid4().hex[:8]}"
+        self._wakeup = asyncio.Event()
+        self._tasks: List[asyncio.Task] = []
+        self._stopping = False
+
+    @property
+    def busy(self) -> int:
+        return len(self.research_service._active_tasks)
+
+    def wake(self):
+        """Signal idle workers that new work may be available"""
+        self._wakeup.set()
+
+    def on_status_change(self, session_id: str, status: str):
+        """Status notification hook; wakes workers when work is queued or a slot frees up"""
+        if status == ResearchStatus.PENDING.value or status in TERMINAL_VALUES:
+            self.wake()
+
+    async def start(self):
+        """Start the worker, heartbeat and lease recovery loops"""
+        if self.concurrency <= 0:
+            logger.info("Research workers disabled on this replica")
+            return
+        self._stopping = False
+        self._tasks = [asyncio.create_task(self._worker_loop()) for _ in range(self.concurrency)]
+        self._tasks.append(asyncio.create_task(self._heartbeat_loop()))
+        self._tasks.append(asyncio.create_task(self._recovery_loop()))
+        self.wake()
+        logger.info(f"Research worker {self.worker_id} started with concurrency {self.concurrency}")
+
+    async def stop(self):
+        """Stop pulling work and hand in-flight sessions back to the queue"""
+        self._stopping = True
+        in_flight = list(self.research_service._active_tasks.values())
+        for task in self._tasks + in_flight:
+            task.cancel()
+        await asyncio.gather(*self._tasks, *in_flight, return_exceptions=True)
+        self._tasks = []
+
+        try:
+            async with self.db.acquire() as conn:
+                released = await conn.fetch("""
+                    UPDATE public.research_sessions
+                    SET status = $1, leased_by = NULL, lease_expires_at = NULL,
+                        attempts = GREATEST(attempts - 1, 0)
+                    WHERE leased_by = $2 AND status = $3
+                    RETURNING id
+                """, ResearchStatus.PENDING.value, self.worker_id, ResearchStatus.RUNNING.value)
+            if released:
+                logger.info(f"Returned {len(released)} in-flight research sessions to the queue")
+        except Exception as e:
+            logger.error(f"Failed to release research leases on shutdown: {str(e)}")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "worker_id": self.worker_id,
+            "concurrency": self.concurrency,
+            "busy": self.busy,
+            "lease_seconds": self.lease_seconds,
+        }
+
+    async def _claim(self) -> Optional[Dict[str, Any]]:
+        async with self.db.acquire() as conn:
+            row = await self.research_service.scheduler.claim(conn, self.worker_id, self.lease_seconds)
+
+        if not row:
+            return None
+
+        return {
+            "session_id": str(row["id"]),
+            "query": row["query"],
+            "max_loops": row["max_loops"],
+            "search_api": row["search_api"],
+            "user_id": str(row["user_id"]) if row["user_id"] else None,
+            "attempts": row["attempts"],
+            "trace_context": row["trace_context"],
+        }
+
+    async def _worker_loop(self):
+        while not self._stopping:
+            # Clear before claiming so a wake-up during the claim is not lost
+            self._wakeup.clear()
+            session = None
+            # Leave work queued while the researcher is down rather than burn its attempts
+            if self.research_service.research_client.available:
+                try:
+                    session = await self._claim()
+                except Exception as e:
+                    logger.error(f"Failed to claim research session: {str(e)}")
+
+            if session is None:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            session_id = session["session_id"]
+            task = asyncio.create_task(
+                self.research_service.run_claimed_session(session, self.worker_id)
+            )
+            self.research_service._active_tasks[session_id] = task
+            try:
+                # asyncio.wait does not propagate the task's own cancellation
+                await asyncio.wait({task})
+            finally:
+                self.research_service._active_tasks.pop(session_id, None)
+
+            if not task.cancelled() and task.exception() is not None:
+                logger.error(f"Research session {session_id} crashed: {task.exception()}")
+
+    async def _heartbeat_loop(self):
+        while not self._stopping:
+            await asyncio.sleep(self.heartbeat_interval)
+            session_ids = list(self.research_service._active_tasks)
+            if not session_ids:
+                continue
+            try:
+                async with self.db.acquire() as conn:
+                    rows = await conn.fetch("""
+                        UPDATE public.research_sessions
+                        SET heartbeat_at = now(),
+                            lease_expires_at = now() + make_interval(secs => $1)
+                        WHERE id = ANY($2::uuid[]) AND leased_by = $3 AND status = $4
+                        RETURNING id
+                    """, self.lease_seconds, session_ids, self.worker_id,
+                        ResearchStatus.RUNNING.value)
+            except Exception as e:
+                logger.error(f"Research worker heartbeat failed: {str(e)}")
+                continue
+
+            # Sessions we no longer hold were cancelled or had their lease recovered
+            renewed = {str(row["id"]) for row in rows}
+            for session_id in session_ids:
+                if session_id not in renewed:
+                    task = self.research_service._active_tasks.get(session_id)
+                    if task is not None:
+                        logger.info(f"Research session {session_id} is no longer ours, stopping it")
+                        task.cancel()
+
+    async def _recovery_loop(self):
+        while not self._stopping:
+            try:
+                recovered = await self.recover_expired_leases()
+                if recovered:
+                    self.wake()
+            except Exception as e:
+                logger.error(f"Research lease recovery failed: {str(e)}")
+            await asyncio.sleep(self.lease_seconds / 2)
+
+    async def recover_expired_leases(self) -> int:
+        """Requeue running sessions whose lease expired, failing those out of attempts.
+
+        Sessions left 'running' without any lease (started before the queue
+        existed) are treated as orphaned too; coalesced followers hold no lease
+        and follow their leader instead.
+        """
+        async with self.db.acquire() as conn:
+            rows = await conn.fetch("""
+                WITH expired AS (
+                    UPDATE public.research_sessions
+                    SET status = CASE WHEN attempts >= $1 THEN $2 ELSE $3 END,
+                        completed_at = CASE WHEN attempts >= $1 THEN now() ELSE NULL END,
+                        error_message = CASE WHEN attempts >= $1
+                            THEN 'Research worker stopped responding' ELSE error_message END,
+                        leased_by = NULL,
+                        lease_expires_at = NULL
+                    WHERE status = $4
+                      AND leader_session_id IS NULL
+                      AND (lease_expires_at < now() OR lease_expires_at IS NULL)
+                    RETURNING id, status, attempts
+                )
+                INSERT INTO public.research_logs (session_id, step_number, step_type, message)
+                SELECT id, 97, 'recover',
+                       CASE WHEN status = $2
+                            THEN 'Research worker lease expired; giving up after ' || attempts || ' attempts'
+                            ELSE 'Research worker lease expired; session requeued' END
+                FROM expired
+                RETURNING session_id
+            """, self.max_attempts, ResearchStatus.FAILED.value, ResearchStatus.PENDING.value,
+                ResearchStatus.RUNNING.value)
+
+        if rows:
+            logger.warning(f"Recovered {len(rows)} research sessions with expired leases")
+        return len(rows)
@@ -0,0 +1,97 @@
+"""
+In-process cache of serialized responses that can no longer change
+
+A completed research session's result and log are final, so their JSON bodies
+are serialized once, tagged with a strong ETag derived from the bytes and kept
+in a byte-bounded LRU. Repeat requests are served from memory, and clients
+that send a matching If-None-Match get a 304 without a database round trip.
+"""
+import hashlib
+import os
+from collections import OrderedDict
+from typing import Dict, Any, Hashable, NamedTuple, Optional
+
+# Clients may keep these bodies forever; they are per-user, so not for shared caches
+IMMUTABLE_CACHE_CONTROL = "private, max-age=31536000, immutable"
+
+
+class CachedResponse(NamedTuple):
+    body: bytes
+    etag: str
+
+
+def make_etag(body: bytes) -> str:
+    """Strong ETag for a response body"""
+    return f'"{hashlib.sha256(body).hexdigest()[:32]}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Whether an If-None-Match header value matches `etag` (weak comparison, per RFC 9110)"""
+    if not if_none_match:
+        return False
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*":
+            return True
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == etag:
+            return True
+    return False
+
+
+class ImmutableResponseCache:
+    """LRU of response bodies bounded by their total size in bytes"""
+
+    def __init__(self, max_bytes: Optional[int] = None):
+        self.max_bytes = (
+            max_bytes if max_bytes is not None
+            else int(os.getenv("RESEARCH_RESPONSE_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+        )
+        self._entries: "OrderedDict[Hashable, CachedResponse]" = OrderedDict()
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable) -> Optional[CachedResponse]:
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry
+
+    def put(self, key: Hashable, body: bytes) -> CachedResponse:
+        """Cache `body` under `key` and return it with its ETag.
+
+        Bodies larger than the whole cache are tagged but not kept.
+        """
+        entry = CachedResponse(body, make_etag(body))
+        if len(body) > self.max_bytes:
+            return entry
+
+        previous = self._entries.pop(key, None)
+        if previous is not None:
+            self.size -= len(previous.body)
+        self._entries[key] = entry
+        self.size += len(body)
+
+        while self.size > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self.size -= len(evicted.body)
+            self.evictions += 1
+        return entry
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "bytes": self.size,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
@@ -0,0 +1,275 @@
+"""
+Distributed tracing for the backend (OpenTelemetry)
+
+Tracing is off unless TRACING_EXPORTER names an exporter:
+
+- "file": one JSON span per line in TRACING_FILE_PATH; works fully offline
+- "otlp": OTLP over HTTP to OTEL_EXPORTER_OTLP_ENDPOINT (needs
+  opentelemetry-exporter-otlp-proto-http)
+- "console": spans printed to stdout
+
+When enabled, every incoming request, ResearchService step, upstream httpx
+call and asyncpg query gets a span, and upstream calls carry the W3C
+traceparent header so the researcher and ComfyUI can join the trace. Queued
+research sessions keep the trace context of the request that created them,
+so a worker's run shows up in that request's trace. When tracing is off, or
+the OpenTelemetry packages are missing, every helper here is a no-op.
+"""
+import functools
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Any, Iterator, Optional
+
+import httpx
+
+try:
+    from opentelemetry import propagate, trace
+    from opentelemetry.trace import SpanKind, Status, StatusCode
+except ImportError:
+    trace = None
+
+logger = logging.getLogger(__name__)
+
+# Long statements are cut so a bulk insert does not bloat its span
+MAX_STATEMENT_LENGTH = 1000
+
+_provider = None
+
+
+def _tracer():
+    return trace.get_tracer("backend")
+
+
+def _make_exporter(name: str):
+    """Span exporter for TRACING_EXPORTER, or None if it cannot be built"""
+    if name == "file":
+        return JsonLinesSpanExporter(os.getenv("TRACING_FILE_PATH", "/tmp/backend-traces.jsonl"))
+    if name == "console":
+        from opentelemetry.sdk.trace.export import ConsoleSpanExporter
+        return ConsoleSpanExporter()
+    if name == "otlp":
+        try:
+            from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+        except ImportError:
+            logger.warning("TRACING_EXPORTER=otlp needs opentelemetry-exporter-otlp-proto-http; tracing disabled")
+            return None
+        return OTLPSpanExporter()
+    logger.warning(f"Unknown TRACING_EXPORTER {name!r}; tracing disabled")
+    return None
+
+
+def start(exporter: Optional[str] = None):
+    """Install the tracer provider configured by the environment"""
+    global _provider
+    exporter = (exporter if exporter is not None else os.getenv("TRACING_EXPORTER", "none")).lower()
+    if exporter in ("", "none") or _provider is not None:
+        return
+    if trace is None:
+        logger.warning("Tracing requested but OpenTelemetry is not installed; tracing disabled")
+        return
+    try:
+        from opentelemetry.sdk.resources import Resource
+        from opentelemetry.sdk.trace import TracerProvider
+        from opentelemetry.sdk.trace.export import BatchSpanProcessor
+        from opentelemetry.sdk.trace.sampling import ParentBasedTraceIdRatio
+    except ImportError:
+        logger.warning("Tracing requested but opentelemetry-sdk is not installed; tracing disabled")
+        return
+
+    span_exporter = _make_exporter(exporter)
+    if span_exporter is None:
+        return
+
+    provider = TracerProvider(
+        resource=Resource.create({"service.name": os.getenv("OTEL_SERVICE_NAME", "backend")}),
+        sampler=ParentBasedTraceIdRatio(float(os.getenv("TRACING_SAMPLE_RATIO", "1.0"))),
+    )
+    # Spans are exported from a background thread, off the event loop
+    provider.add_span_processor(BatchSpanProcessor(span_exporter))
+    trace.set_tracer_provider(provider)
+    _provider = provider
+    logger.info(f"Tracing enabled with the {exporter} exporter")
+
+
+def shutdown():
+    """Export buffered spans and stop tracing"""
+    global _provider
+    if _provider is None:
+        return
+    provider, _provider = _provider, None
+    provider.shutdown()
+
+
+class JsonLinesSpanExporter:
+    """Appends finished spans to a file, one JSON object per line"""
+
+    def __init__(self, path: str):
+        from opentelemetry.sdk.trace.export import SpanExportResult
+        self._result = SpanExportResult
+        self.path = path
+        self._lock = threading.Lock()
+        self._file = open(path, "a", encoding="utf-8")
+
+    def export(self, spans) -> "SpanExportResult":
+        with self._lock:
+            for span in spans:
+                self._file.write(span.to_json(indent=None) + "\n")
+            self._file.flush()
+        return self._result.SUCCESS
+
+    def shutdown(self):
+        with self._lock:
+            self._file.close()
+
+    def force_flush(self, timeout_millis: int = 30000) -> bool:
+        return True
+
+
+@contextmanager
+def span(name: str, attributes: Optional[Dict[str, Any]] = None, parent: Optional[str] = None) -> Iterator[Any]:
+    """Run the block in a span; `parent` is a traceparent header value to continue"""
+    if _provider is None:
+        yield None
+        return
+    ctx = propagate.extract({"traceparent": parent}) if parent else None
+    with _tracer().start_as_current_span(name, context=ctx, attributes=attributes) as current:
+        yield current
+
+
+def traced(name: str):
+    """Decorator running an async function in a span"""
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            if _provider is None:
+                return await func(*args, **kwargs)
+            with _tracer().start_as_current_span(name):
+                return await func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def set_attributes(attributes: Dict[str, Any]):
+    """Add attributes to the current span"""
+    if _provider is None:
+        return
+    trace.get_current_span().set_attributes(
+        {key: value for key, value in attributes.items() if value is not None}
+    )
+
+
+def record_error(error: BaseException):
+    """Mark the current span as failed by `error` when the error is handled rather than raised"""
+    if _provider is None:
+        return
+    current = trace.get_current_span()
+    current.record_exception(error)
+    current.set_status(Status(StatusCode.ERROR, str(error)))
+
+
+def current_traceparent() -> Optional[str]:
+    """traceparent header for the current span, to resume the trace elsewhere"""
+    if _provider is None:
+        return None
+    carrier: Dict[str, str] = {}
+    propagate.inject(carrier)
+    return carrier.get("traceparent")
+
+
+class TracingMiddleware:
+    """ASGI middleware opening a server span per request, continuing any incoming traceparent"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or _provider is None:
+            await self.app(scope, receive, send)
+            return
+
+        headers = {key.decode("latin-1"): value.decode("latin-1") for key, value in scope["headers"]}
+        status_code = 500
+
+        async def send_with_status(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        with _tracer().start_as_current_span(
+            scope["method"], context=propagate.extract(headers), kind=SpanKind.SERVER,
+            attributes={"http.request.method": scope["method"], "url.path": scope["path"]},
+        ) as current:
+            try:
+                await self.app(scope, receive, send_with_status)
+            finally:
+                # The route template is only known once the router has matched it
+                route = getattr(scope.get("route"), "path", None)
+                if route:
+                    current.update_name(f"{scope['method']} {route}")
+                    current.set_attribute("http.route", route)
+                current.set_attribute("http.response.status_code", status_code)
+                if status_code >= 500:
+                    current.set_status(Status(StatusCode.ERROR))
+
+
+class TracedTransport(httpx.AsyncBaseTransport):
+    """httpx transport opening a client span per attempt and propagating its context"""
+
+    def __init__(self, transport: httpx.AsyncBaseTransport, upstream: str):
+        self.transport = transport
+        self.upstream = upstream
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        if _provider is None:
+            return await self.transport.handle_async_request(request)
+
+        with _tracer().start_as_current_span(
+            f"{self.upstream} {request.method}", kind=SpanKind.CLIENT,
+            attributes={
+                "peer.service": self.upstream,
+                "http.request.method": request.method,
+                "url.full": str(request.url.copy_with(query=None)),
+            },
+        ) as current:
+            propagate.inject(request.headers)
+            response = await self.transport.handle_async_request(request)
+            current.set_attribute("http.response.status_code", response.status_code)
+            if response.status_code >= 500:
+                current.set_status(Status(StatusCode.ERROR))
+            return response
+
+    async def aclose(self):
+        await self.transport.aclose()
+
+
+def _record_query(record):
+    """asyncpg query logger turning each finished query into a span.
+
+    asyncpg calls this right after the query, in a copy of the caller's
+    context, so the span is parented to whatever span ran the query.
+    """
+    if _provider is None or not trace.get_current_span().is_recording():
+        # Worker polls and heartbeats outside any request are not worth a trace each
+        return
+    end = time.time_ns()
+    query_span = _tracer().start_span(
+        "postgres query", kind=SpanKind.CLIENT,
+        start_time=end - int(record.elapsed * 1e9),
+        attributes={
+            "db.system": "postgresql",
+            "db.statement": " ".join(record.query.split())[:MAX_STATEMENT_LENGTH],
+        },
+    )
+    if record.exception is not None:
+        query_span.set_status(Status(StatusCode.ERROR, str(record.exception)))
+    query_span.end(end_time=end)
+
+
+def instrument_connection(conn):
+    """Trace the queries of an asyncpg connection when tracing is enabled"""
+    if _provider is not None:
+        conn.add_query_logger(_record_query)
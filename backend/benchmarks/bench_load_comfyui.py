@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Load-test image generation and image fetching through the backend.
+
+Each iteration queues a prompt with POST /comfyui/generate, follows it to
+completion and downloads the first output image with
+GET /comfyui/image/{filename}. By default the backend waits for completion
+inside the generate call (wait_for_completion=true); with --client-poll the
+prompt is queued without waiting and the client polls
+GET /comfyui/history/{prompt_id} instead.
+
+Usage:
+    DATABASE_URL=postgresql://... python bench_load_comfyui.py --start-fakes --start-backend [--concurrency 10] [--duration 30] [--json]
+    python bench_load_comfyui.py --base-url http://localhost:8000 --client-poll
+"""
+
+import argparse
+import asyncio
+
+import httpx
+
+from load_harness import OperationFailed, Recorder, add_common_args, environment, main_for, run_config
+
+
+def first_image(outputs):
+    for node in outputs.values():
+        for image in node.get("images", []):
+            return image
+    raise OperationFailed("prompt produced no images")
+
+
+def make_scenario(args: argparse.Namespace):
+    async def generate_and_fetch(client: httpx.AsyncClient, recorder: Recorder, index: int):
+        response = await recorder.call("generate", client.post("/comfyui/generate", json={
+            "prompt": f"benchmark image {index}",
+            "width": args.size,
+            "height": args.size,
+            "steps": 1,
+            "seed": index,
+            "wait_for_completion": not args.client_poll,
+        }))
+        body = response.json()
+        if not body.get("success"):
+            raise OperationFailed(f"generate failed: {body.get('error')}")
+
+        if args.client_poll:
+            prompt_id = body["prompt_id"]
+            while True:
+                response = await recorder.call("history", client.get(f"/comfyui/history/{prompt_id}"))
+                history = response.json()["history"].get(prompt_id)
+                if history and "outputs" in history:
+                    outputs = history["outputs"]
+                    break
+                await asyncio.sleep(args.poll_interval)
+        else:
+            outputs = body["data"]["outputs"]
+
+        image = first_image(outputs)
+        response = await recorder.call("fetch", client.get(
+            f"/comfyui/image/{image['filename']}",
+            params={"subfolder": image.get("subfolder", ""), "folder_type": image.get("type", "output")},
+        ))
+        if not response.content:
+            raise OperationFailed("empty image")
+
+    return generate_and_fetch
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    add_common_args(parser)
+    parser.add_argument("--size", type=int, default=512, help="Requested width and height")
+    parser.add_argument("--client-poll", action="store_true", help="Queue without waiting and poll history")
+    parser.add_argument("--poll-interval", type=float, default=0.5, help="Seconds between history polls")
+    parser.add_argument("--image-seconds", type=float, default=1.0, help="Fake render time (--start-fakes)")
+    args = parser.parse_args()
+
+    config = run_config(
+        args, size=args.size, client_poll=args.client_poll, poll_interval=args.poll_interval,
+        image_seconds=args.image_seconds,
+    )
+    fake_args = ["--image-seconds", str(args.image_seconds), "--image-size", str(args.size)]
+    with environment(args, ["comfyui"], fake_args) as env:
+        asyncio.run(main_for("comfyui_load", args, make_scenario(args), config, backend_pid=env["backend_pid"]))
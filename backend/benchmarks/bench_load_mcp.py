@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""
+Load-test ACI MCP tool discovery.
+
+Each iteration does what a chat client does before calling a tool: list the
+available tools, search functions for an intent and call the chosen one,
+through ACIMCPClient's wire format (GET /mcp/v1/tools and
+POST /mcp/v1/tools/call). The backend is not involved; point --mcp-url at an
+MCP server or use --start-fakes for the fake one.
+
+Usage:
+    python bench_load_mcp.py --start-fakes [--concurrency 20] [--duration 30] [--json]
+    ACI_API_KEY=... python bench_load_mcp.py --mcp-url http://localhost:8101
+"""
+
+import argparse
+import asyncio
+import os
+
+import httpx
+
+from load_harness import FAKE_URLS, Recorder, add_common_args, environment, main_for, run_config
+
+INTENTS = ["create a github issue", "send an email", "post to slack", "search the web", "add a notion page"]
+
+
+def make_scenario(args: argparse.Namespace):
+    headers = {
+        "X-API-KEY": os.getenv("ACI_API_KEY", "benchmark"),
+        "X-Linked-Account-Owner-Id": os.getenv("ACI_LINKED_ACCOUNT_ID", "default"),
+    }
+
+    async def discover_and_call(client: httpx.AsyncClient, recorder: Recorder, index: int):
+        response = await recorder.call("list_tools", client.get("/mcp/v1/tools", headers=headers))
+        tools = response.json()
+
+        response = await recorder.call("search", client.post("/mcp/v1/tools/call", headers=headers, json={
+            "name": "ACI_SEARCH_FUNCTIONS",
+            "arguments": {"intent": INTENTS[index % len(INTENTS)], "limit": args.limit},
+        }))
+        functions = response.json() or tools
+
+        await recorder.call("execute", client.post("/mcp/v1/tools/call", headers=headers, json={
+            "name": "ACI_EXECUTE_FUNCTION",
+            "arguments": {"function_name": functions[0]["name"], "function_arguments": {"query": "benchmark"}},
+        }))
+
+    return discover_and_call
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    add_common_args(parser)
+    parser.add_argument("--mcp-url", default=FAKE_URLS["mcp"], help="MCP server to load")
+    parser.add_argument("--limit", type=int, default=10, help="Functions returned per search")
+    parser.add_argument("--tool-count", type=int, default=200, help="Tools listed by the fake (--start-fakes)")
+    args = parser.parse_args()
+    args.start_backend = False
+
+    config = run_config(args, limit=args.limit, tool_count=args.tool_count)
+    with environment(args, ["mcp"], ["--tool-count", str(args.tool_count)]) as env:
+        asyncio.run(main_for("mcp_discovery", args, make_scenario(args), config, base_url=args.mcp_url, measure_rss=False))
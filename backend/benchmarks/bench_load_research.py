@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Load-test research session start and status polling.
+
+Each iteration queues a research session with POST /research/start and polls
+GET /research/{session_id}/status until it reaches a terminal state, timing
+the start call, every poll and the whole session. With --start-fakes and
+--start-backend the backend runs against fake_upstreams.py, so this measures
+the backend's queueing, worker and database path rather than a model.
+
+Usage:
+    DATABASE_URL=postgresql://... python bench_load_research.py --start-fakes --start-backend [--concurrency 10] [--duration 30] [--json]
+    python bench_load_research.py --base-url http://localhost:8000 [--repeat-queries 0.5]
+"""
+
+import argparse
+import asyncio
+import random
+
+import httpx
+
+from load_harness import OperationFailed, Recorder, add_common_args, environment, main_for, run_config
+
+TERMINAL_STATUSES = ("completed", "failed", "cancelled")
+
+
+def make_scenario(args: argparse.Namespace):
+    async def research_session(client: httpx.AsyncClient, recorder: Recorder, index: int):
+        # Repeated queries exercise the result cache and in-flight coalescing
+        if args.repeat_queries and random.random() < args.repeat_queries:
+            query = f"benchmark query {random.randrange(args.query_pool)}"
+        else:
+            query = f"benchmark query {index} {random.random()}"
+
+        response = await recorder.call("start", client.post("/research/start", json={
+            "query": query,
+            "max_loops": 1,
+            "bypass_cache": not args.repeat_queries,
+        }))
+        session_id = response.json()["session_id"]
+
+        while True:
+            response = await recorder.call("status", client.get(f"/research/{session_id}/status"))
+            status = response.json()["status"]
+            if status in TERMINAL_STATUSES:
+                break
+            await asyncio.sleep(args.poll_interval)
+
+        if status != "completed":
+            raise OperationFailed(f"session {session_id} ended {status}")
+
+    return research_session
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    add_common_args(parser)
+    parser.add_argument("--poll-interval", type=float, default=0.5, help="Seconds between status polls")
+    parser.add_argument("--research-seconds", type=float, default=2.0, help="Fake research duration (--start-fakes)")
+    parser.add_argument("--repeat-queries", type=float, default=0.0,
+                        help="Fraction of iterations reusing a query from a small pool")
+    parser.add_argument("--query-pool", type=int, default=20, help="Size of the repeated query pool")
+    args = parser.parse_args()
+
+    config = run_config(
+        args, poll_interval=args.poll_interval, research_seconds=args.research_seconds,
+        repeat_queries=args.repeat_queries, query_pool=args.query_pool,
+    )
+    with environment(args, ["research"], ["--research-seconds", str(args.research_seconds)]) as env:
+        asyncio.run(main_for("research_load", args, make_scenario(args), config, backend_pid=env["backend_pid"]))
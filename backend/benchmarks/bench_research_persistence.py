@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+Benchmark research result persistence.
+
+Measures rows/sec for storing a research result with N sources using the
+legacy row-by-row loop, a batched executemany and the COPY-based
+ResearchService write path. Runs against the database in DATABASE_URL and
+removes every row it creates.
+
+Usage:
+    DATABASE_URL=postgresql://... python bench_research_persistence.py [--sizes 10 100 1000] [--repeat 5] [--json]
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Any, List
+from uuid import UUID, uuid4
+
+# Make the backend app modules importable
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "app"))
+
+from db import DatabasePool
+from research_client import ResearchResult, ResearchStatus
+from research_service import ResearchService, SOURCE_COLUMNS
+
+
+def make_result(session_id: str, size: int) -> ResearchResult:
+    """Build a synthetic research result with `size` sources"""
+    return ResearchResult(
+        session_id=session_id,
+        title="Benchmark result",
+        summary="Synthetic summary",
+        content="Synthetic content " * 50,
+        sources=[
+            {
+                "url": f"https://example.com/source/{i}",
+                "title": f"Source {i}",
+                "relevance_score": i / max(size, 1),
+                "metadata": {"rank": i, "engine": "benchmark"},
+            }
+            for i in range(size)
+        ],
+        metadata={"benchmark": True},
+    )
+
+
+async def store_row_by_row(conn, session_id: str, research_result: ResearchResult):
+    """The pre-bulk write path: one round trip per row, no transaction"""
+    await conn.execute("""
+        INSERT INTO public.research_logs (session_id, step_number, step_type, message)
+        VALUES ($1, $2, $3, $4)
+    """, session_id, 4, "complete", "Research completed successfully")
+
+    result_id = str(uuid4())
+    await conn.execute("""
+        INSERT INTO public.research_results
+        (id, session_id, title, summary, content, sources, metadata)
+        VALUES ($1, $2, $3, $4, $5, $6, $7)
+    """, result_id, session_id, research_result.title, research_result.summary,
+        research_result.content, json.dumps(research_result.sources),
+        json.dumps(research_result.metadata))
+
+    for source in research_result.sources:
+        await conn.execute("""
+            INSERT INTO public.research_sources
+            (session_id, result_id, url, title, relevance_score, metadata)
+            VALUES ($1, $2, $3, $4, $5, $6)
+        """, session_id, result_id, source.get("url", ""), source.get("title", ""),
+            source.get("relevance_score", 0.0), json.dumps(source.get("metadata", {})))
+
+    await conn.execute("""
+        UPDATE public.research_sessions
+        SET status = $1, completed_at = $2
+        WHERE id = $3
+    """, ResearchStatus.COMPLETED.value, datetime.utcnow(), session_id)
+
+
+async def insert_sources_executemany(conn, records: List[tuple]):
+    """Batched alternative to the COPY used by ResearchService._insert_sources"""
+    await conn.executemany(f"""
+        INSERT INTO public.research_sources ({", ".join(SOURCE_COLUMNS)})
+        VALUES ($1, $2, $3, $4, $5, $6)
+    """, records)
+
+
+async def run_strategy(
+    service: ResearchService, strategy: str, size: int, repeat: int
+) -> Dict[str, Any]:
+    """Time `repeat` stores of a result with `size` sources"""
+    session_ids = [str(uuid4()) for _ in range(repeat)]
+    timings: List[float] = []
+
+    async with service.db.acquire() as conn:
+        await conn.executemany("""
+            INSERT INTO public.research_sessions (id, query, status)
+            VALUES ($1, $2, $3)
+        """, [(UUID(sid), "benchmark", ResearchStatus.RUNNING.value) for sid in session_ids])
+
+        try:
+            for session_id in session_ids:
+                research_result = make_result(session_id, size)
+                started = time.perf_counter()
+                if strategy == "row_by_row":
+                    await store_row_by_row(conn, session_id, research_result)
+                else:
+                    await service._store_research_result(conn, session_id, research_result)
+                timings.append(time.perf_counter() - started)
+        finally:
+            await conn.execute(
+                "DELETE FROM public.research_sessions WHERE id = ANY($1::uuid[])",
+                session_ids,
+            )
+
+    best = min(timings)
+    mean = sum(timings) / len(timings)
+    return {
+        "strategy": strategy,
+        "sources": size,
+        "repeat": repeat,
+        "best_seconds": round(best, 6),
+        "mean_seconds": round(mean, 6),
+        "rows_per_sec": round(size / mean, 1) if mean > 0 else None,
+    }
+
+
+async def main(sizes: List[int], repeat: int, as_json: bool):
+    pool = DatabasePool(min_size=1, max_size=2)
+    await pool.start()
+    copy_service = ResearchService(pool)
+    executemany_service = ResearchService(pool)
+    executemany_service._insert_sources = insert_sources_executemany
+
+    results = []
+    try:
+        for size in sizes:
+            results.append(await run_strategy(copy_service, "row_by_row", size, repeat))
+            results.append(await run_strategy(executemany_service, "executemany", size, repeat))
+            results.append(await run_strategy(copy_service, "copy", size, repeat))
+    finally:
+        await pool.close()
+
+    if as_json:
+        print(json.dumps(results, indent=2))
+        return
+
+    print(f"{'sources':>8}  {'strategy':<12}  {'mean ms':>10}  {'rows/sec':>12}")
+    for r in results:
+        print(
+            f"{r['sources']:>8}  {r['strategy']:<12}  "
+            f"{r['mean_seconds'] * 1000:>10.2f}  {r['rows_per_sec']:>12,.1f}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1000])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--json", action="store_true", help="Emit results as JSON")
+    args = parser.parse_args()
+    asyncio.run(main(args.sizes, args.repeat, args.json))
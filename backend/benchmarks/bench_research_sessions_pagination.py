@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""
+Benchmark research session listing: LIMIT/OFFSET versus keyset cursors.
+
+Seeds research_sessions with N rows spread over a few users (one INSERT ...
+SELECT generate_series), then times fetching one page at increasing depths
+with OFFSET and with the cursor that ResearchService.list_user_sessions
+returns. Runs against the database in DATABASE_URL and removes every row it
+creates unless --keep is given.
+
+Usage:
+    DATABASE_URL=postgresql://... python bench_research_sessions_pagination.py [--rows 1000000] [--users 10] [--depths 0 1000 10000 100000] [--page-size 50] [--repeat 5] [--explain] [--json]
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+import time
+from pathlib import Path
+from typing import Dict, Any, List
+
+# Make the backend app modules importable
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "app"))
+
+from db import DatabasePool
+from research_service import ResearchService, encode_session_cursor, decode_session_cursor
+
+SEED_USER_PREFIX = "bench-pagination-user-"
+# Seeding and cleaning up a million rows outlasts the pool's command timeout
+SEED_TIMEOUT = 3600
+
+
+async def seed(conn, rows: int, users: int) -> List[str]:
+    """Create `users` users owning `rows` sessions with distinct timestamps"""
+    user_ids = [
+        str(row["id"])
+        for row in await conn.fetch("""
+            INSERT INTO public.users (name)
+            SELECT $1 || g FROM generate_series(1, $2) AS g
+            RETURNING id
+        """, SEED_USER_PREFIX, users)
+    ]
+
+    await conn.execute("""
+        INSERT INTO public.research_sessions
+        (query, status, max_loops, search_api, user_id, created_at, started_at, completed_at)
+        SELECT 'benchmark query ' || g, 'completed', 3, 'duckduckgo',
+               ($1::uuid[])[1 + g % array_length($1::uuid[], 1)],
+               now() - make_interval(secs => g),
+               now() - make_interval(secs => g),
+               now() - make_interval(secs => g)
+        FROM generate_series(1, $2) AS g
+    """, user_ids, rows, timeout=SEED_TIMEOUT)
+    await conn.execute("ANALYZE public.research_sessions", timeout=SEED_TIMEOUT)
+    return user_ids
+
+
+async def cleanup(conn):
+    # Sessions go with their users (ON DELETE CASCADE)
+    await conn.execute(
+        "DELETE FROM public.users WHERE name LIKE $1", SEED_USER_PREFIX + "%", timeout=SEED_TIMEOUT
+    )
+
+
+async def time_call(coro_factory, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        await coro_factory()
+        timings.append(time.perf_counter() - started)
+    return sorted(timings)[len(timings) // 2]
+
+
+async def cursor_at(conn, user_id: str, depth: int) -> str:
+    """Cursor a client would hold after paging down to `depth` rows"""
+    row = await conn.fetchrow("""
+        SELECT created_at, id FROM public.research_sessions
+        WHERE user_id = $1
+        ORDER BY created_at DESC, id DESC
+        OFFSET $2 LIMIT 1
+    """, user_id, depth - 1)
+    return encode_session_cursor(row["created_at"], row["id"]) if row else None
+
+
+async def explain(conn, user_id: str, depth: int, page_size: int, cursor: str):
+    offset_plan = await conn.fetch("""
+        EXPLAIN (ANALYZE, BUFFERS)
+        SELECT id FROM public.research_sessions
+        WHERE user_id = $1
+        ORDER BY created_at DESC, id DESC
+        LIMIT $2 OFFSET $3
+    """, user_id, page_size, depth)
+    print(f"\n-- OFFSET {depth}")
+    print("\n".join(r[0] for r in offset_plan))
+
+    if cursor:
+        created_at, last_id = decode_session_cursor(cursor)
+        keyset_plan = await conn.fetch("""
+            EXPLAIN (ANALYZE, BUFFERS)
+            SELECT id FROM public.research_sessions
+            WHERE user_id = $1 AND (created_at, id) < ($2, $3)
+            ORDER BY created_at DESC, id DESC
+            LIMIT $4
+        """, user_id, created_at, last_id, page_size)
+        print(f"\n-- keyset at depth {depth}")
+        print("\n".join(r[0] for r in keyset_plan))
+
+
+async def main(args) -> List[Dict[str, Any]]:
+    pool = DatabasePool(min_size=1, max_size=2)
+    await pool.start()
+    service = ResearchService(pool)
+    results = []
+
+    try:
+        async with pool.acquire() as conn:
+            started = time.perf_counter()
+            user_ids = await seed(conn, args.rows, args.users)
+            print(f"Seeded {args.rows:,} sessions in {time.perf_counter() - started:.1f}s", file=sys.stderr)
+
+        user_id = user_ids[0]
+        for depth in args.depths:
+            async with pool.acquire() as conn:
+                cursor = await cursor_at(conn, user_id, depth) if depth else None
+                if args.explain:
+                    await explain(conn, user_id, depth, args.page_size, cursor)
+            if depth and cursor is None:
+                continue
+
+            offset_seconds = await time_call(
+                lambda: service.list_user_sessions(user_id, args.page_size, offset=depth), args.repeat
+            )
+            keyset_seconds = await time_call(
+                lambda: service.list_user_sessions(user_id, args.page_size, cursor=cursor), args.repeat
+            )
+            results.append({
+                "depth": depth,
+                "page_size": args.page_size,
+                "offset_ms": round(offset_seconds * 1000, 3),
+                "keyset_ms": round(keyset_seconds * 1000, 3),
+                "speedup": round(offset_seconds / keyset_seconds, 1) if keyset_seconds > 0 else None,
+            })
+    finally:
+        if not args.keep:
+            async with pool.acquire() as conn:
+                await cleanup(conn)
+        await pool.close()
+
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--users", type=int, default=10)
+    parser.add_argument("--depths", type=int, nargs="+", default=[0, 1_000, 10_000, 50_000, 99_000])
+    parser.add_argument("--page-size", type=int, default=50)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--explain", action="store_true", help="Print EXPLAIN ANALYZE for both strategies")
+    parser.add_argument("--keep", action="store_true", help="Leave the seeded rows in place")
+    parser.add_argument("--json", action="store_true", help="Emit results as JSON")
+    args = parser.parse_args()
+
+    results = asyncio.run(main(args))
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print(f"{'depth':>8}  {'offset ms':>10}  {'keyset ms':>10}  {'speedup':>8}")
+        for r in results:
+            print(f"{r['depth']:>8,}  {r['offset_ms']:>10.2f}  {r['keyset_ms']:>10.2f}  {str(r['speedup']) + 'x':>8}")
@@ -0,0 +1,291 @@
+#!/usr/bin/env python3
+"""
+Compare a load-test run against earlier runs and flag regressions.
+
+Reports saved by the bench_load_*.py scripts (--save) live in
+results/<benchmark>/. This compares a candidate report with one or more
+baseline reports of the same benchmark:
+
+- per operation: p50/p95/p99 latency, throughput and error rate
+- per run: total throughput and the backend's peak RSS
+
+A change only counts as a regression when it exceeds both the metric's budget
+(a relative change, from results/budgets.json) and the run-to-run noise,
+estimated as noise_z standard deviations across the baselines. Latency also
+has to move by at least min_latency_delta_ms, so sub-millisecond jitter on
+fast endpoints never fails a build. Percentiles are only compared when the
+operation has enough samples for the percentile to mean something.
+
+Exit status: 0 when every metric is within budget, 1 when a budget is
+exceeded, 2 when the runs cannot be compared.
+
+Usage:
+    python compare_runs.py results/research_load/20261018T120000Z-abc1234.json
+    python compare_runs.py candidate.json --baseline results/research_load --window 3
+    python compare_runs.py new.json --baseline old.json [--budgets budgets.json] [--json]
+"""
+
+import argparse
+import json
+import math
+import statistics
+import sys
+from pathlib import Path
+from typing import Dict, Any, List, Optional, Tuple
+
+from load_harness import RESULTS_DIR
+
+DEFAULT_BUDGETS = {
+    "latency": 0.10,
+    "throughput": 0.10,
+    "rss": 0.15,
+    "error_rate": 0.01,
+    "min_latency_delta_ms": 1.0,
+    "noise_z": 3.0,
+}
+
+# (metric, budget, direction): +1 when higher is worse, -1 when lower is worse
+OPERATION_METRICS = [
+    ("p50_ms", "latency", 1),
+    ("p95_ms", "latency", 1),
+    ("p99_ms", "latency", 1),
+    ("rps", "throughput", -1),
+    ("error_rate", "error_rate", 1),
+]
+RUN_METRICS = [
+    ("requests_per_second", "throughput", -1),
+    ("peak_rss_bytes", "rss", 1),
+]
+
+# Observations beyond a percentile needed before it is compared; fewer make it one sample's luck
+TAIL_SAMPLES = 5
+
+# Config keys that do not change what is measured
+IGNORED_CONFIG = {"json", "save", "output", "base_url", "mcp_url", "start_fakes", "start_backend"}
+
+
+def load_report(path: Path) -> Dict[str, Any]:
+    report = json.loads(path.read_text())
+    report["_path"] = str(path)
+    return report
+
+
+def resolve_baselines(candidate: Dict[str, Any], paths: List[Path], window: int) -> List[Dict[str, Any]]:
+    """Baseline reports from files and result directories; a directory contributes its latest `window` runs"""
+    if not paths:
+        paths = [RESULTS_DIR / candidate["benchmark"]]
+
+    baselines = []
+    for path in paths:
+        if path.is_dir():
+            runs = [
+                load_report(file) for file in sorted(path.glob("*.json"))
+                if file.resolve() != Path(candidate["_path"]).resolve()
+            ]
+            # Only runs made before the candidate, so re-checking an old run stays meaningful
+            runs = [run for run in runs if run.get("timestamp", "") <= candidate.get("timestamp", "")]
+            runs.sort(key=lambda run: run.get("timestamp", ""))
+            baselines.extend(runs[-window:])
+        else:
+            baselines.append(load_report(path))
+    return baselines
+
+
+def load_budgets(path: Path) -> Dict[str, Any]:
+    if not path.exists():
+        return {"default": dict(DEFAULT_BUDGETS)}
+    return json.loads(path.read_text())
+
+
+def budgets_for(budgets: Dict[str, Any], benchmark: str, operation: Optional[str] = None) -> Dict[str, float]:
+    """Budgets for one operation: defaults, then the benchmark's, then the operation's own"""
+    resolved = dict(DEFAULT_BUDGETS)
+    resolved.update(budgets.get("default", {}))
+    bench = budgets.get("benchmarks", {}).get(benchmark, {})
+    resolved.update({key: value for key, value in bench.items() if key != "operations"})
+    if operation is not None:
+        resolved.update(bench.get("operations", {}).get(operation, {}))
+    return resolved
+
+
+def operation_value(stats: Dict[str, Any], metric: str) -> Optional[float]:
+    if metric == "error_rate":
+        attempts = stats.get("count", 0) + stats.get("errors", 0)
+        return stats.get("errors", 0) / attempts if attempts else None
+    return stats.get(metric)
+
+
+def min_samples(metric: str, floor: int) -> int:
+    """Samples needed before a percentile has TAIL_SAMPLES observations above it"""
+    if metric.startswith("p") and metric.endswith("_ms"):
+        percentile = float(metric[1:-3])
+        return max(floor, math.ceil(TAIL_SAMPLES * 100 / (100 - percentile)))
+    return 1
+
+
+def judge(
+    candidate: Optional[float],
+    baseline: List[float],
+    budget: float,
+    direction: int,
+    z: float,
+    min_delta: float = 0.0,
+    absolute: bool = False,
+) -> Tuple[str, Dict[str, Any]]:
+    """Verdict for one metric: ok, improved, regressed, or missing when either side has no data.
+
+    `budget` is a fraction of the baseline, or an amount of the metric when `absolute`.
+    """
+    if candidate is None or not baseline:
+        return "missing", {}
+
+    mean = statistics.fmean(baseline)
+    stdev = statistics.stdev(baseline) if len(baseline) > 1 else 0.0
+    # The larger of the budget and the noise seen between baseline runs
+    allowed = max(budget if absolute else abs(mean) * budget, z * stdev, min_delta)
+    delta = candidate - mean
+    detail = {
+        "candidate": candidate,
+        "baseline": round(mean, 3),
+        "stdev": round(stdev, 3),
+        "delta": round(delta, 3),
+        "change": round(delta / mean, 4) if mean else None,
+        "allowed": round(allowed, 3),
+    }
+    if delta * direction > allowed:
+        return "regressed", detail
+    if -delta * direction > allowed:
+        return "improved", detail
+    return "ok", detail
+
+
+def compare(
+    candidate: Dict[str, Any],
+    baselines: List[Dict[str, Any]],
+    budgets: Dict[str, Any],
+    min_count: int,
+) -> Dict[str, Any]:
+    benchmark = candidate["benchmark"]
+    rows = []
+
+    def add(operation: str, metric: str, budget_name: str, direction: int, value, history, limits):
+        verdict, detail = judge(
+            value, history, limits[budget_name], direction, limits["noise_z"],
+            limits["min_latency_delta_ms"] if budget_name == "latency" else 0.0,
+            absolute=budget_name == "error_rate",
+        )
+        rows.append({"operation": operation, "metric": metric, "budget": limits[budget_name], "verdict": verdict, **detail})
+
+    limits = budgets_for(budgets, benchmark)
+    for metric, budget_name, direction in RUN_METRICS:
+        history = [run[metric] for run in baselines if run.get(metric) is not None]
+        add("(run)", metric, budget_name, direction, candidate.get(metric), history, limits)
+
+    for operation, stats in candidate["operations"].items():
+        limits = budgets_for(budgets, benchmark, operation)
+        for metric, budget_name, direction in OPERATION_METRICS:
+            needed = min_samples(metric, min_count)
+            history = []
+            for run in baselines:
+                other = run["operations"].get(operation)
+                if other and other.get("count", 0) >= needed:
+                    value = operation_value(other, metric)
+                    if value is not None:
+                        history.append(value)
+            value = operation_value(stats, metric) if stats.get("count", 0) >= needed else None
+            add(operation, metric, budget_name, direction, value, history, limits)
+
+    warnings = []
+    config = {key: value for key, value in candidate["config"].items() if key not in IGNORED_CONFIG}
+    for run in baselines:
+        other = {key: value for key, value in run["config"].items() if key not in IGNORED_CONFIG}
+        changed = sorted(key for key in set(config) | set(other) if config.get(key) != other.get(key))
+        if changed:
+            warnings.append(f"{run['_path']}: config differs ({', '.join(changed)})")
+        if run.get("host") != candidate.get("host"):
+            warnings.append(f"{run['_path']}: recorded on {run.get('host')}, candidate on {candidate.get('host')}")
+    if candidate.get("git", {}).get("dirty"):
+        warnings.append("candidate was run with uncommitted changes")
+
+    return {
+        "benchmark": benchmark,
+        "candidate": candidate["_path"],
+        "baselines": [run["_path"] for run in baselines],
+        "regressions": sum(row["verdict"] == "regressed" for row in rows),
+        "warnings": warnings,
+        "metrics": rows,
+    }
+
+
+def format_value(metric: str, value: Optional[float]) -> str:
+    if value is None:
+        return "-"
+    if metric == "peak_rss_bytes":
+        return f"{value / 2 ** 20:,.1f}MiB"
+    if metric == "error_rate":
+        return f"{value:.2%}"
+    return f"{value:,.2f}"
+
+
+def print_comparison(result: Dict[str, Any], as_json: bool):
+    if as_json:
+        print(json.dumps(result, indent=2))
+        return
+
+    print(f"\n{result['benchmark']}: {result['candidate']}")
+    print(f"against {len(result['baselines'])} baseline run(s)\n")
+    header = f"{'operation':<14} {'metric':<20} {'baseline':>12} {'candidate':>12} {'change':>9} {'allowed':>10}  verdict"
+    print(header)
+    print("-" * len(header))
+    for row in result["metrics"]:
+        if row["verdict"] == "missing":
+            continue
+        change = f"{row['change']:+.1%}" if row["change"] is not None else "-"
+        print(
+            f"{row['operation']:<14} {row['metric']:<20} "
+            f"{format_value(row['metric'], row['baseline']):>12} "
+            f"{format_value(row['metric'], row['candidate']):>12} {change:>9} "
+            f"{format_value(row['metric'], row['allowed']):>10}  "
+            f"{'REGRESSED' if row['verdict'] == 'regressed' else row['verdict']}"
+        )
+    for warning in result["warnings"]:
+        print(f"warning: {warning}")
+    print(f"\n{result['regressions']} regression(s)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("candidate", type=Path, help="Report of the run to check")
+    parser.add_argument(
+        "--baseline", type=Path, action="append", default=[],
+        help="Baseline report or results directory (repeatable; default: results/<benchmark>/)",
+    )
+    parser.add_argument("--window", type=int, default=5, help="Latest runs taken from each baseline directory")
+    parser.add_argument("--budgets", type=Path, default=RESULTS_DIR / "budgets.json", help="Budget file")
+    parser.add_argument("--min-count", type=int, default=20, help="Samples an operation needs before its latency is compared")
+    parser.add_argument("--json", action="store_true", help="Emit the comparison as JSON")
+    args = parser.parse_args()
+
+    try:
+        candidate = load_report(args.candidate)
+        baselines = resolve_baselines(candidate, args.baseline, args.window)
+        budgets = load_budgets(args.budgets)
+    except (OSError, ValueError) as e:
+        print(f"error: {e}", file=sys.stderr)
+        sys.exit(2)
+
+    if not baselines:
+        print(f"error: no baseline runs for {candidate['benchmark']}", file=sys.stderr)
+        sys.exit(2)
+    mismatched = [run["_path"] for run in baselines if run["benchmark"] != candidate["benchmark"]]
+    if mismatched:
+        print(f"error: not {candidate['benchmark']} runs: {', '.join(mismatched)}", file=sys.stderr)
+        sys.exit(2)
+
+    result = compare(candidate, baselines, budgets, args.min_count)
+    print_comparison(result, args.json)
+    sys.exit(1 if result["regressions"] else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,424 @@
+#!/usr/bin/env python3
+"""
+Lightweight stand-ins for the backend's upstream services.
+
+Serves just enough of each API for the backend clients and the load
+scenarios to run without Docker or models:
+
+- research: the local-deep-researcher API used by ResearchClient (start,
+  status, result, SSE log stream, cancel, active sessions, health)
+- comfyui: /prompt, /history, /view, /queue, /interrupt, /object_info,
+  /system_stats and the /ws event stream; prompts complete after
+  --image-seconds with --image-steps progress events and /view returns a PNG
+  of --image-size pixels
+- n8n: /api/v1/workflows, workflow execution and /api/v1/executions
+- mcp: ACI's /mcp/v1/tools and /mcp/v1/tools/call
+
+Every fake adds --latency seconds (+/- --jitter) to each request and fails a
+--failure-rate fraction of them with --failure-status. Fault settings can be
+changed at runtime with POST /_fake/faults and request counts read from
+GET /_fake/stats, e.g. to take an upstream down in the middle of a run.
+
+Usage:
+    python fake_upstreams.py [--services research comfyui n8n mcp] [--port 8790] [--latency 0.01] [--failure-rate 0.0]
+
+Ports are assigned in the order research, comfyui, n8n, mcp starting at
+--port, whichever services are enabled.
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import random
+import struct
+import tempfile
+import time
+import zlib
+from typing import Dict, Any, List, Optional
+from uuid import uuid4
+
+import uvicorn
+from fastapi import FastAPI, Request, WebSocket, WebSocketDisconnect
+from fastapi.responses import FileResponse, JSONResponse, Response, StreamingResponse
+
+SERVICES = ["research", "comfyui", "n8n", "mcp"]
+
+
+class Faults:
+    """Latency and failure injection settings shared by one fake's routes"""
+
+    def __init__(self, latency: float = 0.0, jitter: float = 0.0,
+                 failure_rate: float = 0.0, failure_status: int = 503):
+        self.latency = latency
+        self.jitter = jitter
+        self.failure_rate = failure_rate
+        self.failure_status = failure_status
+        self.requests = 0
+        self.failures = 0
+
+    def update(self, settings: Dict[str, Any]):
+        for key in ("latency", "jitter", "failure_rate", "failure_status"):
+            if key in settings:
+                setattr(self, key, type(getattr(self, key))(settings[key]))
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "latency": self.latency,
+            "jitter": self.jitter,
+            "failure_rate": self.failure_rate,
+            "failure_status": self.failure_status,
+            "requests": self.requests,
+            "failures": self.failures,
+        }
+
+
+def make_app(name: str, faults: Faults) -> FastAPI:
+    """FastAPI app with fault injection and the /_fake control routes"""
+    app = FastAPI(title=f"fake {name}")
+
+    @app.middleware("http")
+    async def inject_faults(request: Request, call_next):
+        if request.url.path.startswith("/_fake/"):
+            return await call_next(request)
+        faults.requests += 1
+        delay = faults.latency + random.uniform(-faults.jitter, faults.jitter)
+        if delay > 0:
+            await asyncio.sleep(delay)
+        if faults.failure_rate and random.random() < faults.failure_rate:
+            faults.failures += 1
+            return JSONResponse({"error": f"injected {name} failure"}, status_code=faults.failure_status)
+        return await call_next(request)
+
+    @app.post("/_fake/faults")
+    async def set_faults(settings: Dict[str, Any]):
+        faults.update(settings)
+        return faults.stats()
+
+    @app.get("/_fake/stats")
+    async def get_stats():
+        return faults.stats()
+
+    return app
+
+
+def research_app(faults: Faults, duration: float, progress_events: int) -> FastAPI:
+    """local-deep-researcher: sessions complete `duration` seconds after they start"""
+    app = make_app("research", faults)
+    sessions: Dict[str, Dict[str, Any]] = {}
+
+    def status_of(session: Dict[str, Any]) -> str:
+        if session["cancelled"]:
+            return "cancelled"
+        return "completed" if time.monotonic() - session["started"] >= duration else "running"
+
+    def lookup(session_id: str) -> Optional[Dict[str, Any]]:
+        return sessions.get(session_id)
+
+    @app.get("/health")
+    async def health():
+        return {"status": "ok"}
+
+    @app.post("/research/start")
+    async def start(body: Dict[str, Any]):
+        session_id = str(uuid4())
+        sessions[session_id] = {"query": body.get("query", ""), "started": time.monotonic(), "cancelled": False}
+        return {"session_id": session_id, "status": "running"}
+
+    @app.get("/research/sessions/active")
+    async def active():
+        return [
+            {"session_id": session_id, "query": session["query"]}
+            for session_id, session in sessions.items()
+            if status_of(session) == "running"
+        ]
+
+    @app.get("/research/{session_id}/status")
+    async def status(session_id: str):
+        session = lookup(session_id)
+        if session is None:
+            return JSONResponse({"detail": "not found"}, status_code=404)
+        return {"status": status_of(session), "message": ""}
+
+    @app.get("/research/{session_id}/result")
+    async def result(session_id: str):
+        session = lookup(session_id)
+        if session is None or status_of(session) != "completed":
+            return JSONResponse({"detail": "not found"}, status_code=404)
+        return {
+            "title": f"Research: {session['query']}",
+            "summary": "Synthetic summary",
+            "content": "Synthetic content " * 200,
+            "sources": [
+                {"url": f"https://example.com/{i}", "title": f"Source {i}", "relevance_score": 0.5}
+                for i in range(10)
+            ],
+            "metadata": {"fake": True},
+        }
+
+    @app.post("/research/{session_id}/cancel")
+    async def cancel(session_id: str):
+        session = lookup(session_id)
+        if session is None:
+            return JSONResponse({"detail": "not found"}, status_code=404)
+        session["cancelled"] = True
+        return {"session_id": session_id, "status": "cancelled"}
+
+    @app.get("/research/{session_id}/logs/stream")
+    async def stream(session_id: str):
+        session = lookup(session_id)
+        if session is None:
+            return JSONResponse({"detail": "not found"}, status_code=404)
+
+        async def events():
+            for i in range(progress_events):
+                yield f'data: {json.dumps({"step": "search", "message": f"progress {i + 1}"})}\n\n'
+                await asyncio.sleep(duration / (progress_events + 1))
+            while status_of(session) == "running":
+                await asyncio.sleep(0.05)
+            yield f'data: {json.dumps({"status": status_of(session)})}\n\n'
+            yield "event: close\n\n"
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    return app
+
+
+def make_png(size: int) -> bytes:
+    """RGB noise PNG of size x size pixels; noise keeps it about as big as a real render"""
+    rows = b"".join(b"\x00" + os.urandom(size * 3) for _ in range(size))
+
+    def chunk(kind: bytes, data: bytes) -> bytes:
+        return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data))
+
+    return (
+        b"\x89PNG\r\n\x1a\n"
+        + chunk(b"IHDR", struct.pack(">IIBBBBB", size, size, 8, 2, 0, 0, 0))
+        + chunk(b"IDAT", zlib.compress(rows, 1))
+        + chunk(b"IEND", b"")
+    )
+
+
+def comfyui_app(faults: Faults, duration: float, image_size: int, steps: int) -> FastAPI:
+    """ComfyUI: prompts finish `duration` seconds after queueing with one output image.
+
+    Clients connected to /ws with the prompt's client_id get its execution
+    events: start, `steps` sampler progress events, the output and success.
+    """
+    app = make_app("comfyui", faults)
+    image = make_png(image_size)
+    prompts: Dict[str, float] = {}
+    sockets: Dict[str, WebSocket] = {}
+
+    def outputs(prompt_id: str) -> Dict[str, Any]:
+        return {"9": {"images": [{"filename": f"{prompt_id}.png", "subfolder": "", "type": "output"}]}}
+
+    def history_entry(prompt_id: str) -> Dict[str, Any]:
+        return {
+            "prompt": [],
+            "outputs": outputs(prompt_id),
+            "status": {"status_str": "success", "completed": True, "messages": []},
+        }
+
+    async def emit(client_id: Optional[str], kind: str, data: Dict[str, Any]):
+        socket = sockets.get(client_id)
+        if socket is not None:
+            try:
+                await socket.send_text(json.dumps({"type": kind, "data": data}))
+            except Exception:
+                sockets.pop(client_id, None)
+
+    async def execute(prompt_id: str, client_id: Optional[str]):
+        await emit(client_id, "execution_start", {"prompt_id": prompt_id})
+        await emit(client_id, "executing", {"node": "4", "prompt_id": prompt_id})
+        for step in range(1, steps + 1):
+            await asyncio.sleep(duration / (steps + 1))
+            await emit(client_id, "progress", {"value": step, "max": steps, "node": "4", "prompt_id": prompt_id})
+        await asyncio.sleep(max(0.0, prompts[prompt_id] + duration - time.monotonic()))
+        await emit(client_id, "executed", {"node": "9", "output": outputs(prompt_id)["9"], "prompt_id": prompt_id})
+        await emit(client_id, "executing", {"node": None, "prompt_id": prompt_id})
+        await emit(client_id, "execution_success", {"prompt_id": prompt_id})
+
+    @app.websocket("/ws")
+    async def events(websocket: WebSocket, clientId: str = ""):
+        await websocket.accept()
+        sockets[clientId] = websocket
+        running = sum(1 for prompt_id in prompts if not done(prompt_id))
+        await websocket.send_text(json.dumps({"type": "status", "data": {"status": {"exec_info": {"queue_remaining": running}}}}))
+        try:
+            while True:
+                await websocket.receive_text()
+        except WebSocketDisconnect:
+            sockets.pop(clientId, None)
+
+    def done(prompt_id: str) -> bool:
+        return time.monotonic() - prompts[prompt_id] >= duration
+
+    @app.get("/system_stats")
+    async def system_stats():
+        return {"system": {"os": "fake", "python_version": "3"}, "devices": []}
+
+    nodes = {
+        "CheckpointLoaderSimple": {"input": {"required": {"ckpt_name": [["sd_v1-5_pruned_emaonly.safetensors"]]}}},
+        "LoraLoader": {"input": {"required": {"lora_name": [[]]}}},
+        "VAELoader": {"input": {"required": {"vae_name": [[]]}}},
+    }
+
+    @app.get("/object_info")
+    async def object_info():
+        return nodes
+
+    @app.get("/object_info/{node_class}")
+    async def node_info(node_class: str):
+        return {node_class: nodes[node_class]} if node_class in nodes else {}
+
+    @app.post("/prompt")
+    async def queue_prompt(body: Dict[str, Any]):
+        prompt_id = str(uuid4())
+        prompts[prompt_id] = time.monotonic()
+        asyncio.create_task(execute(prompt_id, body.get("client_id")))
+        return {"prompt_id": prompt_id, "number": len(prompts), "node_errors": {}}
+
+    @app.get("/history")
+    async def history():
+        return {prompt_id: history_entry(prompt_id) for prompt_id in prompts if done(prompt_id)}
+
+    @app.get("/history/{prompt_id}")
+    async def prompt_history(prompt_id: str):
+        if prompt_id not in prompts or not done(prompt_id):
+            return {}
+        return {prompt_id: history_entry(prompt_id)}
+
+    @app.get("/queue")
+    async def queue():
+        running = [prompt_id for prompt_id in prompts if not done(prompt_id)]
+        return {"queue_running": [[0, prompt_id] for prompt_id in running[:1]],
+                "queue_pending": [[i, prompt_id] for i, prompt_id in enumerate(running[1:])]}
+
+    @app.post("/interrupt")
+    async def interrupt(body: Optional[Dict[str, Any]] = None):
+        return {}
+
+    # Served from a file, like ComfyUI, so Range requests work
+    image_path = os.path.join(tempfile.mkdtemp(prefix="fake-comfyui-"), "image.png")
+    with open(image_path, "wb") as f:
+        f.write(image)
+    image_etag = f'"{hashlib.md5(image).hexdigest()}"'
+
+    @app.get("/view")
+    async def view(request: Request, filename: str, type: str = "output", subfolder: str = ""):
+        if request.headers.get("if-none-match") == image_etag:
+            return Response(status_code=304, headers={"ETag": image_etag})
+        return FileResponse(image_path, media_type="image/png", headers={"ETag": image_etag})
+
+    return app
+
+
+def n8n_app(faults: Faults) -> FastAPI:
+    """n8n public API: a few workflows whose executions finish immediately"""
+    app = make_app("n8n", faults)
+    workflows = [
+        {"id": str(i), "name": f"Workflow {i}", "active": True,
+         "created_at": "2024-01-01T00:00:00Z", "updated_at": "2024-01-01T00:00:00Z"}
+        for i in range(1, 6)
+    ]
+
+    @app.get("/api/v1/workflows")
+    async def list_workflows():
+        return workflows
+
+    @app.get("/api/v1/workflows/{workflow_id}")
+    async def get_workflow(workflow_id: str):
+        for workflow in workflows:
+            if workflow["id"] == workflow_id:
+                return workflow
+        return JSONResponse({"message": "not found"}, status_code=404)
+
+    @app.post("/api/v1/workflows/{workflow_id}/execute")
+    async def execute(workflow_id: str, body: Optional[Dict[str, Any]] = None):
+        return {"id": str(uuid4()), "finished": True, "mode": "manual", "status": "success",
+                "started_at": "2024-01-01T00:00:00Z", "workflow_id": workflow_id, "data": body or {}}
+
+    @app.get("/api/v1/executions/{execution_id}")
+    async def get_execution(execution_id: str):
+        return {"id": execution_id, "finished": True, "mode": "manual", "status": "success",
+                "started_at": "2024-01-01T00:00:00Z", "workflow_id": "1"}
+
+    return app
+
+
+def mcp_app(faults: Faults, tool_count: int) -> FastAPI:
+    """ACI MCP server: function search, execution and the tool listing"""
+    app = make_app("mcp", faults)
+    apps = ["GITHUB", "GMAIL", "SLACK", "NOTION", "BRAVE_SEARCH"]
+    tools: List[Dict[str, Any]] = [
+        {
+            "name": f"{apps[i % len(apps)]}__FUNCTION_{i}",
+            "description": f"Synthetic tool {i}",
+            "inputSchema": {"type": "object", "properties": {"query": {"type": "string"}}},
+        }
+        for i in range(tool_count)
+    ]
+
+    @app.get("/mcp/v1/tools")
+    async def list_tools():
+        return tools
+
+    @app.post("/mcp/v1/tools/call")
+    async def call_tool(body: Dict[str, Any]):
+        name = body.get("name", "")
+        arguments = body.get("arguments", {})
+        if name == "ACI_SEARCH_FUNCTIONS":
+            return tools[: int(arguments.get("limit", 10))]
+        if name == "ACI_EXECUTE_FUNCTION":
+            return {"success": True, "data": {"function": arguments.get("function_name"), "result": "ok"}}
+        return {"success": True, "data": {"function": name, "result": "ok"}}
+
+    return app
+
+
+def build_apps(args: argparse.Namespace) -> Dict[str, FastAPI]:
+    """The enabled fakes by service name, sharing the command-line fault settings"""
+    def faults() -> Faults:
+        return Faults(args.latency, args.jitter, args.failure_rate, args.failure_status)
+
+    builders = {
+        "research": lambda: research_app(faults(), args.research_seconds, args.progress_events),
+        "comfyui": lambda: comfyui_app(faults(), args.image_seconds, args.image_size, args.image_steps),
+        "n8n": lambda: n8n_app(faults()),
+        "mcp": lambda: mcp_app(faults(), args.tool_count),
+    }
+    return {service: builders[service]() for service in SERVICES if service in args.services}
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--services", nargs="+", choices=SERVICES, default=SERVICES)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8790, help="port of the first enabled service")
+    parser.add_argument("--latency", type=float, default=0.01, help="seconds added to every request")
+    parser.add_argument("--jitter", type=float, default=0.0, help="uniform +/- jitter on the latency")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="fraction of requests that fail")
+    parser.add_argument("--failure-status", type=int, default=503)
+    parser.add_argument("--research-seconds", type=float, default=2.0, help="time for a research session to complete")
+    parser.add_argument("--progress-events", type=int, default=5, help="progress events per research log stream")
+    parser.add_argument("--image-seconds", type=float, default=1.0, help="time for a ComfyUI prompt to complete")
+    parser.add_argument("--image-steps", type=int, default=10, help="sampler progress events per ComfyUI prompt")
+    parser.add_argument("--image-size", type=int, default=512, help="width and height of the served PNG")
+    parser.add_argument("--tool-count", type=int, default=200, help="tools listed by the MCP fake")
+    return parser.parse_args(argv)
+
+
+async def serve(args: argparse.Namespace):
+    servers = []
+    for offset, (service, app) in enumerate(build_apps(args).items()):
+        port = args.port + offset
+        config = uvicorn.Config(app, host=args.host, port=port, log_level="warning", access_log=False)
+        servers.append(uvicorn.Server(config))
+        print(f"fake {service} listening on http://{args.host}:{port}", flush=True)
+    await asyncio.gather(*(server.serve() for server in servers))
+
+
+if __name__ == "__main__":
+    asyncio.run(serve(parse_args()))
@@ -0,0 +1,402 @@
+"""
+Shared load generator for the bench_load_*.py scenarios.
+
+A scenario is an async function running one iteration (e.g. start a research
+session and poll it to completion) against an httpx client, timing each call
+through a Recorder; the whole iteration is reported as "iteration".
+run_load() runs it from --concurrency workers for --duration seconds or
+--iterations iterations and summarize() reports p50/p95/p99 latency and
+req/s per operation as JSON, so runs can be compared over time.
+
+The scenarios can bring up their own environment: --start-fakes launches
+fake_upstreams.py and --start-backend runs the backend (uvicorn main:app)
+pointed at the fakes. The backend needs DATABASE_URL to reach a database
+with the research schema.
+
+Reports also record the git commit and the backend's peak RSS: read from
+/proc for a backend started with --start-backend, otherwise sampled from its
+/metrics endpoint during the run. --save stores the report under
+results/<benchmark>/ for compare_runs.py.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from contextlib import asynccontextmanager, contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Awaitable, Callable, Dict, Any, Iterator, List, Optional
+
+import httpx
+
+BENCHMARKS_DIR = Path(__file__).resolve().parent
+APP_DIR = BENCHMARKS_DIR.parent / "app"
+RESULTS_DIR = BENCHMARKS_DIR / "results"
+
+# Port layout of fake_upstreams.py when started with --port FAKES_PORT
+FAKES_PORT = 8790
+FAKE_URLS = {
+    "research": f"http://127.0.0.1:{FAKES_PORT}",
+    "comfyui": f"http://127.0.0.1:{FAKES_PORT + 1}",
+    "n8n": f"http://127.0.0.1:{FAKES_PORT + 2}",
+    "mcp": f"http://127.0.0.1:{FAKES_PORT + 3}",
+}
+BACKEND_PORT = 8799
+
+
+class OperationFailed(Exception):
+    """A timed call failed; the rest of the iteration is skipped"""
+
+
+class Recorder:
+    """Latencies and error counts per operation name"""
+
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = {}
+        self.errors: Dict[str, int] = {}
+        self.error_samples: Dict[str, str] = {}
+
+    def record(self, operation: str, seconds: float, error: Optional[str] = None):
+        if error is None:
+            self.latencies.setdefault(operation, []).append(seconds)
+        else:
+            self.errors[operation] = self.errors.get(operation, 0) + 1
+            self.error_samples.setdefault(operation, error)
+
+    @asynccontextmanager
+    async def measure(self, operation: str):
+        """Time the block as one `operation`; an exception counts as an error"""
+        started = time.perf_counter()
+        try:
+            yield
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+            self.record(operation, time.perf_counter() - started, error)
+            raise OperationFailed(f"{operation} failed: {error}") from e
+        self.record(operation, time.perf_counter() - started)
+
+    async def call(self, operation: str, request: Awaitable[httpx.Response]) -> httpx.Response:
+        """Await an httpx request as one `operation`; 4xx/5xx responses count as errors"""
+        async with self.measure(operation):
+            response = await request
+            response.raise_for_status()
+        return response
+
+
+def percentile(values: List[float], p: float) -> float:
+    """Linear-interpolated percentile of sorted `values` (0 <= p <= 100)"""
+    if not values:
+        return 0.0
+    rank = (len(values) - 1) * p / 100
+    low = int(rank)
+    high = min(low + 1, len(values) - 1)
+    return values[low] + (values[high] - values[low]) * (rank - low)
+
+
+def summarize_operation(latencies: List[float], errors: int, elapsed: float) -> Dict[str, Any]:
+    values = sorted(latencies)
+    count = len(values)
+    return {
+        "count": count,
+        "errors": errors,
+        "rps": round(count / elapsed, 2) if elapsed > 0 else 0.0,
+        "p50_ms": round(percentile(values, 50) * 1000, 3),
+        "p95_ms": round(percentile(values, 95) * 1000, 3),
+        "p99_ms": round(percentile(values, 99) * 1000, 3),
+        "mean_ms": round(sum(values) / count * 1000, 3) if count else 0.0,
+        "max_ms": round(values[-1] * 1000, 3) if count else 0.0,
+    }
+
+
+async def run_load(
+    scenario: Callable[[httpx.AsyncClient, Recorder, int], Awaitable[None]],
+    client: httpx.AsyncClient,
+    concurrency: int,
+    duration: Optional[float] = None,
+    iterations: Optional[int] = None,
+    warmup: int = 0,
+) -> Dict[str, Any]:
+    """Run `scenario` from `concurrency` workers and return the recorder and timings.
+
+    Stops after `iterations` iterations in total, or else once `duration`
+    seconds have passed; iterations in flight at the deadline are finished.
+    The first `warmup` iterations run before measuring starts.
+    """
+    for i in range(warmup):
+        try:
+            await scenario(client, Recorder(), i)
+        except OperationFailed:
+            pass
+
+    recorder = Recorder()
+    counter = {"next": 0, "failed": 0}
+    deadline = time.perf_counter() + duration if duration else None
+
+    def claim() -> Optional[int]:
+        if iterations is not None and counter["next"] >= iterations:
+            return None
+        if deadline is not None and time.perf_counter() >= deadline:
+            return None
+        counter["next"] += 1
+        return counter["next"] - 1
+
+    async def worker():
+        while (index := claim()) is not None:
+            started = time.perf_counter()
+            try:
+                await scenario(client, recorder, index)
+            except OperationFailed as e:
+                counter["failed"] += 1
+                recorder.record("iteration", time.perf_counter() - started, str(e))
+            else:
+                recorder.record("iteration", time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    return {"recorder": recorder, "elapsed": elapsed, "iterations": counter["next"], "failed": counter["failed"]}
+
+
+def process_peak_rss(pid: int) -> Optional[int]:
+    """Peak resident set size of a local process in bytes (Linux only)"""
+    try:
+        with open(f"/proc/{pid}/status") as status:
+            for line in status:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return None
+
+
+async def sample_metrics_rss(client: httpx.AsyncClient, stop: asyncio.Event, interval: float = 1.0) -> Optional[int]:
+    """Highest process_resident_memory_bytes seen on the backend's /metrics until `stop` is set"""
+    peak = None
+    while not stop.is_set():
+        try:
+            response = await client.get("/metrics")
+            for line in response.text.splitlines():
+                if line.startswith("process_resident_memory_bytes "):
+                    value = int(float(line.split()[1]))
+                    peak = value if peak is None else max(peak, value)
+        except httpx.HTTPError:
+            pass
+        try:
+            await asyncio.wait_for(stop.wait(), timeout=interval)
+        except asyncio.TimeoutError:
+            pass
+    return peak
+
+
+def git_revision() -> Dict[str, Any]:
+    """Commit the benchmarked code was built from, and whether it had local changes"""
+    def git(*command: str) -> str:
+        return subprocess.run(
+            ["git", *command], cwd=BENCHMARKS_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+
+    try:
+        return {"commit": git("rev-parse", "--short", "HEAD"), "dirty": bool(git("status", "--porcelain", "--", str(BENCHMARKS_DIR.parent)))}
+    except (OSError, subprocess.CalledProcessError):
+        return {"commit": None, "dirty": None}
+
+
+def save_report(report: Dict[str, Any], path: Optional[Path] = None) -> Path:
+    """Write `report` to `path`, by default a new file under results/<benchmark>/"""
+    if path is None:
+        stamp = report["timestamp"].replace("-", "").replace(":", "")
+        path = RESULTS_DIR / report["benchmark"] / f"{stamp}-{report['git']['commit'] or 'unknown'}.json"
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(report, indent=2) + "\n")
+    return path
+
+
+def summarize(name: str, config: Dict[str, Any], run: Dict[str, Any]) -> Dict[str, Any]:
+    """JSON-ready report of a run_load() result"""
+    recorder: Recorder = run["recorder"]
+    elapsed = run["elapsed"]
+    operations = sorted(set(recorder.latencies) | set(recorder.errors))
+    requests = sum(len(recorder.latencies.get(op, [])) + recorder.errors.get(op, 0)
+                   for op in operations if op != "iteration")
+    return {
+        "benchmark": name,
+        "timestamp": datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ"),
+        "host": platform.node(),
+        "git": git_revision(),
+        "config": config,
+        "elapsed_seconds": round(elapsed, 3),
+        "iterations": run["iterations"],
+        "failed_iterations": run["failed"],
+        "requests": requests,
+        "requests_per_second": round(requests / elapsed, 2) if elapsed > 0 else 0.0,
+        "peak_rss_bytes": run.get("peak_rss_bytes"),
+        "operations": {
+            op: summarize_operation(recorder.latencies.get(op, []), recorder.errors.get(op, 0), elapsed)
+            for op in operations
+        },
+        "error_samples": recorder.error_samples,
+    }
+
+
+def print_report(report: Dict[str, Any], as_json: bool):
+    if as_json:
+        print(json.dumps(report, indent=2))
+        return
+
+    print(f"{report['benchmark']}: {report['iterations']} iterations "
+          f"({report['failed_iterations']} failed) in {report['elapsed_seconds']:.1f}s, "
+          f"{report['requests_per_second']:,.1f} req/s")
+    if report["peak_rss_bytes"]:
+        print(f"backend peak RSS: {report['peak_rss_bytes'] / 2 ** 20:,.1f} MiB")
+    print(f"{'operation':<16}  {'count':>7}  {'errors':>6}  {'req/s':>8}  "
+          f"{'p50 ms':>9}  {'p95 ms':>9}  {'p99 ms':>9}")
+    for op, stats in report["operations"].items():
+        print(f"{op:<16}  {stats['count']:>7}  {stats['errors']:>6}  {stats['rps']:>8.1f}  "
+              f"{stats['p50_ms']:>9.2f}  {stats['p95_ms']:>9.2f}  {stats['p99_ms']:>9.2f}")
+    for op, sample in report["error_samples"].items():
+        print(f"  first {op} error: {sample}")
+
+
+def add_common_args(parser: argparse.ArgumentParser):
+    parser.add_argument("--base-url", default=f"http://127.0.0.1:{BACKEND_PORT}", help="Backend to load")
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--duration", type=float, default=30.0, help="Seconds to run (ignored with --iterations)")
+    parser.add_argument("--iterations", type=int, help="Stop after this many iterations")
+    parser.add_argument("--warmup", type=int, default=2, help="Unmeasured iterations before the run")
+    parser.add_argument("--timeout", type=float, default=120.0, help="Per-request timeout in seconds")
+    parser.add_argument("--start-fakes", action="store_true", help="Launch fake_upstreams.py for the run")
+    parser.add_argument("--fake-latency", type=float, default=0.01, help="Latency of the fakes (--start-fakes)")
+    parser.add_argument("--fake-failure-rate", type=float, default=0.0, help="Failure rate of the fakes (--start-fakes)")
+    parser.add_argument("--start-backend", action="store_true", help="Run the backend against the fakes for the run")
+    parser.add_argument("--json", action="store_true", help="Emit results as JSON")
+    parser.add_argument("--save", action="store_true", help="Store the report under results/<benchmark>/")
+    parser.add_argument("--output", type=Path, help="Store the report in this file")
+
+
+def run_config(args: argparse.Namespace, **extra: Any) -> Dict[str, Any]:
+    """The settings that identify a run, recorded in its report"""
+    config = {
+        "concurrency": args.concurrency,
+        "duration": None if args.iterations else args.duration,
+        "iterations": args.iterations,
+        "start_fakes": args.start_fakes,
+        "start_backend": args.start_backend,
+    }
+    if args.start_fakes:
+        config["fake_latency"] = args.fake_latency
+        config["fake_failure_rate"] = args.fake_failure_rate
+    config.update(extra)
+    return config
+
+
+def wait_for(url: str, timeout: float = 30.0, process: Optional[subprocess.Popen] = None):
+    """Block until `url` answers, failing early if `process` exits"""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process is not None and process.poll() is not None:
+            raise RuntimeError(f"process exited with code {process.returncode} before {url} came up")
+        try:
+            httpx.get(url, timeout=1.0)
+            return
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    raise RuntimeError(f"{url} did not come up within {timeout:.0f}s")
+
+
+def _stop(process: subprocess.Popen):
+    process.terminate()
+    try:
+        process.wait(timeout=10)
+    except subprocess.TimeoutExpired:
+        process.kill()
+
+
+@contextmanager
+def environment(
+    args: argparse.Namespace, services: List[str], fake_args: Optional[List[str]] = None
+) -> Iterator[Dict[str, Any]]:
+    """Start the fakes and backend requested on the command line for the duration of the block.
+
+    Yields {"backend_pid": ...}, the pid being None unless the backend was started here.
+    """
+    processes: List[subprocess.Popen] = []
+    started: Dict[str, Any] = {"backend_pid": None}
+    try:
+        if args.start_fakes:
+            command = [
+                sys.executable, str(BENCHMARKS_DIR / "fake_upstreams.py"),
+                "--port", str(FAKES_PORT),
+                "--latency", str(args.fake_latency),
+                "--failure-rate", str(args.fake_failure_rate),
+                *(fake_args or []),
+            ]
+            fakes = subprocess.Popen(command, stdout=subprocess.DEVNULL)
+            processes.append(fakes)
+            for service in services:
+                wait_for(f"{FAKE_URLS[service]}/_fake/stats", process=fakes)
+
+        if args.start_backend:
+            env = {
+                **os.environ,
+                "LOCAL_DEEP_RESEARCHER_URL": FAKE_URLS["research"],
+                "COMFYUI_BASE_URL": FAKE_URLS["comfyui"],
+                "N8N_BASE_URL": FAKE_URLS["n8n"],
+                "WEAVIATE_ENABLED": "false",
+                # Storage is not exercised; main.py only needs the settings to exist
+                "KONG_URL": os.getenv("KONG_URL", "http://127.0.0.1:1"),
+                "SUPABASE_SERVICE_KEY": os.getenv("SUPABASE_SERVICE_KEY", "benchmark"),
+            }
+            backend = subprocess.Popen(
+                [sys.executable, "-m", "uvicorn", "main:app", "--port", str(BACKEND_PORT),
+                 "--log-level", "warning", "--no-access-log"],
+                cwd=APP_DIR, env=env,
+            )
+            processes.append(backend)
+            wait_for(f"http://127.0.0.1:{BACKEND_PORT}/health", process=backend)
+            started["backend_pid"] = backend.pid
+        yield started
+    finally:
+        for process in reversed(processes):
+            _stop(process)
+
+
+async def main_for(
+    name: str,
+    args: argparse.Namespace,
+    scenario: Callable[[httpx.AsyncClient, Recorder, int], Awaitable[None]],
+    config: Dict[str, Any],
+    base_url: Optional[str] = None,
+    backend_pid: Optional[int] = None,
+    measure_rss: bool = True,
+) -> Dict[str, Any]:
+    """Run `scenario` with the common options, then print and optionally store its report"""
+    limits = httpx.Limits(max_connections=args.concurrency * 2, max_keepalive_connections=args.concurrency * 2)
+    async with httpx.AsyncClient(base_url=base_url or args.base_url, timeout=args.timeout, limits=limits) as client:
+        stop = asyncio.Event()
+        sampler = None
+        if measure_rss and backend_pid is None:
+            sampler = asyncio.create_task(sample_metrics_rss(client, stop))
+        try:
+            run = await run_load(
+                scenario, client, args.concurrency,
+                duration=None if args.iterations else args.duration,
+                iterations=args.iterations, warmup=args.warmup,
+            )
+        finally:
+            stop.set()
+        if backend_pid is not None:
+            run["peak_rss_bytes"] = process_peak_rss(backend_pid)
+        elif sampler is not None:
+            run["peak_rss_bytes"] = await sampler
+
+    report = summarize(name, config, run)
+    print_report(report, args.json)
+    if args.save or args.output:
+        path = save_report(report, args.output)
+        print(f"saved {path}", file=sys.stderr)
+    return report
@@ -11,8 +11,8 @@ if [ -f "/shared/weaviate-config.env" ]; then
   echo "backend: Using Ollama embedding model: $WEAVIATE_OLLAMA_EMBEDDING_MODEL"
 else
   echo "backend: Warning - No dynamic Weaviate configuration found"
-  export WEAVIATE_OLLAMA_EMBEDDING_MODEL="nomic-embed-text"
-  echo "backend: Using default Ollama embedding model: $WEAVIATE_OLLAMA_EMBEDDING_MODEL"
+  export WEAVIATE_OLLAMA_EMBEDDING_MODEL="${WEAVIATE_OLLAMA_EMBEDDING_MODEL:-nomic-embed-text}"
+  echo "backend: Using configured Ollama embedding model: $WEAVIATE_OLLAMA_EMBEDDING_MODEL"
 fi
 
 echo "backend: Configuration applied - starting backend service..."
@@ -182,6 +182,10 @@ if [ "$IS_LOCAL_COMFYUI" = "true" ]; then
   echo "$(date): ComfyUI model download completed (local mode)" > "$COMFYUI_MODELS_PATH/.download_complete"
 fi
 
+# Backends listening on comfyui_models refresh their model index
+PGPASSWORD=$PGPASSWORD psql -h $PGHOST -p $PGPORT -d $PGDATABASE -U $PGUSER -c "NOTIFY comfyui_models, 'download_complete'" > /dev/null || \
+  echo "comfyui-init: Warning: Could not notify backends of the new models"
+
 echo "comfyui-init: Model download process completed successfully."
 if [ "$IS_LOCAL_COMFYUI" = "true" ]; then
   echo "comfyui-init: Models are available in: /host_models (mounted from $COMFYUI_LOCAL_MODELS_PATH)"
@@ -98,21 +98,36 @@ class Pipe:
                     yield "❌ No session ID received from research service"
                     return
                 
-                # Poll for results
                 start_time = time.time()
                 last_status = ""
-                
+
+                # Follow progress over server-sent events; fall back to polling
+                # if the stream is unavailable or ends early
+                status_data = None
+                try:
+                    async for event_type, event_data in self._stream_events(client, session_id):
+                        if event_type == "status":
+                            status_data = event_data
+                        elif event_type == "log" and self.valves.show_status:
+                            status_msg = f"🔄 {event_data.get('message', 'Researching...')}"
+                            if status_msg != last_status:
+                                yield f"\r{status_msg}"
+                                last_status = status_msg
+                except httpx.HTTPError:
+                    status_data = None
+
                 while (time.time() - start_time) < self.valves.timeout:
-                    # Check status
-                    status_response = await client.get(
-                        f"{self.valves.backend_url}/research/{session_id}/status"
-                    )
-                    
-                    if status_response.status_code != 200:
-                        yield f"❌ Failed to check status: {status_response.text}"
-                        return
-                    
-                    status_data = status_response.json()
+                    if status_data is None or status_data.get("status") not in ("completed", "failed", "cancelled"):
+                        # Check status
+                        status_response = await client.get(
+                            f"{self.valves.backend_url}/research/{session_id}/status"
+                        )
+
+                        if status_response.status_code != 200:
+                            yield f"❌ Failed to check status: {status_response.text}"
+                            return
+
+                        status_data = status_response.json()
                     status = status_data.get("status", "unknown")
                     
                     # Show progress updates
@@ -143,9 +158,13 @@ class Pipe:
                         return
                     
                     elif status == "failed":
-                        error = status_data.get("error", "Unknown error")
+                        error = status_data.get("error_message") or status_data.get("error", "Unknown error")
                         yield f"\n\n❌ Research failed: {error}"
                         return
+
+                    elif status == "cancelled":
+                        yield "\n\n❌ Research was cancelled"
+                        return
                     
                     # Wait before next poll
                     await asyncio.sleep(2)
@@ -158,6 +177,39 @@ class Pipe:
         except Exception as e:
             yield f"❌ Error during research: {str(e)}"
 
+    async def _stream_events(
+        self, client: httpx.AsyncClient, session_id: str
+    ) -> AsyncGenerator[tuple, None]:
+        """
+        Read the backend's server-sent event stream for a research session.
+        
+        Args:
+            client: Open HTTP client
+            session_id: Research session ID
+            
+        Yields:
+            (event_type, data) tuples until the stream ends
+        """
+        async with client.stream(
+            "GET",
+            f"{self.valves.backend_url}/research/{session_id}/events",
+            headers={"Accept": "text/event-stream"}
+        ) as response:
+            if response.status_code != 200:
+                return
+            
+            event_type = None
+            async for line in response.aiter_lines():
+                if line.startswith("event: "):
+                    event_type = line[7:]
+                elif line.startswith("data: "):
+                    if event_type == "end":
+                        return
+                    try:
+                        yield event_type, json.loads(line[6:])
+                    except json.JSONDecodeError:
+                        continue
+
     def _format_research_results(self, data: Dict[str, Any]) -> str:
         """
         Format research results for display in chat.
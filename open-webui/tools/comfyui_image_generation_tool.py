@@ -46,6 +46,10 @@ class Tools:
             default=7.0,
             description="Default CFG (classifier-free guidance) scale"
         )
+        inline_preview: bool = Field(
+            default=True,
+            description="Embed a downscaled preview in the chat instead of the full-resolution image"
+        )
     
     def __init__(self):
         self.valves = self.Valves()
@@ -108,14 +112,14 @@ class Tools:
                 "steps": steps,
                 "cfg": cfg,
                 "checkpoint": checkpoint,
-                "wait_for_completion": True
+                "wait_for_completion": False
             }
             
-            # Send generation request
+            # Queue the generation; completion is followed on the job's event stream
             resp = requests.post(
                 f"{self.valves.backend_url}/comfyui/generate",
                 json=generation_data,
-                timeout=self.valves.timeout
+                timeout=30
             )
             
             if resp.status_code != 200:
@@ -132,9 +136,13 @@ class Tools:
             
             # Extract generation info
             prompt_id = result.get("prompt_id")
-            outputs = result.get("data", {}).get("outputs", {})
             parameters = result.get("data", {}).get("parameters", {})
             
+            completion = self._wait_for_job(prompt_id)
+            if not completion.get("success"):
+                return f"❌ Generation failed: {completion.get('error', 'Unknown error')}"
+            outputs = completion.get("outputs", {})
+            
             # Format success response
             output = []
             output.append("✅ **Image Generated Successfully!**")
@@ -166,6 +174,11 @@ class Tools:
                                     try:
                                         img_resp = requests.get(
                                             f"{self.valves.backend_url}/comfyui/image/{filename}",
+                                            params={
+                                                "subfolder": first_image.get("subfolder", ""),
+                                                "folder_type": first_image.get("type", "output"),
+                                                "variant": "preview" if self.valves.inline_preview else "original",
+                                            },
                                             timeout=30
                                         )
                                         if img_resp.status_code == 200:
@@ -190,6 +203,29 @@ class Tools:
         except Exception as e:
             return f"❌ Unexpected error during image generation: {str(e)}"
     
+    def _wait_for_job(self, prompt_id: str) -> dict:
+        """Follow the job's server-sent events until ComfyUI reports the result"""
+        deadline = time.time() + self.valves.timeout
+        with requests.get(
+            f"{self.valves.backend_url}/comfyui/jobs/{prompt_id}/events",
+            stream=True,
+            # Keepalives arrive every 15s, so a silent stream means the backend is gone
+            timeout=(10, 60)
+        ) as resp:
+            if resp.status_code != 200:
+                return {"success": False, "error": f"HTTP {resp.status_code} from job events"}
+            
+            event = None
+            for line in resp.iter_lines(decode_unicode=True):
+                if time.time() > deadline:
+                    raise requests.exceptions.Timeout()
+                if line.startswith("event: "):
+                    event = line[len("event: "):]
+                elif line.startswith("data: ") and event in ("complete", "failed"):
+                    return json.loads(line[len("data: "):])
+        
+        return {"success": False, "error": "Job event stream ended without a result"}
+    
     def get_available_models(self) -> str:
         """
         Get list of available ComfyUI models.
@@ -39,6 +39,20 @@ BEGIN
     END IF;
 END $$;
 
+-- Tell backends to refresh their ComfyUI model index (LISTEN comfyui_models)
+CREATE OR REPLACE FUNCTION public.notify_comfyui_models_changed()
+RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM pg_notify('comfyui_models', lower(TG_OP));
+    RETURN NULL;
+END;
+$$ language 'plpgsql';
+
+DROP TRIGGER IF EXISTS notify_comfyui_models_changed ON public.comfyui_models;
+CREATE TRIGGER notify_comfyui_models_changed
+    AFTER INSERT OR UPDATE OR DELETE ON public.comfyui_models
+    FOR EACH STATEMENT EXECUTE FUNCTION public.notify_comfyui_models_changed();
+
 -- Add any other custom functions here
 
 -- Enable logical replication for Realtime
@@ -146,4 +146,153 @@ CREATE POLICY "Users can view logs for their sessions" ON public.research_logs
     );
 
 CREATE POLICY "Service role can access all research logs" ON public.research_logs
-    FOR ALL USING (auth.role() = 'service_role');
\ No newline at end of file
+    FOR ALL USING (auth.role() = 'service_role');
+
+-- Research progress notifications (LISTEN research_events)
+-- Monotonic event sequence so SSE clients can resume with Last-Event-ID
+ALTER TABLE public.research_logs ADD COLUMN IF NOT EXISTS event_seq BIGSERIAL;
+CREATE INDEX IF NOT EXISTS idx_research_logs_session_event_seq ON public.research_logs(session_id, event_seq);
+
+CREATE OR REPLACE FUNCTION public.notify_research_session_status()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP = 'INSERT' OR NEW.status IS DISTINCT FROM OLD.status THEN
+        PERFORM pg_notify('research_events', json_build_object(
+            'kind', 'status',
+            'session_id', NEW.id,
+            'status', NEW.status
+        )::text);
+    END IF;
+    RETURN NEW;
+END;
+$$ language 'plpgsql';
+
+DROP TRIGGER IF EXISTS notify_research_sessions_status ON public.research_sessions;
+CREATE TRIGGER notify_research_sessions_status
+    AFTER INSERT OR UPDATE OF status ON public.research_sessions
+    FOR EACH ROW EXECUTE FUNCTION public.notify_research_session_status();
+
+-- Payloads carry ids only (NOTIFY is capped at 8000 bytes); listeners read the row
+CREATE OR REPLACE FUNCTION public.notify_research_log_insert()
+RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM pg_notify('research_events', json_build_object(
+        'kind', 'log',
+        'session_id', NEW.session_id,
+        'event_seq', NEW.event_seq
+    )::text);
+    RETURN NEW;
+END;
+$$ language 'plpgsql';
+
+DROP TRIGGER IF EXISTS notify_research_logs_insert ON public.research_logs;
+CREATE TRIGGER notify_research_logs_insert
+    AFTER INSERT ON public.research_logs
+    FOR EACH ROW EXECUTE FUNCTION public.notify_research_log_insert();
+
+
+-- Durable research queue: pending sessions are claimed with FOR UPDATE SKIP LOCKED
+-- and held under a lease that the owning backend worker renews by heartbeat
+ALTER TABLE public.research_sessions ADD COLUMN IF NOT EXISTS attempts INTEGER NOT NULL DEFAULT 0;
+ALTER TABLE public.research_sessions ADD COLUMN IF NOT EXISTS leased_by TEXT;
+ALTER TABLE public.research_sessions ADD COLUMN IF NOT EXISTS lease_expires_at TIMESTAMPTZ;
+ALTER TABLE public.research_sessions ADD COLUMN IF NOT EXISTS heartbeat_at TIMESTAMPTZ;
+
+CREATE INDEX IF NOT EXISTS idx_research_sessions_lease
+    ON public.research_sessions(lease_expires_at) WHERE status = 'running';
+
+-- Priority lanes and per-user fair scheduling for the research queue
+ALTER TABLE public.research_sessions ADD COLUMN IF NOT EXISTS priority SMALLINT NOT NULL DEFAULT 0;
+
+DROP INDEX IF EXISTS public.idx_research_sessions_queue;
+CREATE INDEX IF NOT EXISTS idx_research_sessions_queue_priority
+    ON public.research_sessions(priority DESC, created_at) WHERE status = 'pending';
+CREATE INDEX IF NOT EXISTS idx_research_sessions_running_user
+    ON public.research_sessions(user_id) WHERE status = 'running';
+
+-- Result cache: sessions are fingerprinted by normalized query and parameters, and
+-- cache hits are completed sessions pointing at an earlier session's result
+ALTER TABLE public.research_sessions ADD COLUMN IF NOT EXISTS query_hash TEXT;
+ALTER TABLE public.research_sessions ADD COLUMN IF NOT EXISTS cached_result_id UUID
+    REFERENCES public.research_results(id) ON DELETE SET NULL;
+
+CREATE INDEX IF NOT EXISTS idx_research_sessions_cache
+    ON public.research_sessions(query_hash, completed_at DESC) WHERE status = 'completed';
+
+-- Single-flight coalescing: a session started while an identical one is in flight
+-- follows it instead of running its own research, and mirrors the leader's status
+ALTER TABLE public.research_sessions ADD COLUMN IF NOT EXISTS leader_session_id UUID
+    REFERENCES public.research_sessions(id) ON DELETE SET NULL;
+
+CREATE INDEX IF NOT EXISTS idx_research_sessions_in_flight
+    ON public.research_sessions(query_hash, created_at)
+    WHERE status IN ('pending', 'running') AND leader_session_id IS NULL;
+CREATE INDEX IF NOT EXISTS idx_research_sessions_leader
+    ON public.research_sessions(leader_session_id) WHERE leader_session_id IS NOT NULL;
+
+CREATE OR REPLACE FUNCTION public.fan_out_research_session_status()
+RETURNS TRIGGER AS $$
+BEGIN
+    UPDATE public.research_sessions
+    SET status = NEW.status,
+        started_at = NEW.started_at,
+        completed_at = NEW.completed_at,
+        error_message = NEW.error_message,
+        cached_result_id = COALESCE(
+            (SELECT id FROM public.research_results WHERE session_id = NEW.id LIMIT 1),
+            NEW.cached_result_id
+        )
+    WHERE leader_session_id = NEW.id
+      AND status IN ('pending', 'running');
+    RETURN NEW;
+END;
+$$ language 'plpgsql';
+
+DROP TRIGGER IF EXISTS fan_out_research_sessions_status ON public.research_sessions;
+CREATE TRIGGER fan_out_research_sessions_status
+    AFTER UPDATE OF status ON public.research_sessions
+    FOR EACH ROW
+    WHEN (NEW.status IS DISTINCT FROM OLD.status)
+    EXECUTE FUNCTION public.fan_out_research_session_status();
+
+-- Keyset pagination for session listings: (created_at, id) < cursor, newest first
+CREATE INDEX IF NOT EXISTS idx_research_sessions_user_created_id
+    ON public.research_sessions(user_id, created_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_research_sessions_created_id
+    ON public.research_sessions(created_at DESC, id DESC);
+
+-- Research batches: many sessions created together and run with bounded concurrency
+CREATE TABLE IF NOT EXISTS public.research_batches (
+    id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+    user_id UUID REFERENCES public.users(id) ON DELETE CASCADE,
+    total INTEGER NOT NULL,
+    max_concurrency INTEGER NOT NULL DEFAULT 2 CHECK (max_concurrency > 0),
+    created_at TIMESTAMPTZ DEFAULT now()
+);
+
+ALTER TABLE public.research_sessions ADD COLUMN IF NOT EXISTS batch_id UUID
+    REFERENCES public.research_batches(id) ON DELETE SET NULL;
+ALTER TABLE public.research_sessions ADD COLUMN IF NOT EXISTS batch_index INTEGER;
+
+CREATE INDEX IF NOT EXISTS idx_research_sessions_batch
+    ON public.research_sessions(batch_id, batch_index) WHERE batch_id IS NOT NULL;
+
+GRANT ALL ON public.research_batches TO service_role;
+GRANT SELECT ON public.research_batches TO authenticated;
+ALTER TABLE public.research_batches ENABLE ROW LEVEL SECURITY;
+
+DROP POLICY IF EXISTS "Users can view their own research batches" ON public.research_batches;
+DROP POLICY IF EXISTS "Service role can access all research batches" ON public.research_batches;
+
+CREATE POLICY "Users can view their own research batches" ON public.research_batches
+    FOR SELECT USING (auth.uid() = user_id);
+
+CREATE POLICY "Service role can access all research batches" ON public.research_batches
+    FOR ALL USING (auth.role() = 'service_role');
+
+-- W3C traceparent of the request that queued a session, so the worker run joins its trace
+ALTER TABLE public.research_sessions ADD COLUMN IF NOT EXISTS trace_context TEXT;
+
+-- The cancelled leader a promoted follower took over from; its log stays part of the new run's history
+ALTER TABLE public.research_sessions ADD COLUMN IF NOT EXISTS predecessor_session_id UUID
+    REFERENCES public.research_sessions(id) ON DELETE SET NULL;